@@ -1,12 +1,13 @@
 import os
-import re
 import logging
 from docx import Document
 import pandas as pd
 from typing import List, Optional, Set, Dict
 from datetime import datetime
 from copy import deepcopy
-from num2words import num2words
+from amount_words import amount_in_words
+from placeholder_engine import PlaceholderEngine
+from template_metadata import template_metadata
 from docx.shared import Pt
 from typing import Dict
 
@@ -104,7 +105,8 @@ def map_data_to_docx(template_path: str, data: pd.DataFrame, output_folder: str,
 
         os.makedirs(output_folder, exist_ok=True)
         generated_files = []
-        template_placeholders = scan_template_placeholders(template_path)
+        template_placeholders = scan_template_placeholders(template_path,
+                                                           "Eligible" if is_eligible else "Ineligible")
 
         logging.info(f"Processing {len(data)} rows with {'eligible' if is_eligible else 'ineligible'} template")
 
@@ -291,19 +293,7 @@ def prepare_row_data(row, template_placeholders=None, is_eligible=True):
         try:
             amount_str = row_data.get('AMOUNT', '0').replace(',', '').replace('[', '').replace(']', '')
             amount = float(amount_str)
-
-            if amount % 1 == 0:
-                words = num2words(int(amount), lang='en_IN').title()
-                row_data['amount_in_words'] = f"{words} Rupees Only"
-            else:
-                rupees = int(amount)
-                paise = round((amount - rupees) * 100)
-                rupee_words = num2words(rupees, lang='en_IN').title()
-                paise_words = num2words(paise, lang='en_IN').title()
-                row_data['amount_in_words'] = (
-                    f"{rupee_words} Rupees and "
-                    f"{paise_words} Paise Only"
-                )
+            row_data['amount_in_words'] = amount_in_words(amount)
         except Exception as e:
             logging.error(f"Amount conversion error: {str(e)}")
             row_data['amount_in_words'] = "Rupees Only"
@@ -357,34 +347,25 @@ def replace_all_placeholders(doc: Document, row_data: Dict[str, str]) -> bool:
         return False
 
 
+# {{PLACEHOLDER}} filled in one pass; placeholders without a value are left in place
+PLACEHOLDERS = PlaceholderEngine(missing_value=None, single_braces=False)
+
+
 def replace_in_paragraph(paragraph, row_data):
     # First combine all runs
     full_text = ''.join(run.text for run in paragraph.runs)
 
     # Skip if no replacements needed
-    if not any(ph in full_text for ph in row_data):
+    new_text = PLACEHOLDERS.substitute(full_text, row_data)
+    if new_text == full_text:
         return
 
-    # Clear existing content
+    font_name = paragraph.runs[0].font.name if paragraph.runs else None
     paragraph.clear()
-
-    # Split text by placeholders
-    parts = re.split(r'(\{\{.+?\}\})', full_text)
-
-    for part in parts:
-        if part.startswith('{{') and part.endswith('}}'):
-            # This is a placeholder
-            ph = part[2:-2].strip()  # Remove braces
-            value = str(row_data.get(ph, part))  # Get value or keep original if not found
-            run = paragraph.add_run(value)
-        else:
-            # Regular text
-            run = paragraph.add_run(part)
-
-        # Preserve original formatting
-        if paragraph.runs and paragraph.runs[0].font.name:
-            run.font.name = paragraph.runs[0].font.name
-        run.font.size = Pt(10)
+    run = paragraph.add_run(new_text)
+    if font_name:
+        run.font.name = font_name
+    run.font.size = Pt(10)
 
 
 def format_value(value, key=None) -> str:
@@ -417,53 +398,18 @@ def format_value(value, key=None) -> str:
     return str(value).strip()
 
 
-def scan_template_placeholders(template_path: str) -> Set[str]:
+def scan_template_placeholders(template_path: str, doc_type: Optional[str] = None) -> Set[str]:
     """
     Scan a DOCX template and extract all unique placeholder variables
     Args:
         template_path: Path to the template DOCX file
+        doc_type: Document type rendered from the template, recorded with the scan
     Returns:
         Set of all unique placeholder names found in the template
     """
-    placeholders = set()
     try:
-        doc = Document(template_path)
-
-        # Pattern to match {{placeholder}} but ignore **bold** markers
-        placeholder_pattern = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}(?!\*)')
-
-        def extract_placeholders(text: str):
-            return {match.group(1).strip()
-                    for match in placeholder_pattern.finditer(text)}
-
-        # Check all paragraphs in main document
-        for paragraph in doc.paragraphs:
-            placeholders.update(extract_placeholders(paragraph.text))
-
-        # Check tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        placeholders.update(extract_placeholders(paragraph.text))
-
-        # Check headers and footers
-        for section in doc.sections:
-            for header in [section.header, section.first_page_header]:
-                if header:
-                    for paragraph in header.paragraphs:
-                        placeholders.update(extract_placeholders(paragraph.text))
-
-            for footer in [section.footer, section.first_page_footer]:
-                if footer:
-                    for paragraph in footer.paragraphs:
-                        placeholders.update(extract_placeholders(paragraph.text))
-
-        # Check for placeholders in runs (in case they're split across runs)
-        for paragraph in doc.paragraphs:
-            full_text = ''.join(run.text for run in paragraph.runs)
-            placeholders.update(extract_placeholders(full_text))
-
+        # Scanned once per template version; later calls and runs reuse the cached scan
+        placeholders = set(template_metadata(template_path, doc_type).placeholders)
         logging.info(f"Found placeholders in template: {placeholders}")
         return placeholders
 
@@ -481,6 +427,82 @@ def generate_output_path(output_folder: str, row_data: dict, idx: int,
     return os.path.join(output_folder, f"{prefix}_ISD_{invoice_num}_{timestamp}.docx")
 
 
+def generate_isd_document(job: Dict) -> Dict:
+    """
+    Fill one eligible/ineligible template for a row and convert it to PDF.
+    Runs inside batch worker processes, so everything it needs is in the job.
+
+    Job keys: index, row, is_eligible, template_path, output_pdf_folder, temp_docx_folder
+    and optionally placeholders (the template's placeholder set), pdf_backend
+    ("docx2pdf" or "native"; "native" writes the PDF straight from the filled
+    document without a temporary DOCX) and merge. With merge the document is
+    meant for a merged file: the native backend returns the PDF bytes in
+    result['pdf'] instead of writing a file, and docx2pdf writes the PDF to
+    the temporary folder (result['temporary'] is set) for the caller to
+    append and delete.
+    """
+    idx = job['index']
+    row = job['row']
+    prefix = "Eligible" if job['is_eligible'] else "Ineligible"
+    result = {'index': idx, 'doc_type': prefix, 'ok': False, 'output': None, 'error': None}
+    merge = job.get('merge', False)
+
+    doc = Document(job['template_path'])
+    placeholders = job.get('placeholders') or scan_template_placeholders(job['template_path'], prefix)
+    row_data = prepare_row_data(row, placeholders, job['is_eligible'])
+
+    if not replace_all_placeholders(doc, row_data):
+        result['error'] = f"Skipping row {idx} due to replacement errors"
+        logging.error(result['error'])
+        return result
+
+    invoice_num = str(row.get('INVOICE_NUMBER', idx + 1)).strip()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pdf_filename = f"{prefix}_ISD_{invoice_num}_{timestamp}.pdf"
+    pdf_path = os.path.join(job['temp_docx_folder'] if merge else job['output_pdf_folder'], pdf_filename)
+    result['title'] = invoice_num
+
+    if job.get('pdf_backend') == "native":
+        from docx_pdf_renderer import render_docx_to_pdf
+
+        pdf_bytes = render_docx_to_pdf(doc)
+        result['ok'] = True
+        if merge:
+            result['pdf'] = pdf_bytes
+            return result
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
+        logging.info(f"Generated {pdf_filename}")
+        result['output'] = pdf_path
+        return result
+
+    from docx2pdf import convert
+
+    # Save temporary DOCX
+    docx_path = os.path.join(job['temp_docx_folder'], f"{prefix}_ISD_{invoice_num}_{timestamp}.docx")
+    doc.save(docx_path)
+
+    # Convert to PDF in appropriate folder
+    try:
+        convert(docx_path, pdf_path)
+        logging.info(f"Generated {pdf_filename}")
+    except Exception as e:
+        result['error'] = f"PDF conversion failed: {str(e)}"
+        logging.error(result['error'])
+        return result
+
+    # Delete temporary DOCX
+    try:
+        os.remove(docx_path)
+    except Exception as e:
+        logging.error(f"Failed to delete temp DOCX: {str(e)}")
+
+    result['ok'] = True
+    result['output'] = pdf_path
+    result['temporary'] = merge
+    return result
+
+
 def log_debug_info(row, template_placeholders, row_data):
     """Enhanced debug logging with more details"""
     logging.info("\n=== DEBUG INFORMATION ===")
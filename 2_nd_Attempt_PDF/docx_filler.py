@@ -3,8 +3,9 @@ import re
 import logging
 from docx import Document
 from docx.shared import Pt
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 from datetime import datetime
+from template_metadata import template_placeholders
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -105,29 +106,7 @@ def scan_template_placeholders(template_path: str) -> Set[str]:
     Returns:
         Set of all unique placeholder names found in the template
     """
-    doc = Document(template_path)
-    placeholders = set()
-    # Match both {{ }} and {[ ]} styles, and clean the names
-    pattern = re.compile(r'\{\{?\s*([^{}]+?)\s*\}?\}')
-
-    def scan_text(text: str):
-        return {match.group(1).strip() for match in pattern.finditer(text)}
-
-    # Check all document components
-    components = [
-        doc.paragraphs,
-        *[cell.paragraphs for table in doc.tables
-          for row in table.rows
-          for cell in row.cells],
-        *[section.header.paragraphs for section in doc.sections],
-        *[section.footer.paragraphs for section in doc.sections]
-    ]
-
-    for paragraphs in components:
-        for paragraph in paragraphs:
-            placeholders.update(scan_text(paragraph.text))
-
-    return placeholders
+    return set(template_placeholders(template_path))
 
 
 def generate_output_filename(row_data: Dict, idx: int, is_eligible: bool) -> str:
@@ -2,10 +2,50 @@ import os
 import re
 import pandas as pd
 import logging
-from typing import Optional
+from typing import Iterator, Optional
+from data_reader import DEFAULT_BATCH_SIZE, iter_data_batches
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
+# Column names for the ISD workbook layout, in sheet order
+EXCEL_COLUMNS = [
+    # Basic invoice info
+    'INVOICE_NUMBER', 'INVOICE_DATE',
+    # ISD Distributor info
+    'ISD_DISTRIBUTOR_GSTIN', 'ISD_DISTRIBUTOR_NAME',
+    'ISD_DISTRIBUTOR_ADDRESS', 'ISD_DISTRIBUTOR_STATE',
+    'ISD_DISTRIBUTOR_PINCODE', 'ISD_DISTRIBUTOR_STATE_CODE',
+    # Credit Recipient info
+    'CREDIT_RECIPIENT_GSTIN', 'CREDIT_RECIPIENT_NAME',
+    'CREDIT_RECIPIENT_ADDRESS', 'CREDIT_RECIPIENT_STATE',
+    'CREDIT_RECIPIENT_PINCODE', 'CREDIT_RECIPIENT_STATE_CODE',
+    # Eligible tax breakdown
+    'ELIGIBLE_IGST_AS_IGST', 'ELIGIBLE_CGST_AS_IGST',
+    'ELIGIBLE_SGST_AS_IGST', 'ELIGIBLE_IGST_SUM',
+    'ELIGIBLE_CGST_AS_CGST', 'ELIGIBLE_CGST_SUM',
+    'ELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'ELIGIBLE_SGST_UTGST_SUM',
+    'ELIGIBLE_AMOUNT',
+    # Ineligible tax breakdown
+    'INELIGIBLE_IGST_AS_IGST', 'INELIGIBLE_CGST_AS_IGST',
+    'INELIGIBLE_SGST_AS_IGST', 'INELIGIBLE_IGST_SUM',
+    'INELIGIBLE_CGST_AS_CGST', 'INELIGIBLE_CGST_SUM',
+    'INELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'INELIGIBLE_SGST_UTGST_SUM',
+    'INELIGIBLE_AMOUNT',
+    # Contact info
+    'REG_OFFICE', 'CIN', 'E_MAIL', 'WEBSITE'
+]
+
+NUMERIC_COLUMNS = [
+    'ELIGIBLE_IGST_AS_IGST', 'ELIGIBLE_CGST_AS_IGST', 'ELIGIBLE_SGST_AS_IGST',
+    'ELIGIBLE_IGST_SUM', 'ELIGIBLE_CGST_AS_CGST', 'ELIGIBLE_CGST_SUM',
+    'ELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'ELIGIBLE_SGST_UTGST_SUM', 'ELIGIBLE_AMOUNT',
+    'INELIGIBLE_IGST_AS_IGST', 'INELIGIBLE_CGST_AS_IGST', 'INELIGIBLE_SGST_AS_IGST',
+    'INELIGIBLE_IGST_SUM', 'INELIGIBLE_CGST_AS_CGST', 'INELIGIBLE_CGST_SUM',
+    'INELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'INELIGIBLE_SGST_UTGST_SUM', 'INELIGIBLE_AMOUNT'
+]
+
+NA_VALUES = ['', 'NA', 'N/A', 'NULL']
+
 
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -56,6 +96,50 @@ def validate_row(row):
             logging.warning(f"Invalid GSTIN format in {field}: {row[field]}")
 
 
+def prepare_excel_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Numeric tax columns and computed IGST sums for the ISD workbook layout"""
+    # Convert numeric columns to float
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    # Calculate any missing sums
+    df['ELIGIBLE_IGST_SUM'] = df[
+        ['ELIGIBLE_IGST_AS_IGST', 'ELIGIBLE_CGST_AS_IGST', 'ELIGIBLE_SGST_AS_IGST', 'ELIGIBLE_AMOUNT']].sum(axis=1)
+    df['INELIGIBLE_IGST_SUM'] = df[
+        ['INELIGIBLE_IGST_AS_IGST', 'INELIGIBLE_CGST_AS_IGST', 'INELIGIBLE_SGST_AS_IGST', 'INELIGIBLE_AMOUNT']].sum(axis=1)
+    return df
+
+
+def finish_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean a loaded frame (or batch) and validate its rows, failing on the first invalid one"""
+    df = clean_data(df)
+
+    for idx, row in df.iterrows():
+        try:
+            validate_row(row)
+        except ValueError as e:
+            logging.error(f"Row {idx + 1} validation failed: {str(e)}")
+            # Either remove invalid rows or raise exception
+            # df.drop(index=idx, inplace=True)  # Option 1: Skip invalid rows
+            raise ValueError(f"Row {idx + 1} invalid: {str(e)}")  # Option 2: Fail fast
+
+    return df
+
+
+def iter_excel_csv_batches(file_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Stream a data file as cleaned, validated batches, read the same way as
+    read_excel_csv but without loading the whole file. A row that fails
+    validation raises when its batch is reached.
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext in ['.xlsx', '.xls']:
+        # Skip the tax type labels row, as read_excel_csv does
+        return iter_data_batches(file_path, batch_size, clean=lambda df: finish_frame(prepare_excel_frame(df)),
+                                 names=EXCEL_COLUMNS, skip_rows=1, as_text=True, na_values=NA_VALUES)
+    return iter_data_batches(file_path, batch_size, clean=finish_frame, as_text=True, na_values=NA_VALUES)
+
+
 def read_excel_csv(file_path: str) -> Optional[pd.DataFrame]:
     try:
         if not os.path.exists(file_path):
@@ -71,55 +155,13 @@ def read_excel_csv(file_path: str) -> Optional[pd.DataFrame]:
                 engine='openpyxl',
                 header=0,
                 skiprows=[1],  # Skip the tax type labels row
-                names=[
-                    # Basic invoice info
-                    'INVOICE_NUMBER', 'INVOICE_DATE',
-                    # ISD Distributor info
-                    'ISD_DISTRIBUTOR_GSTIN', 'ISD_DISTRIBUTOR_NAME',
-                    'ISD_DISTRIBUTOR_ADDRESS', 'ISD_DISTRIBUTOR_STATE',
-                    'ISD_DISTRIBUTOR_PINCODE', 'ISD_DISTRIBUTOR_STATE_CODE',
-                    # Credit Recipient info
-                    'CREDIT_RECIPIENT_GSTIN', 'CREDIT_RECIPIENT_NAME',
-                    'CREDIT_RECIPIENT_ADDRESS', 'CREDIT_RECIPIENT_STATE',
-                    'CREDIT_RECIPIENT_PINCODE', 'CREDIT_RECIPIENT_STATE_CODE',
-                    # Eligible tax breakdown
-                    'ELIGIBLE_IGST_AS_IGST', 'ELIGIBLE_CGST_AS_IGST',
-                    'ELIGIBLE_SGST_AS_IGST', 'ELIGIBLE_IGST_SUM',
-                    'ELIGIBLE_CGST_AS_CGST', 'ELIGIBLE_CGST_SUM',
-                    'ELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'ELIGIBLE_SGST_UTGST_SUM',
-                    'ELIGIBLE_AMOUNT',
-                    # Ineligible tax breakdown
-                    'INELIGIBLE_IGST_AS_IGST', 'INELIGIBLE_CGST_AS_IGST',
-                    'INELIGIBLE_SGST_AS_IGST', 'INELIGIBLE_IGST_SUM',
-                    'INELIGIBLE_CGST_AS_CGST', 'INELIGIBLE_CGST_SUM',
-                    'INELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'INELIGIBLE_SGST_UTGST_SUM',
-                    'INELIGIBLE_AMOUNT',
-                    # Contact info
-                    'REG_OFFICE', 'CIN', 'E_MAIL', 'WEBSITE'
-                ],
+                names=EXCEL_COLUMNS,
                 dtype=str,
-                na_values=['', 'NA', 'N/A', 'NULL'],
+                na_values=NA_VALUES,
                 keep_default_na=False
             )
 
-            # Convert numeric columns to float
-            numeric_cols = [
-                'ELIGIBLE_IGST_AS_IGST', 'ELIGIBLE_CGST_AS_IGST', 'ELIGIBLE_SGST_AS_IGST',
-                'ELIGIBLE_IGST_SUM', 'ELIGIBLE_CGST_AS_CGST', 'ELIGIBLE_CGST_SUM',
-                'ELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'ELIGIBLE_SGST_UTGST_SUM', 'ELIGIBLE_AMOUNT',
-                'INELIGIBLE_IGST_AS_IGST', 'INELIGIBLE_CGST_AS_IGST', 'INELIGIBLE_SGST_AS_IGST',
-                'INELIGIBLE_IGST_SUM', 'INELIGIBLE_CGST_AS_CGST', 'INELIGIBLE_CGST_SUM',
-                'INELIGIBLE_SGST_UTGST_AS_SGST_UTGST', 'INELIGIBLE_SGST_UTGST_SUM', 'INELIGIBLE_AMOUNT'
-            ]
-
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-            # Calculate any missing sums
-            df['ELIGIBLE_IGST_SUM'] = df[
-                ['ELIGIBLE_IGST_AS_IGST', 'ELIGIBLE_CGST_AS_IGST', 'ELIGIBLE_SGST_AS_IGST', 'ELIGIBLE_AMOUNT']].sum(axis=1)
-            df['INELIGIBLE_IGST_SUM'] = df[
-                ['INELIGIBLE_IGST_AS_IGST', 'INELIGIBLE_CGST_AS_IGST', 'INELIGIBLE_SGST_AS_IGST', 'INELIGIBLE_AMOUNT']].sum(axis=1)
+            df = prepare_excel_frame(df)
 
             logging.info(f"Successfully loaded Excel file: {file_path}")
 
@@ -129,7 +171,7 @@ def read_excel_csv(file_path: str) -> Optional[pd.DataFrame]:
                 file_path,
                 dtype=str,
                 encoding='utf-8',
-                na_values=['', 'NA', 'N/A', 'NULL'],
+                na_values=NA_VALUES,
                 keep_default_na=False
             )
             logging.info(f"Successfully loaded CSV file: {file_path}")
@@ -138,18 +180,8 @@ def read_excel_csv(file_path: str) -> Optional[pd.DataFrame]:
             logging.error(f"Unsupported file format: {file_path}")
             return None
 
-        # Clean column names and data
-        df = clean_data(df)
-
-        # Validate each row
-        for idx, row in df.iterrows():
-            try:
-                validate_row(row)
-            except ValueError as e:
-                logging.error(f"Row {idx + 1} validation failed: {str(e)}")
-                # Either remove invalid rows or raise exception
-                # df.drop(index=idx, inplace=True)  # Option 1: Skip invalid rows
-                raise ValueError(f"Row {idx + 1} invalid: {str(e)}")  # Option 2: Fail fast
+        # Clean column names and data, then validate each row
+        df = finish_frame(df)
 
         logging.info(f"Columns in data: {df.columns.tolist()}")
         logging.info(f"First row sample:\n{df.iloc[0].to_dict()}")
@@ -1,6 +1,9 @@
 import tkinter as tk
 import pandas as pd
 import shutil
+import queue
+import threading
+import multiprocessing
 from tkinter import filedialog, messagebox, ttk
 import ttkbootstrap as tb
 import os
@@ -8,10 +11,11 @@ import logging
 import darkdetect
 import sys
 from datetime import datetime
-from docx import Document
-from file_reader import read_excel_csv
-from data_mapper import scan_template_placeholders, prepare_row_data, replace_all_placeholders
-from docx2pdf import convert
+from file_reader import read_excel_csv, iter_excel_csv_batches
+from data_reader import PREVIEW_ROWS, estimate_row_count, should_stream
+from data_mapper import scan_template_placeholders, generate_isd_document
+from batch_engine import BatchEngine, default_worker_count, failed_result
+from merged_pdf import MergedPdfOutput
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -28,6 +32,8 @@ class DocumentFillerApp:
         self.input_file = None
         self.output_folder = None
         self.current_data = None
+        self.engine = None
+        self.results_queue = None
 
         self.setup_template_access()
     def load_default_templates(self):
@@ -81,10 +87,39 @@ class DocumentFillerApp:
                                command=self.select_output_folder)
         btn_output.pack(fill=tk.X, padx=10, pady=5)
 
-        btn_start = tb.Button(self.control_frame, text="🚀 Generate ISD Invoices",
-                              bootstyle="success",
-                              command=self.start_processing)
-        btn_start.pack(fill=tk.X, padx=10, pady=20)
+        self.btn_start = tb.Button(self.control_frame, text="🚀 Generate ISD Invoices",
+                                   bootstyle="success",
+                                   command=self.start_processing)
+        self.btn_start.pack(fill=tk.X, padx=10, pady=20)
+
+        # Number of worker processes used for generation
+        workers_frame = tb.Frame(self.control_frame)
+        workers_frame.pack(fill=tk.X, padx=10, pady=5)
+        tb.Label(workers_frame, text="Worker Processes").pack(side=tk.LEFT)
+        self.workers_var = tk.IntVar(value=default_worker_count())
+        tb.Spinbox(workers_frame, from_=1, to=64, width=5, textvariable=self.workers_var).pack(side=tk.RIGHT)
+
+        # PDF conversion: Word via docx2pdf, or the built-in renderer (no temporary DOCX)
+        converter_frame = tb.Frame(self.control_frame)
+        converter_frame.pack(fill=tk.X, padx=10, pady=5)
+        tb.Label(converter_frame, text="PDF Converter").pack(side=tk.LEFT)
+        self.pdf_backend_var = tk.StringVar(value="docx2pdf")
+        tb.Combobox(converter_frame, textvariable=self.pdf_backend_var, width=12, state="readonly",
+                    values=["docx2pdf", "native"]).pack(side=tk.RIGHT)
+
+        # Merged output: one bound PDF per type instead of a file per invoice
+        self.merge_var = tk.BooleanVar(value=False)
+        tb.Checkbutton(self.control_frame, text="Merge into one PDF per type", variable=self.merge_var,
+                       bootstyle="round-toggle").pack(fill=tk.X, padx=10, pady=5)
+
+        split_frame = tb.Frame(self.control_frame)
+        split_frame.pack(fill=tk.X, padx=10, pady=5)
+        tb.Label(split_frame, text="Split at pages / MB (0 = never)").pack(side=tk.LEFT)
+        self.merge_max_mb_var = tk.IntVar(value=0)
+        tb.Spinbox(split_frame, from_=0, to=10000, width=6, textvariable=self.merge_max_mb_var).pack(side=tk.RIGHT)
+        self.merge_max_pages_var = tk.IntVar(value=0)
+        tb.Spinbox(split_frame, from_=0, to=1000000, width=7,
+                   textvariable=self.merge_max_pages_var).pack(side=tk.RIGHT, padx=5)
 
         # Add progress bar components (hidden initially)
         self.progress_frame = tb.Frame(self.control_frame)
@@ -99,6 +134,10 @@ class DocumentFillerApp:
             bootstyle="success-striped"
         )
         self.progress_bar.pack(fill=tk.X, pady=5)
+
+        self.btn_cancel = tb.Button(self.progress_frame, text="⛔ Cancel", bootstyle="danger",
+                                    command=self.cancel_processing)
+        self.btn_cancel.pack(fill=tk.X, pady=5)
         self.progress_frame.pack_forget()  # Hide initially
 
         # Template status labels
@@ -151,6 +190,10 @@ class DocumentFillerApp:
             messagebox.showerror("Error", "Please select data file and output folder!")
             return
 
+        if self.engine is not None:
+            messagebox.showwarning("Busy", "Document generation is already running.")
+            return
+
         try:
             # Verify input file and output folder
             if not os.path.exists(self.input_file):
@@ -172,11 +215,18 @@ class DocumentFillerApp:
             self.progress_label.config(text="Preparing...")
             self.root.update_idletasks()
 
-            data = read_excel_csv(self.input_file)
-            if data is None:
-                messagebox.showerror("Error", "Failed to read data file.")
-                self.progress_frame.pack_forget()
-                return
+            if should_stream(self.input_file):
+                # Large workbook: read it in batches while documents are generated
+                batches = iter_excel_csv_batches(self.input_file)
+                total_rows = estimate_row_count(self.input_file) or 0
+            else:
+                data = read_excel_csv(self.input_file)
+                if data is None:
+                    messagebox.showerror("Error", "Failed to read data file.")
+                    self.progress_frame.pack_forget()
+                    return
+                batches = [data]
+                total_rows = len(data)
 
             # Create main output folders
             eligible_folder = os.path.join(self.output_folder, "Eligible")
@@ -193,120 +243,186 @@ class DocumentFillerApp:
                                      "Please choose a different output location.")
                 return
 
-            total_rows = len(data)
-            success_count = 0
+            try:
+                workers = max(1, int(self.workers_var.get()))
+            except (tk.TclError, ValueError):
+                workers = default_worker_count()
+
+            self.engine = BatchEngine(generate_isd_document, workers=workers)
+            self.results_queue = queue.Queue()
+            self.total_rows = total_rows
+            self.processed_rows = set()
+            self.success_count = 0
+            self.failed_results = []
+            self.eligible_folder = eligible_folder
+            self.ineligible_folder = ineligible_folder
+            self.temp_docx_folder = temp_docx_folder
+            self.pdf_backend = self.pdf_backend_var.get()
+            self.merge = self.merge_var.get()
+            try:
+                self.merge_limits = (max(0, int(self.merge_max_pages_var.get())),
+                                     max(0, int(self.merge_max_mb_var.get())) * 1024 * 1024)
+            except (tk.TclError, ValueError):
+                self.merge_limits = (0, 0)
+            self.merged_files = []
+
+            self.progress_label.config(text=f"Starting {workers} worker(s)...")
+            self.btn_start.config(state=tk.DISABLED)
+            self.btn_cancel.config(state=tk.NORMAL)
+
+            threading.Thread(
+                target=self._run_batch,
+                args=(self.engine, self.iter_document_jobs(batches), self.results_queue),
+                daemon=True
+            ).start()
+            self.root.after(100, self._poll_batch_results)
+
+        except Exception as e:
+            self.engine = None
+            if hasattr(self, 'progress_label'):
+                self.progress_label.config(text="Processing failed!", bootstyle="danger")
+            messagebox.showerror("Error", f"Processing failed: {str(e)}")
+            logging.error(f"Processing error: {str(e)}")
 
+    def iter_document_jobs(self, batches):
+        """Yield one generation job per row and eligibility type that has tax amounts"""
+        placeholders = {
+            True: scan_template_placeholders(self.eligible_template, "Eligible"),
+            False: scan_template_placeholders(self.ineligible_template, "Ineligible")
+        }
+        for data in batches:
             for idx, row in data.iterrows():
+                for is_eligible in [True, False]:
+                    if not self.has_tax_amounts(row, is_eligible):
+                        logging.info(f"Row {idx}: no {'eligible' if is_eligible else 'ineligible'} amounts found")
+                        continue
+
+                    yield {
+                        'index': idx,
+                        'row': row,
+                        'is_eligible': is_eligible,
+                        'template_path': self.eligible_template if is_eligible else self.ineligible_template,
+                        'placeholders': placeholders[is_eligible],
+                        'output_pdf_folder': self.eligible_folder if is_eligible else self.ineligible_folder,
+                        'temp_docx_folder': self.temp_docx_folder,
+                        'pdf_backend': self.pdf_backend,
+                        'merge': self.merge
+                    }
+
+    def _run_batch(self, engine, jobs, results_queue):
+        """Background thread: run the jobs and forward results to the GUI"""
+        merged = {}
+        try:
+            for result in engine.run(jobs):
+                if self.merge and result.get('ok'):
+                    self._append_to_merged(merged, result)
+                results_queue.put(result)
+        except Exception as e:
+            logging.error(f"Processing error: {str(e)}", exc_info=True)
+            results_queue.put(failed_result({}, f"Processing failed: {str(e)}"))
+        finally:
+            for output in merged.values():
                 try:
-                    # Update progress
-                    progress = (idx + 1) / total_rows * 100
-                    self.progress_bar['value'] = progress
-                    self.progress_label.config(text=f"Processing row {idx + 1} of {total_rows}")
-                    self.root.update_idletasks()
-
-                    logging.info(f"\nProcessing row {idx}:")
-                    logging.info(
-                        f"Eligible amounts - CGST: {row['ELIGIBLE_CGST_AS_IGST']}, "
-                        f"SGST: {row['ELIGIBLE_SGST_AS_IGST']}, "
-                        f"IGST: {row['ELIGIBLE_IGST_AS_IGST']}"
-                    )
-                    logging.info(
-                        f"Ineligible amounts - CGST: {row['INELIGIBLE_CGST_AS_IGST']}, "
-                        f"SGST: {row['INELIGIBLE_SGST_AS_IGST']}, "
-                        f"IGST: {row['INELIGIBLE_IGST_AS_IGST']}"
-                    )
-
-                    # Process both eligible and ineligible documents
-                    for is_eligible in [True, False]:
-                        if not self.has_tax_amounts(row, is_eligible):
-                            logging.info(f"No {'eligible' if is_eligible else 'ineligible'} amounts found")
-                            continue
-
-                        # Set paths based on eligibility
-                        if is_eligible:
-                            output_pdf_folder = eligible_folder
-                            prefix = "Eligible"
-                            template_path = self.eligible_template
-                        else:
-                            output_pdf_folder = ineligible_folder
-                            prefix = "Ineligible"
-                            template_path = self.ineligible_template
-
-                        # Generate document
-                        try:
-                            doc = Document(template_path)
-                        except Exception as e:
-                            logging.error(f"Failed to open template: {str(e)}")
-                            continue
-
-                        placeholders = scan_template_placeholders(template_path)
-                        row_data = prepare_row_data(row, placeholders, is_eligible)
-
-                        if not replace_all_placeholders(doc, row_data):
-                            logging.error(f"Skipping row {idx} due to replacement errors")
-                            continue
-
-                        # Save temporary DOCX
-                        invoice_num = str(row.get('INVOICE_NUMBER', idx + 1)).strip()
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        docx_filename = f"{prefix}_ISD_{invoice_num}_{timestamp}.docx"
-                        docx_path = os.path.join(temp_docx_folder, docx_filename)
-
-                        try:
-                            doc.save(docx_path)
-                        except Exception as e:
-                            logging.error(f"Failed to save DOCX: {str(e)}")
-                            continue
-
-                        # Convert to PDF in appropriate folder
-                        pdf_filename = f"{prefix}_ISD_{invoice_num}_{timestamp}.pdf"
-                        pdf_path = os.path.join(output_pdf_folder, pdf_filename)
-
-                        try:
-                            from docx2pdf import convert
-                            convert(docx_path, pdf_path)
-                            success_count += 1
-                            logging.info(f"Generated {pdf_filename}")
-                        except Exception as e:
-                            logging.error(f"PDF conversion failed: {str(e)}")
-                            continue
-
-                        # Delete temporary DOCX
-                        try:
-                            os.remove(docx_path)
-                        except Exception as e:
-                            logging.error(f"Failed to delete temp DOCX: {str(e)}")
-
+                    self.merged_files.extend(output.close())
                 except Exception as e:
-                    logging.error(f"Error processing row {idx}: {str(e)}", exc_info=True)
-                    continue
+                    logging.error(f"Error finishing merged PDF: {str(e)}")
+            results_queue.put(None)
+
+    def _append_to_merged(self, merged, result):
+        """
+        Append a rendered document to its type's merged PDF, in row order,
+        bookmarked by invoice number. Runs on the background thread.
+        """
+        doc_type = result['doc_type']
+        output = merged.get(doc_type)
+        if output is None:
+            folder = self.eligible_folder if doc_type == "Eligible" else self.ineligible_folder
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            max_pages, max_bytes = self.merge_limits
+            output = merged[doc_type] = MergedPdfOutput(
+                os.path.join(folder, f"{doc_type}_ISD_Merged_{timestamp}.pdf"), max_pages, max_bytes)
+
+        source = result.pop('pdf', None) or result['output']
+        try:
+            result['output'] = output.append(source, result.get('title'))
+        except Exception as e:
+            logging.error(f"Could not add row {result['index']} to the merged PDF: {str(e)}")
+            result.update(ok=False, error=f"Merge failed: {str(e)}")
+        finally:
+            if result.pop('temporary', False):
+                try:
+                    os.remove(source)
+                except OSError as e:
+                    logging.error(f"Failed to delete temporary PDF: {str(e)}")
 
-            # Clean up temporary folder
-            try:
-                if os.path.exists(temp_docx_folder):
-                    if not os.listdir(temp_docx_folder):
-                        os.rmdir(temp_docx_folder)
-                    else:
-                        logging.warning(f"Temporary folder not empty: {temp_docx_folder}")
-            except Exception as e:
-                logging.error(f"Error cleaning temp folder: {str(e)}")
+    def _poll_batch_results(self):
+        """Apply finished documents to the progress bar; runs on the GUI thread"""
+        finished = False
+        try:
+            while True:
+                result = self.results_queue.get_nowait()
+                if result is None:
+                    finished = True
+                    break
+
+                if result.get('index') is not None:
+                    self.processed_rows.add(result['index'])
+                if result.get('ok'):
+                    self.success_count += 1
+                else:
+                    self.failed_results.append(result)
+        except queue.Empty:
+            pass
 
-            # Final progress update
-            self.progress_bar['value'] = 100
-            self.progress_label.config(text=f"Completed: {success_count} documents generated")
-            self.root.update_idletasks()
+        if self.total_rows:
+            self.progress_bar['value'] = min(100, len(self.processed_rows) / self.total_rows * 100)
+        self.progress_label.config(text=f"Processing row {len(self.processed_rows)} of {self.total_rows}")
+
+        if finished:
+            self._finish_batch()
+        else:
+            self.root.after(100, self._poll_batch_results)
 
-            messagebox.showinfo("Success",
-                                f"Processing complete!\n\n"
-                                f"Eligible PDFs: {eligible_folder}\n"
-                                f"Ineligible PDFs: {ineligible_folder}\n"
-                                f"Total generated: {success_count}")
+    def _finish_batch(self):
+        """Clean up after a batch run and report the outcome"""
+        cancelled = self.engine.cancelled
+        self.engine = None
+        self.btn_start.config(state=tk.NORMAL)
+        self.btn_cancel.config(state=tk.DISABLED)
 
+        # Clean up temporary folder
+        try:
+            if os.path.exists(self.temp_docx_folder):
+                if not os.listdir(self.temp_docx_folder):
+                    os.rmdir(self.temp_docx_folder)
+                else:
+                    logging.warning(f"Temporary folder not empty: {self.temp_docx_folder}")
         except Exception as e:
-            if hasattr(self, 'progress_label'):
-                self.progress_label.config(text="Processing failed!", bootstyle="danger")
-            messagebox.showerror("Error", f"Processing failed: {str(e)}")
-            logging.error(f"Processing error: {str(e)}")
+            logging.error(f"Error cleaning temp folder: {str(e)}")
+
+        for result in self.failed_results:
+            logging.error(f"Row {result.get('index')} ({result.get('doc_type')}) failed: {result.get('error')}")
+
+        # Final progress update
+        status = "Cancelled" if cancelled else "Completed"
+        if not cancelled:
+            self.progress_bar['value'] = 100
+        self.progress_label.config(text=f"{status}: {self.success_count} documents generated")
+
+        messagebox.showinfo("Cancelled" if cancelled else "Success",
+                            f"Processing {'cancelled' if cancelled else 'complete'}!\n\n"
+                            f"Eligible PDFs: {self.eligible_folder}\n"
+                            f"Ineligible PDFs: {self.ineligible_folder}\n"
+                            f"Total generated: {self.success_count}\n"
+                            + (f"Merged files: {len(self.merged_files)}\n" if self.merged_files else "") +
+                            f"Failed: {len(self.failed_results)}")
+
+    def cancel_processing(self):
+        """Ask the running batch to stop after the documents already in progress"""
+        if self.engine is not None:
+            self.engine.cancel()
+            self.btn_cancel.config(state=tk.DISABLED)
+            self.progress_label.config(text="Cancelling...")
 
     def is_row_eligible(self, row):
         """Determine if row contains eligible or ineligible data"""
@@ -455,7 +571,13 @@ class DocumentFillerApp:
             logging.info(f"Data file loaded: {file_path}")
 
             try:
-                self.current_data = read_excel_csv(file_path)
+                if should_stream(file_path):
+                    # Only preview a large workbook; generation streams it in batches
+                    batches = iter_excel_csv_batches(file_path, PREVIEW_ROWS)
+                    self.current_data = next(batches, None)
+                    batches.close()
+                else:
+                    self.current_data = read_excel_csv(file_path)
                 if self.current_data is not None:
                     self.display_data(self.current_data)
                     messagebox.showinfo("Success", "Data file loaded and displayed successfully!")
@@ -561,6 +683,7 @@ class DocumentFillerApp:
 
 # Initialize and run the application
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Worker processes in the PyInstaller build
     theme = "darkly" if darkdetect.isDark() else "journal"
     root = tb.Window(themename=theme)
     app = DocumentFillerApp(root)
@@ -1,6 +1,6 @@
-from PyPDF2 import PdfReader, PdfWriter
 import os
 import logging
+from merged_pdf import MergedPdfWriter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -12,8 +12,11 @@ def merge_pdfs(input_folder, output_pdf, sort_key=None):
     :param input_folder: Folder containing individual PDFs
     :param output_pdf: Path to save the merged PDF
     :param sort_key: Optional function to sort PDF filenames (e.g., lambda x: int(x.split('_')[1]))
+
+    Files are streamed into the output one at a time, with a bookmark per
+    file and fonts/images shared between files stored once, so memory stays
+    flat however many PDFs are merged.
     """
-    pdf_writer = PdfWriter()
     pdf_files = [f for f in os.listdir(input_folder) if f.endswith(".pdf")]
 
     if not pdf_files:
@@ -28,22 +31,21 @@ def merge_pdfs(input_folder, output_pdf, sort_key=None):
 
     logging.info(f"Found {len(pdf_files)} PDFs to merge.")
 
-    for i, pdf_file in enumerate(pdf_files, start=1):
-        pdf_path = os.path.join(input_folder, pdf_file)
-        try:
-            pdf_reader = PdfReader(pdf_path)
-            for page in pdf_reader.pages:
-                pdf_writer.add_page(page)
-            logging.info(f"✅ Added {pdf_file} ({i} of {len(pdf_files)})")
-        except Exception as e:
-            logging.error(f"❌ Error reading {pdf_file}: {e}")
-
     try:
-        with open(output_pdf, "wb") as output:
-            pdf_writer.write(output)
-        logging.info(f"✅ Merged PDF saved: {output_pdf}")
+        pdf_writer = MergedPdfWriter(output_pdf)
     except Exception as e:
         logging.error(f"❌ Error saving merged PDF: {e}")
+        return
+
+    with pdf_writer:
+        for i, pdf_file in enumerate(pdf_files, start=1):
+            pdf_path = os.path.join(input_folder, pdf_file)
+            try:
+                pdf_writer.append(pdf_path, title=os.path.splitext(pdf_file)[0])
+                logging.info(f"✅ Added {pdf_file} ({i} of {len(pdf_files)})")
+            except Exception as e:
+                logging.error(f"❌ Error reading {pdf_file}: {e}")
+    logging.info(f"✅ Merged PDF saved: {output_pdf}")
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from docx import Document
+
+# {{PLACEHOLDER}} with optional inner whitespace, as written in the templates
+PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+
+DEFAULT_CACHE_FILE = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "DocumentGenerator", "template_metadata.json"
+)
+
+# Bump when the scan changes, so entries written by an older scan are ignored
+SCAN_VERSION = 1
+
+
+class TemplateMetadata:
+    """What a scan of one template found: its placeholders and where they are"""
+
+    def __init__(self, path: str, digest: str, locations: Dict[str, List[str]],
+                 doc_types: Optional[List[str]] = None):
+        self.path = path
+        self.digest = digest
+        self.locations = locations  # placeholder -> parts it appears in: body, table, header, footer
+        self.doc_types = list(doc_types or [])
+
+    @property
+    def placeholders(self) -> FrozenSet[str]:
+        return frozenset(self.locations)
+
+    def to_dict(self) -> Dict:
+        return {'digest': self.digest, 'locations': self.locations, 'doc_types': self.doc_types}
+
+    @classmethod
+    def from_dict(cls, path: str, data: Dict) -> "TemplateMetadata":
+        return cls(path, data['digest'], data['locations'], data.get('doc_types'))
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_located_paragraphs(doc):
+    """Yield (location, paragraph) for the body, tables (including nested) and every header/footer"""
+    def walk(container, location):
+        for paragraph in container.paragraphs:
+            yield location, paragraph
+        for table in container.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    yield from walk(cell, "table")
+
+    yield from walk(doc, "body")
+    for section in doc.sections:
+        for location, parts in (("header", (section.header, section.first_page_header, section.even_page_header)),
+                                ("footer", (section.footer, section.first_page_footer, section.even_page_footer))):
+            for part in parts:
+                if part is not None and not part.is_linked_to_previous:
+                    yield from walk(part, location)
+
+
+def iter_template_paragraphs(doc):
+    """Yield every paragraph in the body, tables (including nested) and headers/footers"""
+    for _location, paragraph in _iter_located_paragraphs(doc):
+        yield paragraph
+
+
+def scan_template(template_path: str) -> Dict[str, List[str]]:
+    """Placeholders of a DOCX template mapped to the parts they appear in"""
+    doc = Document(template_path)
+    locations: Dict[str, List[str]] = {}
+    for location, paragraph in _iter_located_paragraphs(doc):
+        text = paragraph.text
+        if '{{' not in text:
+            continue
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            parts = locations.setdefault(match.group(1), [])
+            if location not in parts:
+                parts.append(location)
+    return locations
+
+
+class TemplateMetadataCache:
+    """
+    Placeholder scans of DOCX templates, shared by every code path that
+    needs them.
+
+    An entry is found by path, size and modification time; when those
+    change, the file's content hash decides whether it really has to be
+    scanned again. Scans are kept in memory for the life of the process and,
+    with ``cache_file``, in a JSON file so later runs skip them too.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None):
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int, int], TemplateMetadata] = {}
+        self._by_digest: Dict[str, Dict] = {}
+        if cache_file:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get('version') == SCAN_VERSION:
+            self._by_digest = stored.get('templates', {})
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': SCAN_VERSION, 'templates': self._by_digest}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logging.warning(f"Could not save template metadata cache: {str(e)}")
+
+    def get(self, template_path: str, doc_type: Optional[str] = None) -> TemplateMetadata:
+        """
+        Metadata for ``template_path``, scanning the template only if it is
+        new or changed. ``doc_type`` records a document type rendered from it.
+        """
+        path = os.path.abspath(template_path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            metadata = self._entries.get(key)
+            if metadata is None:
+                digest = _file_digest(path)
+                known = self._by_digest.get(digest)
+                if known is not None:
+                    metadata = TemplateMetadata.from_dict(path, known)
+                else:
+                    metadata = TemplateMetadata(path, digest, scan_template(path))
+                    logging.info(f"Scanned template {os.path.basename(path)}: "
+                                 f"{len(metadata.locations)} placeholders")
+                self._entries[key] = metadata
+                self._remember(metadata)
+
+            if doc_type and doc_type not in metadata.doc_types:
+                metadata.doc_types.append(doc_type)
+                self._remember(metadata)
+        return metadata
+
+    def _remember(self, metadata: TemplateMetadata):
+        self._by_digest[metadata.digest] = metadata.to_dict()
+        if self.cache_file:
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_digest.clear()
+            if self.cache_file:
+                self._save()
+
+
+_DEFAULT_CACHE: Optional[TemplateMetadataCache] = None
+
+
+def template_metadata(template_path: str, doc_type: Optional[str] = None) -> TemplateMetadata:
+    """Metadata for a template from the process-wide cache, which is also kept on disk"""
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = TemplateMetadataCache(DEFAULT_CACHE_FILE)
+    return _DEFAULT_CACHE.get(template_path, doc_type)
+
+
+def template_placeholders(template_path: str) -> FrozenSet[str]:
+    """Placeholder names used by a template"""
+    return template_metadata(template_path).placeholders
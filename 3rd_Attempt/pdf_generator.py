@@ -1,15 +1,16 @@
-from PyPDF2 import PdfReader, PdfWriter
 from PyPDF2.errors import PdfReadError
-from docx2pdf import convert
 from reportlab.pdfgen import canvas
+from pdf_converter import convert_documents
+from merged_pdf import MergedPdfWriter
 import os
 
-def generate_pdfs(docx_files, output_folder):
+def generate_pdfs(docx_files, output_folder, backend="auto"):
     """
-    Converts filled DOCX files to PDFs.
+    Converts filled DOCX files to PDFs in a single converter batch.
 
     :param docx_files: List of DOCX files to convert
     :param output_folder: Folder where PDFs will be saved
+    :param backend: PDF converter backend ("auto", "libreoffice", "unoserver", "docx2pdf")
     :return: List of generated PDF file paths
     """
     pdf_files = []
@@ -17,6 +18,7 @@ def generate_pdfs(docx_files, output_folder):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
+    pending = []
     for docx_file in docx_files:
         pdf_output = os.path.join(output_folder, os.path.basename(docx_file).replace(".docx", ".pdf"))
 
@@ -24,12 +26,21 @@ def generate_pdfs(docx_files, output_folder):
         if os.path.exists(pdf_output):
             print(f"⚠️ PDF already exists: {pdf_output}, skipping conversion.")
         else:
-            try:
-                convert(docx_file, pdf_output)
-                print(f"✅ Converted: {docx_file} → {pdf_output}")
-                pdf_files.append(pdf_output)
-            except Exception as e:
-                print(f"❌ Error converting {docx_file} to PDF: {e}")
+            pending.append(docx_file)
+
+    try:
+        converted = convert_documents(pending, output_folder, backend=backend)
+    except Exception as e:
+        print(f"❌ Error converting DOCX files to PDF: {e}")
+        return pdf_files
+
+    for docx_file in pending:
+        pdf_output = converted.get(docx_file)
+        if pdf_output:
+            print(f"✅ Converted: {docx_file} → {pdf_output}")
+            pdf_files.append(pdf_output)
+        else:
+            print(f"❌ Error converting {docx_file} to PDF")
 
     return pdf_files
 
@@ -39,8 +50,11 @@ def merge_pdfs(input_folder, output_pdf):
 
     :param input_folder: Folder containing individual PDFs
     :param output_pdf: Path to save the merged PDF
+
+    Files are streamed into the output one at a time, with a bookmark per
+    file and fonts/images shared between files stored once, so memory stays
+    flat however many PDFs are merged.
     """
-    pdf_writer = PdfWriter()
     pdf_files = sorted([
         os.path.join(input_folder, f) for f in os.listdir(input_folder)
         if f.endswith(".pdf") and os.path.isfile(os.path.join(input_folder, f))
@@ -50,21 +64,20 @@ def merge_pdfs(input_folder, output_pdf):
         print("❌ No PDFs found in the folder. Cannot merge.")
         return
 
-    for pdf_file in pdf_files:
-        try:
-            pdf_reader = PdfReader(pdf_file)
-            for page in pdf_reader.pages:
-                pdf_writer.add_page(page)
-        except FileNotFoundError:
-            print(f"❌ Error: PDF file not found: {pdf_file}")
-        except PdfReadError:
-            print(f"❌ Error: Could not read PDF file: {pdf_file}. It might be corrupted.")
-        except Exception as e:
-            print(f"❌ Error merging {pdf_file}: {e}")
-
     try:
-        with open(output_pdf, "wb") as output:
-            pdf_writer.write(output)
-        print(f"✅ Merged PDF saved: {output_pdf}")
+        pdf_writer = MergedPdfWriter(output_pdf)
     except Exception as e:
         print(f"❌ Error saving merged PDF: {e}")
+        return
+
+    with pdf_writer:
+        for pdf_file in pdf_files:
+            try:
+                pdf_writer.append(pdf_file, title=os.path.splitext(os.path.basename(pdf_file))[0])
+            except FileNotFoundError:
+                print(f"❌ Error: PDF file not found: {pdf_file}")
+            except PdfReadError:
+                print(f"❌ Error: Could not read PDF file: {pdf_file}. It might be corrupted.")
+            except Exception as e:
+                print(f"❌ Error merging {pdf_file}: {e}")
+    print(f"✅ Merged PDF saved: {output_pdf}")
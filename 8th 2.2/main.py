@@ -1,20 +1,21 @@
 # main.py
 import sys
 import os
-import pandas as pd
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QFileDialog, QMessageBox, QLabel, QTableWidget, QTableWidgetItem, QLineEdit,
+    QFileDialog, QMessageBox, QLabel, QLineEdit,
     QComboBox, QDialog, QListWidget, QListWidgetItem, QFormLayout, QDialogButtonBox,
     QScrollArea, QGraphicsView, QGraphicsScene, QGraphicsRectItem
 )
 from PyQt5.QtCore import Qt, QFileInfo, QStandardPaths
 from PyQt5.QtGui import QPixmap
 from fpdf import FPDF
-import fitz
-import json
 import logging
 from utils.data_mapper import DataMapper
+from utils.search_index import SearchIndex
+from utils.data_reader import read_data
+from utils.box_layout import BoxLayout, LayoutBox
+from utils.gui_utils import create_table_widget, display_data as display_table_data
 from docx import Document
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -31,6 +32,7 @@ class MainApp(QMainWindow):
     def init_data(self):
         self.df = None
         self.filtered_df = None
+        self.search_index = None
         self.pdf_path = None
         self.pdf_document = None
         self.docx_template_path = None
@@ -95,7 +97,8 @@ class MainApp(QMainWindow):
         self.layout.addLayout(self.search_layout)
 
     def create_data_table(self):
-        self.table = QTableWidget()
+        self.table = create_table_widget(self)
+        self.table_model = self.table.model()
         self.layout.addWidget(self.table)
 
     def create_docx_controls(self):
@@ -127,15 +130,15 @@ class MainApp(QMainWindow):
             return
 
         try:
-            if file_path.endswith(".csv"):
-                self.df = pd.read_csv(file_path)
-            else:
-                self.df = pd.read_excel(file_path)
+            # Read in batches; .xlsx goes through openpyxl's read-only mode instead of a full workbook load
+            self.df = read_data(file_path)
 
             if self.df.empty:
                 QMessageBox.warning(self, "Error", "The file is empty!")
                 return
 
+            self.search_index = SearchIndex(self.df)
+
             self.filter_column.clear()
             self.filter_column.addItem("All Columns")
             self.filter_column.addItems(self.df.columns.tolist())
@@ -147,13 +150,7 @@ class MainApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to load file: {e}")
 
     def display_data_in_table(self, data):
-        self.table.setRowCount(data.shape[0])
-        self.table.setColumnCount(data.shape[1])
-        self.table.setHorizontalHeaderLabels(data.columns)
-
-        for i in range(data.shape[0]):
-            for j in range(data.shape[1]):
-                self.table.setItem(i, j, QTableWidgetItem(str(data.iat[i, j])))
+        display_table_data(self.table, data)
 
     def perform_search(self):
         if self.df is None:
@@ -168,29 +165,18 @@ class MainApp(QMainWindow):
             self.display_data_in_table(self.df)
             return
 
-        sub_queries = [q.strip() for q in search_query.split(',')]
-        filtered_data = self.df.copy()
-
-        for q in sub_queries:
-            if filter_column == "All Columns":
-                filtered_data = filtered_data[
-                    filtered_data.apply(lambda row: row.astype(str).str.contains(q, case=False, na=False).any(), axis=1)
-                ]
-            else:
-                if filter_type == "Contains":
-                    filtered_data = filtered_data[filtered_data[filter_column].astype(str).str.contains(q, case=False, na=False)]
-                elif filter_type == "Equals":
-                    filtered_data = filtered_data[filtered_data[filter_column].astype(str) == q]
-                elif filter_type == "Starts with":
-                    filtered_data = filtered_data[filtered_data[filter_column].astype(str).str.startswith(q, na=False)]
-
-        self.filtered_df = filtered_data
+        # Each comma term narrows the rows matched so far; refining an earlier search only filters its rows
+        rows = self.search_index.search([(q.strip(), filter_column, filter_type) for q in search_query.split(',')])
 
-        if self.filtered_df.empty:
+        if len(rows) == 0:
+            self.filtered_df = self.df.iloc[rows]
             QMessageBox.information(self, "No Results", "No matching records found.")
             return
 
-        self.display_data_in_table(self.filtered_df)
+        if self.table_model.dataframe is not self.df:
+            self.table_model.set_dataframe(self.df)
+        self.table_model.set_rows(rows)
+        self.filtered_df = self.table_model.visible_dataframe()
 
     def export_data(self, format):
         if self.filtered_df is None or self.filtered_df.empty:
@@ -362,51 +348,49 @@ class MainApp(QMainWindow):
         self.layout.addWidget(column_dropdown)
         self.box_column_map[rect] = column_dropdown
 
+    def current_layout(self):
+        """The boxes on screen as a BoxLayout, in the background image's pixel coordinates"""
+        boxes = [LayoutBox(dropdown.currentText(), rect.rect().x(), rect.rect().y(),
+                           rect.rect().width(), rect.rect().height())
+                 for rect, dropdown in self.box_column_map.items()]
+        canvas = None
+        if self.image_path:
+            pixmap = QPixmap(self.image_path)
+            canvas = (pixmap.width(), pixmap.height())
+        return BoxLayout(boxes, self.image_path, canvas)
+
     def save_structure(self):
-        structure = []
-        for rect, dropdown in self.box_column_map.items():
-            structure.append({
-                "x": rect.rect().x(),
-                "y": rect.rect().y(),
-                "width": rect.rect().width(),
-                "height": rect.rect().height(),
-                "column": dropdown.currentText()
-            })
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Structure", "", "JSON Files (*.json)")
         if file_path:
-            with open(file_path, 'w') as f:
-                json.dump(structure, f)
+            self.current_layout().save(file_path)
 
     def load_structure(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Load Structure", "", "JSON Files (*.json)")
         if file_path:
-            with open(file_path, 'r') as f:
-                structure = json.load(f)
+            try:
+                layout = BoxLayout.load(file_path)
+            except (ValueError, KeyError, TypeError) as e:
+                QMessageBox.critical(self, "Error", f"Invalid structure file: {str(e)}")
+                return
+            if layout.background and os.path.exists(layout.background):
+                self.image_path = layout.background
             self.box_column_map = {}
             self.graphics_scene.clear()
-            for item in structure:
-                rect = QGraphicsRectItem(item['x'], item['y'], item['width'], item['height'])
+            for box in layout.boxes:
+                rect = QGraphicsRectItem(box.x, box.y, box.width, box.height)
                 self.graphics_scene.addItem(rect)
                 column_dropdown = QComboBox()
                 column_dropdown.addItems(self.df.columns.tolist())
-                column_dropdown.setCurrentText(item['column'])
+                column_dropdown.setCurrentText(box.column)
                 self.layout.addWidget(column_dropdown)
                 self.box_column_map[rect] = column_dropdown
             self.create_pdf_preview()
 
     def generate_pdf_with_boxes(self, output_path):
-        doc = fitz.open()
-        page = doc.new_page()
-        if self.image_path:
-            rect = page.rect
-            page.insert_image(rect, filename=self.image_path)
-        for rect, column_dropdown in self.box_column_map.items():
-            column_name = column_dropdown.currentText()
-            text = str(self.df.iloc[0][column_name])
-            x = rect.rect().x()
-            y = rect.rect().y()
-            page.insert_text((x, y), text)
-        doc.save(output_path)
+        # Compiled once from the boxes; rendering every row needs no widgets
+        plan = self.current_layout().compile()
+        count = plan.write_merged((row for _, row in self.df.iterrows()), output_path)
+        logger.info(f"Generated {count} pages with boxes into {output_path}")
 
     def upload_template(self):
         docs_path = QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
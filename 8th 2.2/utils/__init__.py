@@ -1,10 +1,19 @@
-from .data_utils import filter_data, display_data
+from .data_utils import filter_data, match_rows, display_data
 from .file_utils import upload_file, export_filtered_data, save_df_as_pdf
 from .pdf_utils import load_pdf, add_text_to_pdf # Added add_text_to_pdf
 from .pdf_generator import generate_pdfs
+from .pdf_converter import get_converter, convert_documents
 from .data_mapper import DataMapper
 from .docx_filler import DocxFiller  # instead of fill_docx_template
+from .template_compiler import CompiledTemplate, compile_template
+from .placeholder_engine import PlaceholderEngine
+from .template_metadata import TemplateMetadataCache, template_metadata
+from .overlay_filler import OverlayTemplate, OverlayField
+from .box_layout import BoxLayout, LayoutBox, RenderPlan, compile_layout
 # from .invoice_generator import InvoiceGenerator
 from .theme_manager import ThemeManager
 from .gui_utils import create_table_widget, display_data as display_table_data
+from .table_model import DataFrameModel
+from .search_index import SearchIndex
+from .data_reader import iter_data_batches, read_data
 from .invoice_utils import generate_pdf_invoice
\ No newline at end of file
@@ -0,0 +1,118 @@
+from functools import lru_cache
+from num2words import num2words
+
+ONES = [
+    "Zero", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine",
+    "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen",
+    "Seventeen", "Eighteen", "Nineteen"
+]
+TENS = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
+
+# Indian grouping above the last three digits: (value, name)
+INDIAN_UNITS = [(10 ** 7, "Crore"), (10 ** 5, "Lakh"), (10 ** 3, "Thousand")]
+
+# Same upper bound as num2words' en_IN converter
+MAX_NATIVE = 10 ** 10
+
+AMOUNT_CACHE_SIZE = 8192
+
+
+def _below_hundred(n: int) -> str:
+    if n < 20:
+        return ONES[n]
+    tens, ones = divmod(n, 10)
+    return TENS[tens] if ones == 0 else f"{TENS[tens]}-{ONES[ones]}"
+
+
+def _below_thousand(n: int) -> str:
+    hundreds, rest = divmod(n, 100)
+    if hundreds == 0:
+        return _below_hundred(rest)
+    if rest == 0:
+        return f"{ONES[hundreds]} Hundred"
+    return f"{ONES[hundreds]} Hundred And {_below_hundred(rest)}"
+
+
+def number_in_words(n: int) -> str:
+    """
+    Whole number in Indian-English words (lakh/crore), title-cased exactly like
+    ``num2words(n, lang='en_IN').title()``.
+    """
+    if n < 0:
+        return f"Minus {number_in_words(-n)}"
+    if n >= MAX_NATIVE:
+        return num2words(n, lang='en_IN').title()
+    if n < 1000:
+        return _below_thousand(n)
+
+    parts = []
+    rest = n
+    for value, name in INDIAN_UNITS:
+        count, rest = divmod(rest, value)
+        if count:
+            parts.append(f"{_below_thousand(count)} {name}")
+
+    if rest:
+        # num2words joins a final group below one hundred with "And", larger ones with a comma
+        if rest < 100:
+            return f"{', '.join(parts)} And {_below_hundred(rest)}"
+        parts.append(_below_thousand(rest))
+    return ", ".join(parts)
+
+
+@lru_cache(maxsize=AMOUNT_CACHE_SIZE)
+def amount_in_words(amount: float) -> str:
+    """
+    Rupee amount in words, e.g. 1234.5 → 'One Thousand, Two Hundred And
+    Thirty-Four Rupees and Fifty Paise Only'. Results are cached, since the
+    same amounts repeat across a ledger.
+    """
+    if amount % 1 == 0:
+        return f"{number_in_words(int(amount))} Rupees Only"
+
+    rupees = int(amount)
+    paise = round((amount - rupees) * 100)
+    return f"{number_in_words(rupees)} Rupees and {number_in_words(paise)} Paise Only"
+
+
+def num2words_amount_in_words(amount: float) -> str:
+    """The previous num2words-based conversion, kept for comparison"""
+    if amount % 1 == 0:
+        return f"{num2words(int(amount), lang='en_IN').title()} Rupees Only"
+
+    rupees = int(amount)
+    paise = round((amount - rupees) * 100)
+    rupee_words = num2words(rupees, lang='en_IN').title()
+    paise_words = num2words(paise, lang='en_IN').title()
+    return f"{rupee_words} Rupees and {paise_words} Paise Only"
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python amount_words.py
+    import random
+    import timeit
+
+    random.seed(42)
+    distinct = [round(random.uniform(0, 10 ** 8), random.choice([0, 2])) for _ in range(2000)]
+    ledger = [random.choice(distinct) for _ in range(20000)]
+
+    mismatches = [a for a in distinct if amount_in_words.__wrapped__(a) != num2words_amount_in_words(a)]
+    print(f"Checked {len(distinct)} amounts against num2words: {len(mismatches)} mismatches")
+
+    def run_num2words():
+        for amount in ledger:
+            num2words_amount_in_words(amount)
+
+    def run_native():
+        for amount in ledger:
+            amount_in_words.__wrapped__(amount)
+
+    def run_cached():
+        amount_in_words.cache_clear()
+        for amount in ledger:
+            amount_in_words(amount)
+
+    for label, func in (("num2words", run_num2words), ("native", run_native), ("native + cache", run_cached)):
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        print(f"{label:>15}: {seconds * 1000:8.1f} ms for {len(ledger)} amounts "
+              f"({seconds / len(ledger) * 1e6:.2f} us each)")
@@ -0,0 +1,158 @@
+import os
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def default_worker_count() -> int:
+    """Number of worker processes to use when the user has not chosen one"""
+    return max(1, os.cpu_count() or 1)
+
+
+# A job carrying this key already has its result (a skipped row); it takes its place in the output order
+RESOLVED = 'resolved'
+
+
+def resolved_job(result: Dict) -> Dict:
+    """A job that needs no worker: ``run`` yields ``result`` in the job's place in the order"""
+    return {RESOLVED: result}
+
+
+def failed_result(job: Dict, error: str) -> Dict:
+    """Result record for a job that did not produce a document"""
+    return {
+        'index': job.get('index'),
+        'doc_type': job.get('doc_type'),
+        'ok': False,
+        'output': None,
+        'error': error
+    }
+
+
+def run_jobs(worker: Callable, jobs: List[Dict], per_chunk: bool = False) -> List[Dict]:
+    """Run a chunk of jobs inside one worker process, never letting one row abort the chunk"""
+    if per_chunk:
+        try:
+            return worker(jobs)
+        except Exception as e:
+            logging.error(f"Error processing rows {[job.get('index') for job in jobs]}: {str(e)}", exc_info=True)
+            return [failed_result(job, str(e)) for job in jobs]
+
+    results = []
+    for job in jobs:
+        try:
+            results.append(worker(job))
+        except Exception as e:
+            logging.error(f"Error processing row {job.get('index')}: {str(e)}", exc_info=True)
+            results.append(failed_result(job, str(e)))
+    return results
+
+
+class BatchEngine:
+    """
+    Spreads generation jobs over a pool of worker processes.
+
+    Jobs are plain dicts handed to ``worker`` (a module-level function so it
+    can be pickled) in chunks of ``chunk_size``. With ``per_chunk`` the worker
+    receives the whole chunk as a list and returns one result per job, which
+    lets it batch expensive steps such as PDF conversion. Results are yielded in the
+    same order the jobs were given, so progress can be reported row by row
+    while later chunks are still being rendered. Only a bounded number of
+    chunks is in flight at once, which keeps memory flat for large inputs.
+    Jobs made with ``resolved_job`` skip the worker but keep their place in
+    that order.
+    """
+
+    def __init__(self, worker: Callable, workers: Optional[int] = None, chunk_size: int = 4,
+                 per_chunk: bool = False):
+        self.worker = worker
+        self.workers = max(1, workers or default_worker_count())
+        self.chunk_size = max(1, chunk_size)
+        self.per_chunk = per_chunk
+        self._cancel_event = threading.Event()
+
+        # Per-row accounting
+        self.succeeded = 0
+        self.failed = 0
+        self.failures: List[Dict] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """Stop submitting work; chunks already running finish and their results are still yielded"""
+        self._cancel_event.set()
+
+    def run(self, jobs: Iterable[Dict]) -> Iterator[Dict]:
+        """Process jobs and yield one result dict per job, in input order"""
+        jobs = iter(jobs)
+
+        if self.workers == 1:
+            while not self.cancelled:
+                chunk = list(islice(jobs, self.chunk_size if self.per_chunk else 1))
+                if not chunk:
+                    break
+                work = [job for job in chunk if RESOLVED not in job]
+                yield from self._merge(chunk, run_jobs(self.worker, work, self.per_chunk) if work else [])
+            return
+
+        max_in_flight = self.workers * 2
+        pending = deque()
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while not self.cancelled:
+                chunk = list(islice(jobs, self.chunk_size))
+                if not chunk:
+                    break
+                work = [job for job in chunk if RESOLVED not in job]
+                future = executor.submit(run_jobs, self.worker, work, self.per_chunk) if work else None
+                pending.append((future, chunk))
+
+                while len(pending) >= max_in_flight and not self.cancelled:
+                    yield from self._collect(*pending.popleft())
+
+            while pending and not self.cancelled:
+                yield from self._collect(*pending.popleft())
+
+            # Cancelled: drop the chunks no worker has picked up; the running ones write
+            # their output anyway, so their results are reported like any other
+            for future, _chunk in pending:
+                if future is not None:
+                    future.cancel()
+            while pending:
+                future, chunk = pending.popleft()
+                if future is None or not future.cancelled():
+                    yield from self._collect(future, chunk)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _collect(self, future, chunk: List[Dict]) -> Iterator[Dict]:
+        work = [job for job in chunk if RESOLVED not in job]
+        try:
+            results = future.result() if future is not None else []
+        except Exception as e:
+            logging.error(f"Worker failed on rows {[job.get('index') for job in work]}: {str(e)}")
+            results = [failed_result(job, str(e)) for job in work]
+        yield from self._merge(chunk, results)
+
+    def _merge(self, chunk: List[Dict], results: List[Dict]) -> Iterator[Dict]:
+        """The chunk's results in job order: resolved jobs' own, the rest from the worker"""
+        results = iter(results)
+        for job in chunk:
+            if RESOLVED in job:
+                result = job[RESOLVED]
+            else:
+                result = next(results, None) or failed_result(job, "worker returned no result")
+            yield self._account(result)
+
+    def _account(self, result: Dict) -> Dict:
+        if result.get('ok'):
+            self.succeeded += 1
+        else:
+            self.failed += 1
+            self.failures.append(result)
+        return result
@@ -1,16 +1,29 @@
 import os
-import re
 import logging
 from docx import Document
 import pandas as pd
 from typing import List, Optional, Set, Dict
 from datetime import datetime
-from num2words import num2words
+from utils.amount_words import amount_in_words
 from docx.shared import Pt
-from PyQt5.QtWidgets import QMessageBox
+from utils.template_compiler import compile_template
+from utils.placeholder_engine import PlaceholderEngine
+from utils.template_metadata import template_placeholders
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
+# {{PLACEHOLDER}} filled in one pass; placeholders without a value are left in place
+PLACEHOLDERS = PlaceholderEngine(missing_value=None, single_braces=False)
+
+
+def collapse_paragraph(paragraph):
+    """Collapse a placeholder paragraph into a single 10pt run, as replace_in_paragraph does"""
+    text = ''.join(run.text for run in paragraph.runs)
+    paragraph.clear()
+    run = paragraph.add_run(text)
+    run.font.size = Pt(10)
+
+
 class DataMapper:
     def __init__(self, parent=None):
         self.parent = parent
@@ -50,37 +63,30 @@ class DataMapper:
         ]
         return df
 
-    def map_data_to_docx(parent, template_path: str, data: pd.DataFrame, output_folder: str) -> Optional[List[str]]:
-        mapper = DataMapper()
-
-        self.parent = parent
-
+    def map_data_to_docx(self, template_path: str, data: pd.DataFrame, output_folder: str) -> Optional[List[str]]:
         try:
-            if not self.validate_inputs(template_path, data, output_folder):
-                return None
+            self.validate_inputs(template_path, data, output_folder)
 
             os.makedirs(output_folder, exist_ok=True)
             generated_files = []
             template_placeholders = self.scan_template_placeholders(template_path)
 
+            # Parse the template once; every row only fills the compiled placeholder slots
+            compiled = compile_template(template_path, paragraph_hook=collapse_paragraph)
+
             logging.info(f"Template placeholders: {template_placeholders}")
             logging.info(f"Data columns: {data.columns.tolist()}")
 
             for idx, row in data.iterrows():
                 try:
-                    doc = Document(template_path)
                     row_data = self.prepare_row_data(row, template_placeholders)
 
                     # Debug output for first row
                     if idx == 0:
                         self.log_debug_info(row, template_placeholders, row_data)
 
-                    if not self.replace_all_placeholders(doc, row_data):
-                        logging.error(f"Skipping row {idx} due to replacement errors")
-                        continue
-
                     output_path = self.generate_output_path(output_folder, row_data, idx)
-                    doc.save(output_path)
+                    compiled.render_to_file(output_path, row_data, missing_value=None)
                     generated_files.append(output_path)
                     logging.info(f"Generated: {output_path}")
 
@@ -92,52 +98,25 @@ class DataMapper:
 
         except Exception as e:
             logging.error(f"Fatal error: {str(e)}", exc_info=True)
-            QMessageBox.critical(self.parent, "Error", f"Failed to generate documents: {str(e)}")
-            return None
+            raise
 
     def validate_inputs(self, template_path: str, data: pd.DataFrame, output_folder: str) -> bool:
-        """Validate all input parameters"""
+        """Validate all input parameters; raises with the reason when one is unusable"""
         if not os.path.exists(template_path):
-            QMessageBox.critical(self.parent, "Error", f"Template file not found: {template_path}")
-            return False
+            raise FileNotFoundError(f"Template file not found: {template_path}")
 
         if data.empty:
-            QMessageBox.critical(self.parent, "Error", "No data provided in DataFrame")
-            return False
+            raise ValueError("No data provided in DataFrame")
 
         try:
             os.makedirs(output_folder, exist_ok=True)
-            return True
-        except Exception as e:
-            QMessageBox.critical(self.parent, "Error", f"Output folder not writable: {str(e)}")
-            return False
+        except OSError as e:
+            raise OSError(f"Output folder not writable: {str(e)}") from e
+        return True
 
     def scan_template_placeholders(self, template_path: str) -> Set[str]:
-        """Extract all unique placeholders from a DOCX template"""
-        doc = Document(template_path)
-        placeholders = set()
-        placeholder_pattern = re.compile(r"\{\{\s*(.*?)\s*\}\}")  # Handles whitespace
-
-        def extract_from_text(text: str):
-            return {match.strip() for match in placeholder_pattern.findall(text)}
-
-        # Process all document components
-        components = [
-            doc.paragraphs,
-            *[cell.paragraphs for table in doc.tables
-              for row in table.rows
-              for cell in row.cells],
-            *[section.header.paragraphs for section in doc.sections],
-            *[section.footer.paragraphs for section in doc.sections]
-        ]
-
-        for paragraphs in components:
-            for paragraph in paragraphs:
-                placeholders.update(extract_from_text(paragraph.text))
-                for run in paragraph.runs:
-                    placeholders.update(extract_from_text(run.text))
-
-        return {ph for ph in placeholders if ph}  # Remove empty strings
+        """Extract all unique placeholders from a DOCX template (cached per template version)"""
+        return set(template_placeholders(template_path))
 
     def prepare_row_data(self, row: pd.Series, template_placeholders: Set[str]) -> Dict[str, str]:
         """Prepare complete row data with all required fields and proper formatting"""
@@ -152,10 +131,9 @@ class DataMapper:
             if norm_ph == 'amount_in_words':
                 try:
                     amount = float(row['AMOUNT'])
-                    words = num2words(amount, lang='en_IN').title()
+                    words = amount_in_words(amount)
                     # Ensure proper formatting
-                    words = words.replace('And', 'and')  # Fix capitalization
-                    row_data['amount_in_words'] = f"{words} Rupees Only"
+                    row_data['amount_in_words'] = words.replace('And', 'and')  # Fix capitalization
                 except Exception as e:
                     logging.error(f"Amount to words failed: {str(e)}")
                     row_data['amount_in_words'] = ""
@@ -213,14 +191,8 @@ class DataMapper:
         # First combine all runs to handle split placeholders
         full_text = ''.join(run.text for run in paragraph.runs)
 
-        # Skip if no placeholders
-        if not any(f'{{{{{ph}}}}}' in full_text for ph in row_data):
-            return
-
-        # Perform all replacements
-        modified_text = full_text
-        for ph, value in row_data.items():
-            modified_text = modified_text.replace(f'{{{{{ph}}}}}', value)
+        # One pass over the text, whatever the number of placeholders
+        modified_text = PLACEHOLDERS.substitute(full_text, row_data)
 
         # Only update if changes were made
         if modified_text != full_text:
@@ -0,0 +1,236 @@
+import os
+import logging
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+DEFAULT_BATCH_SIZE = 2000
+
+# Files at least this large are streamed in batches instead of loaded whole
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Rows shown in the preview table when a file is streamed
+PREVIEW_ROWS = 1000
+
+STREAMABLE_EXCEL = ('.xlsx', '.xlsm')
+
+# Error values a formula cell can hold; pd.read_excel reads them as missing
+EXCEL_ERRORS = ('#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A')
+
+Cleaner = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+def should_stream(file_path: str) -> bool:
+    """True if the file is big enough to be processed in batches"""
+    try:
+        return os.path.getsize(file_path) >= STREAMING_THRESHOLD_BYTES
+    except OSError:
+        return False
+
+
+def _column_names(header: Sequence) -> List[str]:
+    """Header cells as column names, filling blanks and de-duplicating like pandas"""
+    names, seen = [], {}
+    for position, value in enumerate(header):
+        name = f"Unnamed: {position}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _cell_value(value):
+    """Excel cell as pd.read_excel hands it to its parser"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in EXCEL_ERRORS:
+        return np.nan
+    return value
+
+
+def iter_excel_rows(file_path: str, sheet_name=0) -> Iterator[tuple]:
+    """
+    Yield the rows of a worksheet as tuples of cell values, header first.
+    The workbook is opened read-only, so only the current row is held in memory.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        blank = []
+        for row in sheet.iter_rows(values_only=True):
+            # Formatted but empty rows at the end of a sheet are dropped, as pandas does
+            if all(value is None or value == "" for value in row):
+                blank.append(row)
+                continue
+            yield from blank
+            blank.clear()
+            yield row
+    finally:
+        workbook.close()
+
+
+def _iter_excel_batches(file_path, batch_size, names, skip_rows, as_text, na_values):
+    rows = iter_excel_rows(file_path)
+    try:
+        header = next(rows)
+    except StopIteration:
+        return
+    columns = list(names) if names else _column_names(header)
+    width = len(columns)
+    options = {'skip_blank_lines': False}
+    if as_text:
+        options['dtype'] = str
+    if na_values is not None:
+        options.update(na_values=list(na_values), keep_default_na=False)
+
+    for _ in islice(rows, skip_rows):
+        pass
+
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+        # Read-only sheets can yield ragged rows; pad or trim them to the header
+        chunk = [[_cell_value(value) for value in row[:width]] + [""] * (width - len(row)) for row in chunk]
+        # The parser pd.read_excel uses, so numeric-looking text, NA markers
+        # and empty cells come back with the dtypes a full read gives them
+        yield TextParser(chunk, header=None, names=columns, **options).read()
+
+
+def _iter_csv_batches(file_path, batch_size, names, skip_rows, as_text, na_values):
+    options = {'chunksize': batch_size, 'encoding': 'utf-8'}
+    if names:
+        options.update(header=0, names=list(names))
+    if skip_rows:
+        options['skiprows'] = range(1, 1 + skip_rows)
+    if as_text:
+        options['dtype'] = str
+    if na_values is not None:
+        options.update(na_values=list(na_values), keep_default_na=False)
+
+    with pd.read_csv(file_path, **options) as reader:
+        yield from reader
+
+
+def iter_data_batches(file_path: str, batch_size: int = DEFAULT_BATCH_SIZE, clean: Optional[Cleaner] = None,
+                      names: Optional[Sequence[str]] = None, skip_rows: int = 0, as_text: bool = False,
+                      na_values: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read an Excel or CSV file as a stream of DataFrames of up to ``batch_size`` rows.
+
+    .xlsx/.xlsm files go through openpyxl's read-only mode and CSV files
+    through pandas' chunked reader, so memory depends on the batch size, not
+    the file size. Legacy .xls files cannot be streamed and are loaded whole,
+    then sliced. Each batch is passed through ``clean`` if given and keeps
+    the row numbers it would have had in a full read, so row indices in logs
+    and output names match a non-streamed run.
+
+    Cells are parsed the way ``pd.read_excel``/``pd.read_csv`` parse them,
+    but dtypes are inferred per batch: numeric-looking text reads as numbers
+    in a batch where the whole column looks numeric, even if a later batch
+    holds text in that column.
+
+    names:     column names to use instead of the header row
+    skip_rows: data rows to skip directly after the header
+    as_text:   read every cell as text (like ``dtype=str``)
+    na_values: cell texts to read as missing
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    batch_size = max(1, batch_size)
+
+    if ext == '.csv':
+        batches = _iter_csv_batches(file_path, batch_size, names, skip_rows, as_text, na_values)
+    elif ext in STREAMABLE_EXCEL:
+        batches = _iter_excel_batches(file_path, batch_size, names, skip_rows, as_text, na_values)
+    elif ext == '.xls':
+        logging.warning(f"{file_path}: .xls workbooks cannot be streamed; loading the whole sheet")
+        options = {'skiprows': range(1, 1 + skip_rows) if skip_rows else None}
+        if names:
+            options['names'] = list(names)
+        if as_text:
+            options['dtype'] = str
+        if na_values is not None:
+            options.update(na_values=list(na_values), keep_default_na=False)
+        df = pd.read_excel(file_path, **options)
+        batches = (df.iloc[start:start + batch_size] for start in range(0, len(df), batch_size))
+    else:
+        raise ValueError(f"Unsupported file format: {file_path}")
+
+    offset = 0
+    for batch in batches:
+        size = len(batch)
+        batch.index = pd.RangeIndex(offset, offset + size)
+        offset += size
+        if clean is not None:
+            batch = clean(batch)
+        if len(batch):
+            yield batch
+
+
+def read_preview(file_path: str, rows: int = PREVIEW_ROWS, **options) -> pd.DataFrame:
+    """The first ``rows`` rows of a file, read without loading the rest"""
+    batches = iter_data_batches(file_path, batch_size=rows, **options)
+    try:
+        return next(batches, pd.DataFrame())
+    finally:
+        batches.close()
+
+
+def read_data(file_path: str, batch_size: int = DEFAULT_BATCH_SIZE, **options) -> pd.DataFrame:
+    """
+    A whole file as one DataFrame, read through the streaming batches.
+    Peak memory stays close to the size of the result, unlike
+    ``pd.read_excel``, which builds the full workbook in memory first.
+    A file that fits in one batch reads exactly as ``pd.read_excel`` reads
+    it; past that, a column mixing numeric-looking and other text can hold
+    numbers from some batches and strings from others.
+    """
+    batches = list(iter_data_batches(file_path, batch_size=batch_size, **options))
+    if not batches:
+        return pd.DataFrame()
+    if len(batches) == 1:
+        return batches[0]
+    # A batch of blanks can infer object dtype for a numeric column; re-infer after joining
+    return pd.concat(batches).infer_objects()
+
+
+def estimate_row_count(file_path: str) -> Optional[int]:
+    """
+    Number of data rows, from the worksheet's recorded dimensions or by
+    counting lines in a CSV. Used for progress only: quoted line breaks and
+    blank trailing rows make it approximate. None if it cannot be told cheaply.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
+        if ext == '.csv':
+            lines = 0
+            last = b"\n"
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    lines += block.count(b"\n")
+                    last = block[-1:]
+            if last != b"\n":
+                lines += 1
+            return max(0, lines - 1)
+
+        if ext in STREAMABLE_EXCEL:
+            from openpyxl import load_workbook
+            workbook = load_workbook(file_path, read_only=True)
+            try:
+                max_row = workbook.worksheets[0].max_row
+            finally:
+                workbook.close()
+            return None if max_row is None else max(0, max_row - 1)
+    except Exception as e:
+        logging.warning(f"Could not estimate rows in {file_path}: {str(e)}")
+    return None
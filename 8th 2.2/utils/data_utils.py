@@ -1,30 +1,49 @@
 # (Your original data_utils.py content)
+import numpy as np
 import pandas as pd
-from PyQt5.QtWidgets import QMessageBox, QTableWidgetItem
-
-def filter_data(df, search_query, sub_query, main_column, sub_column, filter_type):
-    filtered_data = df.copy()
-
-    if search_query:
-        if main_column == "All Columns":
-            filtered_data = filtered_data[
-                filtered_data.apply(lambda row: row.astype(str).str.contains(search_query, case=False, na=False).any(), axis=1)
-            ]
-        else:
-            if filter_type == "Contains":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str).str.contains(search_query, case=False, na=False)]
-            elif filter_type == "Equals":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str) == search_query]
-            elif filter_type == "Starts with":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str).str.startswith(search_query, na=False)]
-
-    if sub_query:
-        if sub_column == "All Columns":
-            filtered_data = filtered_data[
-                filtered_data.apply(lambda row: row.astype(str).str.contains(sub_query, case=False, na=False).any(), axis=1)
-            ]
-        else:
-            filtered_data = filtered_data[filtered_data[sub_column].astype(str).str.contains(sub_query, case=False, na=False)]
+from PyQt5.QtWidgets import QMessageBox
+from .table_model import DataFrameModel
+
+def _column_mask(series, query, filter_type):
+    values = series.astype(str)
+    if filter_type == "Equals":
+        return (values == query).to_numpy(dtype=bool)
+    if filter_type == "Starts with":
+        return values.str.startswith(query, na=False).to_numpy(dtype=bool)
+    return values.str.contains(query, case=False, na=False, regex=False).to_numpy(dtype=bool)
+
+def match_rows(df, query, column="All Columns", filter_type="Contains", rows=None, index=None):
+    """
+    Row positions of ``df`` that match ``query``. When ``rows`` is given only
+    those positions are tested, so successive queries narrow the previous
+    result instead of re-scanning (or copying) the whole frame. Pass the
+    SearchIndex built for ``df`` at load time to avoid scanning at all.
+    """
+    if index is not None:
+        return index.match(query, column, filter_type, rows)
+
+    if rows is None:
+        rows = np.arange(len(df), dtype=np.intp)
+    if not query or len(rows) == 0:
+        return rows
+
+    subset = df.iloc[rows]
+    if column == "All Columns":
+        mask = np.zeros(len(rows), dtype=bool)
+        for position in range(subset.shape[1]):
+            mask |= _column_mask(subset.iloc[:, position], query, filter_type)
+    else:
+        mask = _column_mask(subset[column], query, filter_type)
+
+    return rows[mask]
+
+def filter_data(df, search_query, sub_query, main_column, sub_column, filter_type, index=None):
+    if index is not None:
+        rows = index.search([(search_query, main_column, filter_type), (sub_query, sub_column, "Contains")])
+    else:
+        rows = match_rows(df, search_query, main_column, filter_type)
+        rows = match_rows(df, sub_query, sub_column, "Contains", rows)
+    filtered_data = df.iloc[rows]
 
     if filtered_data.empty:
         QMessageBox.showinfo("No Results", "No matching records found.")
@@ -33,11 +52,9 @@ def filter_data(df, search_query, sub_query, main_column, sub_column, filter_typ
     return filtered_data
 
 def display_data(table, data, sort_orders):
-    table.setRowCount(0)
-    table.setColumnCount(len(data.columns))
-    table.setHorizontalHeaderLabels(list(data.columns))
-
-    for i, row in data.iterrows():
-        for j, col in enumerate(data.columns):
-            item = QTableWidgetItem(str(row[col]))
-            table.setItem(i, j, item)
\ No newline at end of file
+    """Shows ``data`` in a table view backed by a DataFrameModel."""
+    model = table.model()
+    if not isinstance(model, DataFrameModel):
+        model = DataFrameModel(parent=table)
+        table.setModel(model)
+    model.set_dataframe(data)
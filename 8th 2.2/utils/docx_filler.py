@@ -1,13 +1,12 @@
 import os
-import re
 import logging
 from docx import Document
 import pandas as pd
 from docx.shared import Pt
 from typing import Dict, List, Optional, Set
-from num2words import num2words
-from PyQt5.QtWidgets import QMessageBox
+from utils.amount_words import amount_in_words
 from datetime import datetime
+from utils.template_metadata import template_placeholders
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
@@ -19,8 +18,7 @@ class DocxFiller:
     def fill_template(self, template_path: str, data: pd.DataFrame, output_folder: str) -> Optional[List[str]]:
         """Main function to fill DOCX templates with data"""
         try:
-            if not self.validate_inputs(template_path, data, output_folder):
-                return None
+            self.validate_inputs(template_path, data, output_folder)
 
             os.makedirs(output_folder, exist_ok=True)
             generated_files = []
@@ -29,11 +27,7 @@ class DocxFiller:
             # Check for missing placeholders in data
             missing_placeholders = self.check_missing_placeholders(template_placeholders, data)
             if missing_placeholders:
-                QMessageBox.warning(
-                    self.parent,
-                    "Warning",
-                    f"Template placeholders not found in data:\n{', '.join(missing_placeholders)}"
-                )
+                logging.warning(f"Template placeholders not found in data: {', '.join(missing_placeholders)}")
 
             for idx, row in data.iterrows():
                 try:
@@ -56,25 +50,21 @@ class DocxFiller:
 
         except Exception as e:
             logging.error(f"Fatal error: {str(e)}", exc_info=True)
-            QMessageBox.critical(self.parent, "Error", f"Failed to fill templates: {str(e)}")
-            return None
+            raise
 
     def validate_inputs(self, template_path: str, data: pd.DataFrame, output_folder: str) -> bool:
-        """Validate all input parameters"""
+        """Validate all input parameters; raises with the reason when one is unusable"""
         if not os.path.exists(template_path):
-            QMessageBox.critical(self.parent, "Error", f"Template file not found: {template_path}")
-            return False
+            raise FileNotFoundError(f"Template file not found: {template_path}")
 
         if data.empty:
-            QMessageBox.critical(self.parent, "Error", "No data provided in DataFrame")
-            return False
+            raise ValueError("No data provided in DataFrame")
 
         try:
             os.makedirs(output_folder, exist_ok=True)
-            return True
-        except Exception as e:
-            QMessageBox.critical(self.parent, "Error", f"Output folder not writable: {str(e)}")
-            return False
+        except OSError as e:
+            raise OSError(f"Output folder not writable: {str(e)}") from e
+        return True
 
     def check_missing_placeholders(self, template_placeholders: Set[str], data: pd.DataFrame) -> Set[str]:
         """Check which template placeholders are missing from the data columns"""
@@ -92,9 +82,8 @@ class DocxFiller:
         if 'amount_in_words' in template_placeholders and 'AMOUNT' in row:
             try:
                 amount = float(row['AMOUNT'])
-                words = num2words(amount, lang='en_IN').title()
-                words = words.replace(' And ', ' and ')  # Fix capitalization
-                row_data['amount_in_words'] = f"{words} Rupees Only"
+                words = amount_in_words(amount)
+                row_data['amount_in_words'] = words.replace(' And ', ' and ')  # Fix capitalization
             except Exception as e:
                 logging.error(f"Amount to words failed: {str(e)}")
                 row_data['amount_in_words'] = ""
@@ -205,32 +194,8 @@ class DocxFiller:
         return str(value).strip()
 
     def extract_placeholders(self, template_path: str) -> Set[str]:
-        """Extract all unique placeholders from a DOCX template"""
-        doc = Document(template_path)
-        placeholders = set()
-        placeholder_pattern = re.compile(r'\{\{\s*(.*?)\s*\}\}')  # Handles whitespace
-
-        def extract_from_text(text: str):
-            """Inner function to extract placeholders from text"""
-            return {match.strip() for match in placeholder_pattern.findall(text)}
-
-        # Process all document components
-        components = [
-            doc.paragraphs,
-            *[cell.paragraphs for table in doc.tables
-              for row in table.rows
-              for cell in row.cells],
-            *[section.header.paragraphs for section in doc.sections],
-            *[section.footer.paragraphs for section in doc.sections]
-        ]
-
-        for paragraphs in components:
-            for paragraph in paragraphs:
-                placeholders.update(extract_from_text(paragraph.text))
-                for run in paragraph.runs:
-                    placeholders.update(extract_from_text(run.text))
-
-        return {ph for ph in placeholders if ph}  # Remove empty strings
+        """Extract all unique placeholders from a DOCX template (cached per template version)"""
+        return set(template_placeholders(template_path))
 
     def generate_output_path(self, output_folder: str, row_data: dict, idx: int) -> str:
         """Generate output path with invoice number if available"""
@@ -0,0 +1,645 @@
+import io
+import os
+import logging
+from typing import Dict, List, Optional, Union
+from xml.sax.saxutils import escape
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from lxml import etree
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import BaseDocTemplate, Frame, Indenter, PageBreak, PageTemplate, Paragraph, Table, TableStyle
+
+EMU_PER_POINT = 12700
+
+DRAWING_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+ALIGNMENTS = {
+    'left': TA_LEFT, 'start': TA_LEFT,
+    'center': TA_CENTER,
+    'right': TA_RIGHT, 'end': TA_RIGHT,
+    'both': TA_JUSTIFY, 'distribute': TA_JUSTIFY,
+}
+
+# Word fonts mapped onto the PDF base-14 families (no embedding, so output stays small and stable)
+SERIF_FONTS = ('times', 'cambria', 'georgia', 'garamond', 'book antiqua', 'palatino')
+MONO_FONTS = ('courier', 'consolas', 'mono')
+
+# Narrow fonts (Arial Narrow, Aptos Narrow) have no base-14 counterpart; they
+# are set in the regular face scaled down to about their width, so text wraps
+# where it does in Word
+NARROW_FONTS = ('narrow', 'condensed', 'compressed')
+NARROW_SCALE = 0.82
+
+# Height of a single-spaced line in Word as a multiple of the font size
+# (the font's ascent, descent and line gap), by font name
+LINE_HEIGHTS = (('calibri', 1.22), ('aptos', 1.22), ('cambria', 1.17), ('consolas', 1.17), ('courier', 1.13))
+DEFAULT_LINE_HEIGHT = 1.15  # Arial, Times New Roman and most other fonts
+
+# The base-14 fonts only cover WinAnsi; runs with other characters (such as
+# the rupee sign) use the first of these TrueType fonts found, embedded
+UNICODE_FONT = 'DocxUnicode'
+UNICODE_FONT_FILES = (
+    ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf'),
+    ('Nirmala.ttf', 'NirmalaB.ttf'),
+    ('arialuni.ttf', None),
+    ('FreeSans.ttf', 'FreeSansBold.ttf'),
+)
+FONT_DIRS = (
+    '/usr/share/fonts/truetype/dejavu', '/usr/share/fonts/dejavu', '/usr/share/fonts/TTF',
+    '/usr/share/fonts/truetype/freefont', '/Library/Fonts', '/System/Library/Fonts/Supplemental',
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+)
+_unicode_font: Optional[str] = None
+_unicode_font_searched = False
+
+BORDER_EDGES = ('top', 'left', 'bottom', 'right', 'insideH', 'insideV')
+
+
+def _twips(value, default: float = 0.0) -> float:
+    """Convert a twentieth-of-a-point attribute to points"""
+    try:
+        return int(value) / 20.0
+    except (TypeError, ValueError):
+        return default
+
+
+def _on(element) -> Optional[bool]:
+    """Value of a toggle property such as <w:b/> or <w:b w:val="0"/>"""
+    if element is None:
+        return None
+    return element.get(qn('w:val')) not in ('0', 'false', 'off')
+
+
+def _pdf_font(name: Optional[str]) -> str:
+    name = (name or '').lower()
+    if any(font in name for font in MONO_FONTS):
+        return 'Courier'
+    if any(font in name for font in SERIF_FONTS):
+        return 'Times-Roman'
+    return 'Helvetica'
+
+
+def _line_height(name: Optional[str]) -> float:
+    name = (name or '').lower()
+    for font, height in LINE_HEIGHTS:
+        if font in name:
+            return height
+    return DEFAULT_LINE_HEIGHT
+
+
+def _find_font_file(file_name: Optional[str]) -> Optional[str]:
+    if not file_name:
+        return None
+    for folder in FONT_DIRS:
+        path = os.path.join(folder, file_name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _unicode_pdf_font() -> Optional[str]:
+    """Register the embedded font for text outside WinAnsi on first use; None when none is installed"""
+    global _unicode_font, _unicode_font_searched
+    if _unicode_font_searched:
+        return _unicode_font
+    _unicode_font_searched = True
+
+    for regular, bold in UNICODE_FONT_FILES:
+        regular_path = _find_font_file(regular)
+        if regular_path is None:
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(UNICODE_FONT, regular_path))
+            bold_name = UNICODE_FONT
+            bold_path = _find_font_file(bold)
+            if bold_path is not None:
+                bold_name = f'{UNICODE_FONT}-Bold'
+                pdfmetrics.registerFont(TTFont(bold_name, bold_path))
+            pdfmetrics.registerFontFamily(UNICODE_FONT, normal=UNICODE_FONT, bold=bold_name,
+                                          italic=UNICODE_FONT, boldItalic=bold_name)
+        except Exception as e:
+            logging.error(f"Could not load font {regular_path}: {str(e)}")
+            continue
+        _unicode_font = UNICODE_FONT
+        logging.info(f"Embedding {regular_path} for text outside the standard PDF fonts")
+        break
+    else:
+        logging.warning("No Unicode TrueType font found; characters outside WinAnsi will not render")
+    return _unicode_font
+
+
+def _needs_unicode_font(text: str) -> bool:
+    try:
+        text.encode('cp1252')
+        return False
+    except UnicodeEncodeError:
+        return True
+
+
+class DocxPdfRenderer:
+    """
+    Lays out a filled DOCX directly as PDF with ReportLab.
+
+    Covers what the invoice and tax note templates use: paragraphs with run
+    formatting, alignment and spacing, tables with grid spans, vertical merges,
+    borders and shading, and header/footer paragraphs. Only the first section's
+    page setup is used. Output is generated with ReportLab's invariant mode, so
+    the same input always gives the same bytes.
+    """
+
+    def __init__(self, source: Union[bytes, str, "Document"]):
+        if isinstance(source, bytes):
+            source = Document(io.BytesIO(source))
+        elif isinstance(source, str):
+            source = Document(source)
+        self.doc = source
+
+        self.styles: Dict[str, object] = {}
+        self.default_paragraph_style = None
+        self.default_table_style = None
+        for style in self.doc.styles.element.findall(qn('w:style')):
+            style_id = style.get(qn('w:styleId'))
+            self.styles[style_id] = style
+            if style.get(qn('w:default')) in ('1', 'true'):
+                if style.get(qn('w:type')) == 'paragraph':
+                    self.default_paragraph_style = style_id
+                elif style.get(qn('w:type')) == 'table':
+                    self.default_table_style = style_id
+
+        defaults = self.doc.styles.element.find(qn('w:docDefaults'))
+        self.default_rpr = defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}") if defaults is not None else None
+        self.default_ppr = defaults.find(f"{qn('w:pPrDefault')}/{qn('w:pPr')}") if defaults is not None else None
+
+        section = self.doc.sections[0]
+        self.page_width = (section.page_width or 7772400) / EMU_PER_POINT
+        self.page_height = (section.page_height or 10058400) / EMU_PER_POINT
+        self.left_margin = (section.left_margin or 914400) / EMU_PER_POINT
+        self.right_margin = (section.right_margin or 914400) / EMU_PER_POINT
+        self.top_margin = (section.top_margin or 914400) / EMU_PER_POINT
+        self.bottom_margin = (section.bottom_margin or 914400) / EMU_PER_POINT
+        self.header_distance = (section.header_distance or 457200) / EMU_PER_POINT
+        self.footer_distance = (section.footer_distance or 457200) / EMU_PER_POINT
+        self.section = section
+        self.page_borders = section._sectPr.find(qn('w:pgBorders'))
+
+        # Fonts the runs refer to through the theme (asciiTheme="minorHAnsi")
+        self.theme_fonts: Dict[str, str] = {}
+        for rel in self.doc.part.rels.values():
+            if rel.reltype == RT.THEME and not rel.is_external:
+                theme = etree.fromstring(rel.target_part.blob)
+                for kind in ('minor', 'major'):
+                    latin = theme.find(f'.//{{{DRAWING_NS}}}{kind}Font/{{{DRAWING_NS}}}latin')
+                    if latin is not None:
+                        self.theme_fonts[kind] = latin.get('typeface')
+
+    # ---- style resolution -------------------------------------------------
+
+    def _style_elements(self, style_id: Optional[str]) -> List:
+        """A style and the styles it is based on, lowest precedence first"""
+        chain = []
+        seen = set()
+        while style_id and style_id in self.styles and style_id not in seen:
+            seen.add(style_id)
+            chain.append(self.styles[style_id])
+            based_on = self.styles[style_id].find(qn('w:basedOn'))
+            style_id = based_on.get(qn('w:val')) if based_on is not None else None
+        return list(reversed(chain))
+
+    def _style_chain(self, style_id: Optional[str], child: str) -> List:
+        """pPr/rPr/tblPr elements of a style and its ancestors, lowest precedence first"""
+        return [style.find(qn(child)) for style in self._style_elements(style_id)
+                if style.find(qn(child)) is not None]
+
+    def _conditional(self, style_id: Optional[str], kinds: List[str], child: str) -> List:
+        """Conditional table style formatting (first row, first column...) that applies to a cell"""
+        elements = []
+        for style in self._style_elements(style_id):
+            for kind in kinds:
+                for conditional in style.findall(qn('w:tblStylePr')):
+                    if conditional.get(qn('w:type')) == kind:
+                        element = conditional.find(qn(child))
+                        if element is not None:
+                            elements.append(element)
+        return elements
+
+    @staticmethod
+    def _lookup(elements: List, tag: str):
+        """Highest-precedence child ``tag`` across property elements"""
+        for element in reversed(elements):
+            found = element.find(qn(tag))
+            if found is not None:
+                return found
+        return None
+
+    @staticmethod
+    def _lookup_attr(elements: List, tag: str, attr: str):
+        for element in reversed(elements):
+            found = element.find(qn(tag))
+            if found is not None and found.get(qn(attr)) is not None:
+                return found.get(qn(attr))
+        return None
+
+    def _font_name(self, rprs: List) -> Optional[str]:
+        """Word font of a run, resolving theme fonts"""
+        for element in reversed(rprs):
+            fonts = element.find(qn('w:rFonts'))
+            if fonts is None:
+                continue
+            theme = fonts.get(qn('w:asciiTheme'))
+            if theme:
+                return self.theme_fonts.get('major' if theme.startswith('major') else 'minor')
+            if fonts.get(qn('w:ascii')):
+                return fonts.get(qn('w:ascii'))
+        return None
+
+    # ---- paragraphs -------------------------------------------------------
+
+    def _paragraph(self, p, table_ppr: List, table_rpr: List) -> List:
+        ppr = p.find(qn('w:pPr'))
+        style_id = self.default_paragraph_style
+        if ppr is not None and ppr.find(qn('w:pStyle')) is not None:
+            style_id = ppr.find(qn('w:pStyle')).get(qn('w:val'))
+
+        style_ppr = self._style_chain(style_id, 'w:pPr')
+        if style_id == self.default_paragraph_style:
+            # Word lets a table style's paragraph properties override the Normal style,
+            # so table text is single spaced even when Normal is not
+            style_ppr, table_ppr = table_ppr, style_ppr
+        pprs = ([self.default_ppr] if self.default_ppr is not None else []) + table_ppr + \
+            style_ppr + ([ppr] if ppr is not None else [])
+        base_rprs = ([self.default_rpr] if self.default_rpr is not None else []) + table_rpr + \
+            self._style_chain(style_id, 'w:rPr')
+
+        markup = []
+        sizes = []
+        heights = []  # Single line height of each run
+        page_break = False
+        for r in p.iter(qn('w:r')):
+            rpr = r.find(qn('w:rPr'))
+            rprs = list(base_rprs)
+            if rpr is not None:
+                run_style = rpr.find(qn('w:rStyle'))
+                if run_style is not None:
+                    rprs += self._style_chain(run_style.get(qn('w:val')), 'w:rPr')
+                rprs.append(rpr)
+
+            text = []
+            for child in r:
+                if child.tag == qn('w:t'):
+                    text.append(escape(child.text or '').replace('  ', ' &nbsp;'))
+                elif child.tag == qn('w:tab'):
+                    text.append('&nbsp;' * 4)
+                elif child.tag in (qn('w:br'), qn('w:cr')):
+                    if child.get(qn('w:type')) == 'page':
+                        page_break = True
+                    else:
+                        text.append('<br/>')
+            if not text:
+                continue
+
+            size = int(self._lookup_attr(rprs, 'w:sz', 'w:val') or 22) / 2.0
+            font_name = self._font_name(rprs)
+            sizes.append(size)
+            heights.append(size * _line_height(font_name))
+            font = _pdf_font(font_name)
+            pdf_size = size * NARROW_SCALE if any(n in (font_name or '').lower() for n in NARROW_FONTS) else size
+            run_markup = ''.join(text)
+            if _needs_unicode_font(run_markup):
+                font = _unicode_pdf_font() or font
+            if _on(self._lookup(rprs, 'w:b')):
+                run_markup = f'<b>{run_markup}</b>'
+            if _on(self._lookup(rprs, 'w:i')):
+                run_markup = f'<i>{run_markup}</i>'
+            underline = self._lookup_attr(rprs, 'w:u', 'w:val')
+            if underline and underline != 'none':
+                run_markup = f'<u>{run_markup}</u>'
+            color = self._lookup_attr(rprs, 'w:color', 'w:val')
+            color_attr = f' color="#{color}"' if color and color != 'auto' else ''
+            markup.append(f'<font name="{font}" size="{pdf_size:g}"{color_attr}>{run_markup}</font>')
+
+        if not sizes:
+            # An empty paragraph is as tall as its paragraph mark
+            mark = ppr.find(qn('w:rPr')) if ppr is not None else None
+            mark_rprs = base_rprs + ([mark] if mark is not None else [])
+            sizes.append(int(self._lookup_attr(mark_rprs, 'w:sz', 'w:val') or 22) / 2.0)
+            heights.append(sizes[-1] * _line_height(self._font_name(mark_rprs)))
+        font_size = max(sizes)
+        single = max(heights)
+
+        line = self._lookup_attr(pprs, 'w:spacing', 'w:line')
+        line_rule = self._lookup_attr(pprs, 'w:spacing', 'w:lineRule') or 'auto'
+        if line and line_rule == 'auto':
+            leading = single * int(line) / 240.0
+        elif line:
+            leading = max(_twips(line), single if line_rule == 'atLeast' else 0)
+        else:
+            leading = single
+
+        first_line = _twips(self._lookup_attr(pprs, 'w:ind', 'w:firstLine'))
+        hanging = _twips(self._lookup_attr(pprs, 'w:ind', 'w:hanging'))
+        style = ParagraphStyle(
+            'docx',
+            fontName='Helvetica',
+            fontSize=font_size,
+            leading=leading,
+            alignment=ALIGNMENTS.get(self._lookup_attr(pprs, 'w:jc', 'w:val'), TA_LEFT),
+            spaceBefore=_twips(self._lookup_attr(pprs, 'w:spacing', 'w:before')),
+            spaceAfter=_twips(self._lookup_attr(pprs, 'w:spacing', 'w:after')),
+            leftIndent=_twips(self._lookup_attr(pprs, 'w:ind', 'w:left')
+                              or self._lookup_attr(pprs, 'w:ind', 'w:start')),
+            rightIndent=_twips(self._lookup_attr(pprs, 'w:ind', 'w:right')
+                               or self._lookup_attr(pprs, 'w:ind', 'w:end')),
+            firstLineIndent=first_line - hanging,
+        )
+
+        flowables = []
+        if _on(self._lookup(pprs, 'w:pageBreakBefore')):
+            flowables.append(PageBreak())
+        flowables.append(Paragraph(''.join(markup) or '&nbsp;', style))
+        if page_break:
+            flowables.append(PageBreak())
+        return flowables
+
+    # ---- tables -----------------------------------------------------------
+
+    @staticmethod
+    def _border_width(border) -> Optional[float]:
+        if border is None or border.get(qn('w:val')) in (None, 'nil', 'none'):
+            return None
+        try:
+            return max(int(border.get(qn('w:sz'), '4')) / 8.0, 0.25)
+        except ValueError:
+            return 0.5
+
+    def _table(self, tbl, available_width: float) -> List:
+        tblpr = tbl.find(qn('w:tblPr'))
+        style_id = self.default_table_style
+        if tblpr is not None and tblpr.find(qn('w:tblStyle')) is not None:
+            style_id = tblpr.find(qn('w:tblStyle')).get(qn('w:val'))
+
+        tblprs = self._style_chain(style_id, 'w:tblPr') + ([tblpr] if tblpr is not None else [])
+        table_ppr = self._style_chain(style_id, 'w:pPr')
+        table_rpr = self._style_chain(style_id, 'w:rPr')
+
+        grid = [_twips(col.get(qn('w:w'))) for col in tbl.findall(f"{qn('w:tblGrid')}/{qn('w:gridCol')}")]
+        rows = tbl.findall(qn('w:tr'))
+        n_cols = max(len(grid), 1)
+        if not grid or sum(grid) <= 0:
+            grid = [available_width / n_cols] * n_cols
+
+        data = [['' for _ in range(n_cols)] for _ in rows]
+        commands = [
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), _twips(self._lookup_attr(tblprs, 'w:tblCellMar', 'w:left'), 5.4)),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 5.4),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ]
+
+        # Table level borders: style first, then direct formatting, edge by edge
+        borders = {}
+        for element in tblprs:
+            table_borders = element.find(qn('w:tblBorders'))
+            if table_borders is None:
+                continue
+            for edge in BORDER_EDGES:
+                found = table_borders.find(qn(f'w:{edge}'))
+                if found is not None:
+                    borders[edge] = self._border_width(found)
+
+        last_row = len(rows) - 1
+        last_col = n_cols - 1
+        if borders.get('top'):
+            commands.append(('LINEABOVE', (0, 0), (-1, 0), borders['top'], colors.black))
+        if borders.get('bottom'):
+            commands.append(('LINEBELOW', (0, last_row), (-1, last_row), borders['bottom'], colors.black))
+        if borders.get('left'):
+            commands.append(('LINEBEFORE', (0, 0), (0, -1), borders['left'], colors.black))
+        if borders.get('right'):
+            commands.append(('LINEAFTER', (last_col, 0), (last_col, -1), borders['right'], colors.black))
+        if borders.get('insideH') and last_row > 0:
+            commands.append(('LINEBELOW', (0, 0), (-1, last_row - 1), borders['insideH'], colors.black))
+        if borders.get('insideV') and last_col > 0:
+            commands.append(('LINEAFTER', (0, 0), (last_col - 1, -1), borders['insideV'], colors.black))
+
+        merge_starts = {}
+        for row_idx, tr in enumerate(rows):
+            trpr = tr.find(qn('w:trPr'))
+            row_cnf = trpr.find(qn('w:cnfStyle')) if trpr is not None else None
+
+            col = 0
+            grid_before = tr.find(f"{qn('w:trPr')}/{qn('w:gridBefore')}")
+            if grid_before is not None:
+                col = int(grid_before.get(qn('w:val'), '0'))
+
+            for tc in tr.findall(qn('w:tc')):
+                tcpr = tc.find(qn('w:tcPr'))
+                span = 1
+                v_merge = None
+                if tcpr is not None:
+                    grid_span = tcpr.find(qn('w:gridSpan'))
+                    if grid_span is not None:
+                        span = int(grid_span.get(qn('w:val'), '1'))
+                    merge = tcpr.find(qn('w:vMerge'))
+                    if merge is not None:
+                        v_merge = merge.get(qn('w:val')) or 'continue'
+                if col >= n_cols:
+                    break
+                end_col = min(col + span, n_cols) - 1
+
+                kinds = []
+                cell_cnf = tcpr.find(qn('w:cnfStyle')) if tcpr is not None else None
+                for cnf in (row_cnf, cell_cnf):
+                    if cnf is None:
+                        continue
+                    for kind in ('firstRow', 'lastRow', 'firstColumn', 'lastColumn'):
+                        if cnf.get(qn(f'w:{kind}')) == '1':
+                            kinds.append('firstCol' if kind == 'firstColumn' else
+                                         'lastCol' if kind == 'lastColumn' else kind)
+                cell_ppr = table_ppr + self._conditional(style_id, kinds, 'w:pPr')
+                cell_rpr = table_rpr + self._conditional(style_id, kinds, 'w:rPr')
+
+                width = sum(grid[col:end_col + 1]) - 10.8
+                if v_merge == 'continue' and col in merge_starts:
+                    start_row = merge_starts[col]
+                    commands.append(('SPAN', (col, start_row), (end_col, row_idx)))
+                else:
+                    data[row_idx][col] = self._cell_content(tc, cell_ppr, cell_rpr, width)
+                    if v_merge == 'restart':
+                        merge_starts[col] = row_idx
+                    else:
+                        merge_starts.pop(col, None)
+                    if end_col > col:
+                        commands.append(('SPAN', (col, row_idx), (end_col, row_idx)))
+
+                if tcpr is not None:
+                    commands.extend(self._cell_formatting(tcpr, col, end_col, row_idx))
+                col = end_col + 1
+
+        flowables = []
+        indent = _twips(self._lookup_attr(tblprs, 'w:tblInd', 'w:w'))
+        table = Table(data, colWidths=grid, hAlign='LEFT')
+        alignment = self._lookup_attr(tblprs, 'w:jc', 'w:val')
+        if alignment in ('center', 'right', 'end'):
+            table.hAlign = 'CENTER' if alignment == 'center' else 'RIGHT'
+            indent = 0
+        table.setStyle(TableStyle(commands))
+        if indent:
+            flowables.append(Indenter(left=indent))
+        flowables.append(table)
+        if indent:
+            flowables.append(Indenter(left=-indent))
+        return flowables
+
+    def _cell_formatting(self, tcpr, col: int, end_col: int, row: int) -> List:
+        commands = []
+        valign = tcpr.find(qn('w:vAlign'))
+        if valign is not None:
+            commands.append(('VALIGN', (col, row), (end_col, row),
+                             {'center': 'MIDDLE', 'bottom': 'BOTTOM'}.get(valign.get(qn('w:val')), 'TOP')))
+
+        shading = tcpr.find(qn('w:shd'))
+        if shading is not None and shading.get(qn('w:fill')) not in (None, 'auto'):
+            try:
+                commands.append(('BACKGROUND', (col, row), (end_col, row),
+                                 colors.HexColor(f"#{shading.get(qn('w:fill'))}")))
+            except ValueError:
+                pass
+
+        cell_borders = tcpr.find(qn('w:tcBorders'))
+        if cell_borders is not None:
+            for edge, command in (('top', 'LINEABOVE'), ('bottom', 'LINEBELOW'),
+                                  ('left', 'LINEBEFORE'), ('start', 'LINEBEFORE'),
+                                  ('right', 'LINEAFTER'), ('end', 'LINEAFTER')):
+                width = self._border_width(cell_borders.find(qn(f'w:{edge}')))
+                if width:
+                    commands.append((command, (col, row), (end_col, row), width, colors.black))
+        return commands
+
+    def _cell_content(self, tc, table_ppr: List, table_rpr: List, width: float) -> List:
+        flowables = []
+        for child in tc:
+            if child.tag == qn('w:p'):
+                flowables.extend(self._paragraph(child, table_ppr, table_rpr))
+            elif child.tag == qn('w:tbl'):
+                flowables.extend(self._table(child, width))
+        # Word never shows the spacing after the last paragraph of a cell
+        if flowables and isinstance(flowables[-1], Paragraph):
+            flowables[-1].style = ParagraphStyle('docx_last', parent=flowables[-1].style, spaceAfter=0)
+        return [f for f in flowables if not isinstance(f, PageBreak)]
+
+    # ---- document ---------------------------------------------------------
+
+    def _blocks(self, container) -> List:
+        flowables = []
+        width = self.page_width - self.left_margin - self.right_margin
+        for child in container:
+            if child.tag == qn('w:p'):
+                flowables.extend(self._paragraph(child, [], []))
+            elif child.tag == qn('w:tbl'):
+                flowables.extend(self._table(child, width))
+            elif child.tag == qn('w:sdt'):
+                content = child.find(qn('w:sdtContent'))
+                if content is not None:
+                    flowables.extend(self._blocks(content))
+        return flowables
+
+    def _draw_page_borders(self, canvas):
+        if self.page_borders is None:
+            return
+        from_page = self.page_borders.get(qn('w:offsetFrom')) == 'page'
+        # Edges of the box the borders are drawn on, from the bottom left corner
+        left, bottom = (0, 0) if from_page else (self.left_margin, self.bottom_margin)
+        right = self.page_width if from_page else self.page_width - self.right_margin
+        top = self.page_height if from_page else self.page_height - self.top_margin
+        inward = 1 if from_page else -1  # The space runs in from the page edge or out from the text
+
+        edges = {}
+        for edge in ('top', 'left', 'bottom', 'right'):
+            border = self.page_borders.find(qn(f'w:{edge}'))
+            width = self._border_width(border)
+            if width:
+                color = border.get(qn('w:color'))
+                try:
+                    color = colors.HexColor(f'#{color}') if color and color != 'auto' else colors.black
+                except ValueError:
+                    color = colors.black
+                edges[edge] = (width, color, float(border.get(qn('w:space'), '0')))
+        if not edges:
+            return
+
+        def offset(edge):
+            return edges[edge][2] * inward if edge in edges else 0
+
+        x0, x1 = left + offset('left'), right - offset('right')
+        y0, y1 = bottom + offset('bottom'), top - offset('top')
+        canvas.saveState()
+        for edge, (start, end) in (('top', ((x0, y1), (x1, y1))), ('bottom', ((x0, y0), (x1, y0))),
+                                   ('left', ((x0, y0), (x0, y1))), ('right', ((x1, y0), (x1, y1)))):
+            if edge in edges:
+                width, color, _space = edges[edge]
+                canvas.setLineWidth(width)
+                canvas.setStrokeColor(color)
+                canvas.line(*start, *end)
+        canvas.restoreState()
+
+    def _draw_page(self, canvas, doc):
+        self._draw_page_borders(canvas)
+        width = self.page_width - self.left_margin - self.right_margin
+        for part, top in ((self.section.header, True), (self.section.footer, False)):
+            if part is None or part.is_linked_to_previous or not any(p.text.strip() for p in part.paragraphs):
+                continue
+            flowables = self._blocks(part._element)
+            heights = [f.wrapOn(canvas, width, self.page_height)[1] for f in flowables]
+            y = self.page_height - self.header_distance if top else self.footer_distance + sum(heights)
+            for flowable, height in zip(flowables, heights):
+                y -= height
+                flowable.drawOn(canvas, self.left_margin, y)
+
+    def render(self) -> bytes:
+        """Lay out the document and return the PDF bytes"""
+        buffer = io.BytesIO()
+        # Text starts right at the margins, as in Word (ReportLab frames pad by 6pt otherwise)
+        frame = Frame(self.left_margin, self.bottom_margin,
+                      self.page_width - self.left_margin - self.right_margin,
+                      self.page_height - self.top_margin - self.bottom_margin,
+                      leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id='body')
+        pdf = BaseDocTemplate(
+            buffer,
+            pagesize=(self.page_width, self.page_height),
+            pageTemplates=[PageTemplate('page', [frame], onPage=self._draw_page)],
+            leftMargin=self.left_margin,
+            rightMargin=self.right_margin,
+            topMargin=self.top_margin,
+            bottomMargin=self.bottom_margin,
+            invariant=1,
+            title='',
+            author='',
+            creator='',
+        )
+        pdf.build(self._blocks(self.doc.element.body))
+        return buffer.getvalue()
+
+
+def render_docx_to_pdf(source: Union[bytes, str, "Document"]) -> bytes:
+    """Render a filled DOCX (bytes, path or Document) straight to PDF bytes"""
+    return DocxPdfRenderer(source).render()
+
+
+def render_template_to_pdf(compiled, values: Dict[str, str], **kwargs) -> bytes:
+    """Fill a compiled template in memory and render it to PDF without touching the disk"""
+    return render_docx_to_pdf(compiled.render(values, **kwargs))
+
+
+def render_template_to_pdf_file(compiled, pdf_path: str, values: Dict[str, str], **kwargs) -> str:
+    """Fill a compiled template and write the PDF with a single write"""
+    data = render_template_to_pdf(compiled, values, **kwargs)
+    with open(pdf_path, 'wb') as f:
+        f.write(data)
+    logging.info(f"PDF rendered: {pdf_path}")
+    return pdf_path
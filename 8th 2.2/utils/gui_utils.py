@@ -1,44 +1,38 @@
-from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtWidgets import QTableView, QHeaderView
 from PyQt5.QtCore import Qt
+from .table_model import DataFrameModel
 
 def create_table_widget(parent):
     """
-    Creates a QTableWidget with scrollbars.
+    Creates a QTableView backed by a DataFrameModel, with scrollbars.
     """
-    table = QTableWidget(parent)
+    table = QTableView(parent)
+    table.setModel(DataFrameModel(parent=table))
     table.setAlternatingRowColors(True)
-    table.setEditTriggers(QTableWidget.NoEditTriggers)  # Make table read-only
-    table.setSelectionBehavior(QTableWidget.SelectRows)  # Select entire rows
-    table.setSelectionMode(QTableWidget.SingleSelection)  # Single row selection
+    table.setEditTriggers(QTableView.NoEditTriggers)  # Make table read-only
+    table.setSelectionBehavior(QTableView.SelectRows)  # Select entire rows
+    table.setSelectionMode(QTableView.SingleSelection)  # Single row selection
+    table.setSortingEnabled(True)  # Header clicks sort the model's row order
+    table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)  # Keep file order until a header is clicked
 
-    # Configure horizontal header
+    # Size columns from a sample of rows instead of measuring every cell
     header = table.horizontalHeader()
-    header.setSectionResizeMode(QHeaderView.ResizeToContents)  # Resize columns to content
+    header.setSectionResizeMode(QHeaderView.Interactive)
+    header.setResizeContentsPrecision(200)
+    table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
     return table
 
 def display_data(table, data, sort_orders=None):
     """
-    Displays data in the QTableWidget.
+    Displays data in the table created by create_table_widget.
     """
-    if sort_orders is None:
-        sort_orders = {}
+    model = table.model()
+    if not isinstance(model, DataFrameModel):
+        model = DataFrameModel(parent=table)
+        table.setModel(model)
 
-    table.setRowCount(0)  # Clear existing data
-    if data.empty:
-        table.setColumnCount(0)
-        return
-
-    table.setColumnCount(len(data.columns))
-    table.setHorizontalHeaderLabels(list(data.columns))
-
-    for i, row in data.iterrows():
-        table.insertRow(i)
-        for j, col in enumerate(data.columns):
-            item = QTableWidgetItem(str(row[col]))
-            item.setTextAlignment(Qt.AlignCenter)  # Align text to center
-            table.setItem(i, j, item)
+    model.set_dataframe(data)  # Keeps the last header sort
 
     # Adjust column widths to content
-
-    table.resizeColumnsToContents()
\ No newline at end of file
+    table.resizeColumnsToContents()
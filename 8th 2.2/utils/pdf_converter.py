@@ -0,0 +1,395 @@
+import os
+import sys
+import time
+import shutil
+import socket
+import logging
+import tempfile
+import subprocess
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Type
+
+
+def pdf_path_for(docx_file: str, output_folder: str) -> str:
+    """PDF path a converter writes for ``docx_file`` inside ``output_folder``"""
+    return os.path.join(output_folder, os.path.splitext(os.path.basename(docx_file))[0] + ".pdf")
+
+
+def find_soffice() -> Optional[str]:
+    """Locate the LibreOffice binary on PATH or in its usual install folders"""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+
+    candidates = [
+        "/usr/lib/libreoffice/program/soffice",
+        "/opt/libreoffice/program/soffice",
+        "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+        r"C:\Program Files\LibreOffice\program\soffice.exe",
+        r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class PdfConverter:
+    """
+    Base class for DOCX → PDF backends.
+
+    A converter is created once and reused for many documents; ``convert_many``
+    takes a whole batch so backends can pay their startup cost once. Call
+    ``close`` (or use it as a context manager) to release anything it keeps
+    running.
+    """
+
+    name = "base"
+
+    def convert_many(self, docx_files: Iterable[str], output_folder: str) -> Dict[str, Optional[str]]:
+        """
+        Convert a batch of documents into ``output_folder``.
+
+        Returns a dict mapping each DOCX path to its PDF path, or None if it failed.
+        """
+        raise NotImplementedError
+
+    def convert(self, docx_file: str, pdf_file: str) -> str:
+        """Convert a single document to an explicit PDF path"""
+        output_folder = os.path.dirname(os.path.abspath(pdf_file))
+        produced = self.convert_many([docx_file], output_folder).get(docx_file)
+        if not produced:
+            raise RuntimeError(f"{self.name} could not convert {docx_file}")
+        if os.path.abspath(produced) != os.path.abspath(pdf_file):
+            os.replace(produced, pdf_file)
+        return pdf_file
+
+    def convert_folder(self, input_folder: str, output_folder: str) -> Dict[str, Optional[str]]:
+        """Convert every DOCX in ``input_folder``"""
+        docx_files = sorted(
+            os.path.join(input_folder, f) for f in os.listdir(input_folder)
+            if f.lower().endswith(".docx") and not f.startswith("~$")
+        )
+        return self.convert_many(docx_files, output_folder)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _clear_targets(docx_files: List[str], output_folder: str) -> Dict[str, float]:
+        """
+        Remove the PDFs an earlier run left at the target paths, so a failed
+        conversion cannot pass for a new one. Returns the modification times of
+        those that could not be removed (e.g. open in a viewer).
+        """
+        stale = {}
+        for docx_file in docx_files:
+            pdf_file = pdf_path_for(docx_file, output_folder)
+            try:
+                os.remove(pdf_file)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Could not remove the previous {pdf_file}: {str(e)}")
+                stale[pdf_file] = os.path.getmtime(pdf_file)
+        return stale
+
+    @staticmethod
+    def _collect(docx_files: List[str], output_folder: str,
+                 stale: Optional[Dict[str, float]] = None) -> Dict[str, Optional[str]]:
+        results = {}
+        stale = stale or {}
+        for docx_file in docx_files:
+            pdf_file = pdf_path_for(docx_file, output_folder)
+            produced = os.path.exists(pdf_file) and (pdf_file not in stale
+                                                     or os.path.getmtime(pdf_file) != stale[pdf_file])
+            results[docx_file] = pdf_file if produced else None
+            if results[docx_file] is None:
+                logging.error(f"PDF was not produced for {docx_file}")
+        return results
+
+
+class Docx2PdfConverter(PdfConverter):
+    """
+    Microsoft Word through docx2pdf (Windows/macOS only).
+
+    A batch is staged into one folder so Word is started once per batch
+    instead of once per file.
+    """
+
+    name = "docx2pdf"
+
+    def convert_many(self, docx_files: Iterable[str], output_folder: str) -> Dict[str, Optional[str]]:
+        from docx2pdf import convert
+
+        docx_files = list(docx_files)
+        if not docx_files:
+            return {}
+        os.makedirs(output_folder, exist_ok=True)
+        stale = self._clear_targets(docx_files, output_folder)
+
+        with tempfile.TemporaryDirectory(prefix="docx_batch_") as staging:
+            for docx_file in docx_files:
+                shutil.copy2(docx_file, os.path.join(staging, os.path.basename(docx_file)))
+            try:
+                convert(staging, output_folder)
+            except Exception as e:
+                logging.error(f"docx2pdf batch conversion failed: {str(e)}")
+
+        return self._collect(docx_files, output_folder, stale)
+
+
+class LibreOfficeConverter(PdfConverter):
+    """
+    Headless LibreOffice: one ``soffice --convert-to pdf`` call per batch.
+
+    Each converter gets its own user profile so several worker processes can
+    run side by side without locking each other out.
+    """
+
+    name = "libreoffice"
+
+    def __init__(self, soffice: Optional[str] = None, timeout: int = 600):
+        self.soffice = soffice or find_soffice()
+        if not self.soffice:
+            raise RuntimeError("LibreOffice (soffice) was not found")
+        self.timeout = timeout
+        self.profile_dir = tempfile.mkdtemp(prefix="lo_profile_")
+        Finalize(self, shutil.rmtree, args=(self.profile_dir, True), exitpriority=10)
+
+    def convert_many(self, docx_files: Iterable[str], output_folder: str) -> Dict[str, Optional[str]]:
+        docx_files = list(docx_files)
+        if not docx_files:
+            return {}
+        os.makedirs(output_folder, exist_ok=True)
+        stale = self._clear_targets(docx_files, output_folder)
+
+        command = [
+            self.soffice,
+            f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+            "--headless", "--norestore", "--nologo", "--nodefault", "--nolockcheck",
+            "--convert-to", "pdf",
+            "--outdir", output_folder,
+            *docx_files
+        ]
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+            if completed.returncode != 0:
+                logging.error(f"LibreOffice exited with {completed.returncode}: {completed.stderr.strip()}")
+        except subprocess.TimeoutExpired:
+            logging.error(f"LibreOffice timed out converting {len(docx_files)} documents")
+
+        results = self._collect(docx_files, output_folder, stale)
+        logging.info(f"LibreOffice converted {sum(1 for p in results.values() if p)} of {len(docx_files)} documents")
+        return results
+
+    def close(self):
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class UnoserverConverter(PdfConverter):
+    """
+    A long-lived LibreOffice instance driven through unoserver/unoconvert.
+
+    The server is started on first use and kept running until ``close``,
+    so each document only costs a conversion, not an office startup.
+    """
+
+    name = "unoserver"
+
+    def __init__(self, timeout: int = 120, startup_timeout: int = 60):
+        self.server_cmd = shutil.which("unoserver")
+        self.client_cmd = shutil.which("unoconvert")
+        if not (self.server_cmd and self.client_cmd):
+            raise RuntimeError("unoserver/unoconvert were not found")
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.port = None
+        self.process = None
+        self.profile_dir = tempfile.mkdtemp(prefix="uno_profile_")
+        Finalize(self, self._shutdown, args=(self,), exitpriority=10)
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def _start(self):
+        if self.process is not None and self.process.poll() is None:
+            return
+
+        self.port = self._free_port()
+        self.process = subprocess.Popen(
+            [self.server_cmd, "--interface", "127.0.0.1", "--port", str(self.port),
+             "--uno-port", str(self._free_port()),
+             "--user-installation", Path(self.profile_dir).as_uri()],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"unoserver exited with {self.process.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=1):
+                    logging.info(f"unoserver listening on port {self.port}")
+                    return
+            except OSError:
+                time.sleep(0.25)
+        raise RuntimeError("unoserver did not start in time")
+
+    def convert_many(self, docx_files: Iterable[str], output_folder: str) -> Dict[str, Optional[str]]:
+        docx_files = list(docx_files)
+        if not docx_files:
+            return {}
+        os.makedirs(output_folder, exist_ok=True)
+        stale = self._clear_targets(docx_files, output_folder)
+        self._start()
+
+        for docx_file in docx_files:
+            command = [self.client_cmd, "--host", "127.0.0.1", "--port", str(self.port),
+                       "--convert-to", "pdf", docx_file, pdf_path_for(docx_file, output_folder)]
+            try:
+                completed = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+                if completed.returncode != 0:
+                    logging.error(f"unoconvert failed for {docx_file}: {completed.stderr.strip()}")
+            except subprocess.TimeoutExpired:
+                logging.error(f"unoconvert timed out on {docx_file}")
+
+        return self._collect(docx_files, output_folder, stale)
+
+    @staticmethod
+    def _shutdown(converter):
+        process = converter.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        converter.process = None
+        shutil.rmtree(converter.profile_dir, ignore_errors=True)
+
+    def close(self):
+        self._shutdown(self)
+
+
+class NativePdfConverter(PdfConverter):
+    """
+    Pure-Python layout of the DOCX with ReportLab (see docx_pdf_renderer).
+
+    Needs no office installation and gives byte-identical output for the
+    same input. Callers holding a compiled template can skip the DOCX file
+    entirely with ``docx_pdf_renderer.render_template_to_pdf``.
+    """
+
+    name = "native"
+
+    def convert_many(self, docx_files: Iterable[str], output_folder: str) -> Dict[str, Optional[str]]:
+        from .docx_pdf_renderer import render_docx_to_pdf
+
+        os.makedirs(output_folder, exist_ok=True)
+        results = {}
+        for docx_file in docx_files:
+            pdf_file = pdf_path_for(docx_file, output_folder)
+            try:
+                # Render first so a failed document leaves no empty PDF behind
+                data = render_docx_to_pdf(docx_file)
+                with open(pdf_file, 'wb') as f:
+                    f.write(data)
+                results[docx_file] = pdf_file
+            except Exception as e:
+                logging.error(f"Native rendering failed for {docx_file}: {str(e)}")
+                results[docx_file] = None
+        return results
+
+
+CONVERTERS: Dict[str, Type[PdfConverter]] = {
+    "docx2pdf": Docx2PdfConverter,
+    "libreoffice": LibreOfficeConverter,
+    "unoserver": UnoserverConverter,
+    "native": NativePdfConverter,
+}
+
+# Backends that depend on external programs and are only offered when those are installed
+CONVERTERS_REQUIRING_TOOLS = {"docx2pdf", "libreoffice", "unoserver"}
+
+# Converters kept alive for the lifetime of the process, keyed by backend name
+_ACTIVE_CONVERTERS: Dict[str, PdfConverter] = {}
+
+# Fallback backends "auto" has already warned about in this process
+_FALLBACKS_WARNED: Set[str] = set()
+
+
+def register_converter(name: str, converter_class: Type[PdfConverter]):
+    """Make an additional backend available to ``get_converter``"""
+    CONVERTERS[name] = converter_class
+
+
+def available_backends() -> List[str]:
+    """Backends that can run on this machine, in order of preference"""
+    backends = []
+    if shutil.which("unoserver") and shutil.which("unoconvert"):
+        backends.append("unoserver")
+    if find_soffice():
+        backends.append("libreoffice")
+    if sys.platform in ("win32", "darwin"):
+        backends.append("docx2pdf")
+    backends.extend(name for name in CONVERTERS if name not in backends and name not in CONVERTERS_REQUIRING_TOOLS)
+    return backends
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """Concrete backend name for ``backend``; ``"auto"`` picks the first of ``available_backends``"""
+    if backend != "auto":
+        return backend
+    backends = available_backends()
+    if not backends:
+        raise RuntimeError("No PDF converter available: install LibreOffice or Microsoft Word")
+    if backends[0] not in CONVERTERS_REQUIRING_TOOLS and backends[0] not in _FALLBACKS_WARNED:
+        _FALLBACKS_WARNED.add(backends[0])
+        logging.warning(f"No LibreOffice or Microsoft Word found; using the {backends[0]} PDF converter, "
+                        f"whose layout can differ from Word's")
+    return backends[0]
+
+
+def get_converter(backend: str = "auto") -> PdfConverter:
+    """
+    Return the process-wide converter for ``backend``, creating it on first use.
+
+    ``"auto"`` picks the first backend from ``available_backends``.
+    """
+    backend = resolve_backend(backend)
+
+    converter = _ACTIVE_CONVERTERS.get(backend)
+    if converter is None:
+        if backend not in CONVERTERS:
+            raise ValueError(f"Unknown PDF converter backend: {backend}")
+        converter = CONVERTERS[backend]()
+        _ACTIVE_CONVERTERS[backend] = converter
+        logging.info(f"Using PDF converter: {backend}")
+    return converter
+
+
+def close_converters():
+    """Shut down every converter started by ``get_converter``"""
+    for converter in _ACTIVE_CONVERTERS.values():
+        try:
+            converter.close()
+        except Exception as e:
+            logging.error(f"Error closing {converter.name} converter: {str(e)}")
+    _ACTIVE_CONVERTERS.clear()
+
+
+def convert_documents(docx_files: Iterable[str], output_folder: str, backend: str = "auto") -> Dict[str, Optional[str]]:
+    """Convert a list of DOCX files in one batch with the chosen backend"""
+    return get_converter(backend).convert_many(docx_files, output_folder)
@@ -1,21 +1,26 @@
-from docx2pdf import convert
+from .pdf_converter import convert_documents
 import os
 from PyQt5.QtWidgets import QMessageBox
 
-def generate_pdfs(docx_files, output_folder):
-    """Converts a list of DOCX files to PDFs and saves them in the output folder."""
-    pdf_files = []
+def generate_pdfs(docx_files, output_folder, backend="auto"):
+    """Converts a list of DOCX files to PDFs in one batch and saves them in the output folder."""
+    existing = []
     for docx_file in docx_files:
         if not os.path.exists(docx_file):
             print(f"ERROR: DOCX file not found: {docx_file}")
             continue
+        existing.append(docx_file)
 
-        pdf_file = os.path.join(output_folder, os.path.splitext(os.path.basename(docx_file))[0] + ".pdf")
-        try:
-            convert(docx_file, pdf_file)
-            pdf_files.append(pdf_file)
-        except Exception as e:
-            print(f"ERROR: Failed to convert {docx_file}: {e}")
+    pdf_files = []
+    try:
+        converted = convert_documents(existing, output_folder, backend=backend)
+        for docx_file in existing:
+            if converted.get(docx_file):
+                pdf_files.append(converted[docx_file])
+            else:
+                print(f"ERROR: Failed to convert {docx_file}")
+    except Exception as e:
+        print(f"ERROR: Failed to convert DOCX files: {e}")
 
     if pdf_files:
         print(f"INFO: Successfully converted {len(pdf_files)} files to PDF.")
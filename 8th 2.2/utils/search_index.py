@@ -0,0 +1,212 @@
+import logging
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ALL_COLUMNS = "All Columns"
+FILTER_TYPES = ("Contains", "Equals", "Starts with")
+
+# Joins the distinct values of a column into one searchable string
+SEPARATOR = "\x00"
+
+# Result row sets kept per index for narrowing later searches
+RESULT_CACHE_SIZE = 16
+
+# (query, column, filter type)
+Condition = Tuple[str, str, str]
+
+
+def refines(new: Condition, old: Condition) -> bool:
+    """True if every row matching ``new`` is guaranteed to match ``old``."""
+    new_query, new_column, new_type = new
+    old_query, old_column, old_type = old
+    if new_column != old_column or new_type != old_type:
+        return False
+    if new_type == "Contains":
+        return old_query.lower() in new_query.lower()
+    if new_type == "Starts with":
+        return new_query.startswith(old_query)
+    return new_query == old_query
+
+
+class _ColumnIndex:
+    """
+    One column, stored as its distinct display strings plus a code per row.
+
+    The distinct strings are joined into two contiguous blobs (as displayed,
+    and lower-cased), so a query is a handful of C-level ``str.find`` scans
+    over the distinct values instead of a Python call per cell. Matching
+    value ids are then expanded to rows with one vectorized gather.
+    """
+
+    def __init__(self, series: pd.Series):
+        # Index the strings the old filters compared (``astype(str)``): factorizing
+        # the raw values would merge True, 1 and 1.0, or 0.0 and -0.0. Where that
+        # conversion leaves a cell missing it never matches, as with ``na=False``.
+        if isinstance(series.dtype, np.dtype) and (series.dtype.kind in "biu" or series.dtype == np.float64):
+            # A number displays the same anywhere in the column, so only the
+            # distinct values are converted; floats are keyed on their bits
+            # to keep 0.0 and -0.0 apart
+            values = series.to_numpy()
+            is_float = values.dtype == np.float64
+            codes, keys = pd.factorize(values.view(np.int64) if is_float else values)
+            distinct = pd.Series(keys.view(values.dtype) if is_float else keys)
+            # astype(str) applies str() to each number; only NaN's display depends on the pandas version
+            text = pd.Series(list(map(str, distinct.tolist())), dtype=object)
+            missing = distinct.isna()
+            if missing.any():
+                text[missing] = distinct[missing].astype(str).astype(object)
+            value_codes, uniques = pd.factorize(text)
+            codes = value_codes[codes]
+        else:
+            codes, uniques = pd.factorize(series.astype(str))
+        strings = uniques.tolist()
+        if any(SEPARATOR in value for value in strings):
+            strings = [value.replace(SEPARATOR, " ") for value in strings]
+        lowered = list(map(str.lower, strings))
+
+        self.codes = codes.astype(np.int32, copy=False)
+        self.size = len(strings)
+        self.text, self.starts = self._join(strings)
+        self.lower_text, self.lower_starts = self._join(lowered)
+
+    @staticmethod
+    def _join(strings: List[str]):
+        # The blob starts and ends with the separator: value i sits between starts[i] and starts[i + 1] - 1
+        text = SEPARATOR + SEPARATOR.join(strings) + SEPARATOR
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings)) + 1
+        starts = np.concatenate(([1], 1 + np.cumsum(lengths))).tolist()
+        return text, starts
+
+    def matching_values(self, query: str, filter_type: str) -> np.ndarray:
+        """
+        Boolean array over the distinct values that match ``query``, plus a
+        final False entry that missing cells (code -1) pick up.
+        """
+        hits = np.zeros(self.size + 1, dtype=bool)
+        if filter_type == "Contains":
+            text, starts, needle = self.lower_text, self.lower_starts, query.lower()
+        elif filter_type == "Starts with":
+            text, starts, needle = self.text, self.starts, SEPARATOR + query
+        elif filter_type == "Equals":
+            text, starts, needle = self.text, self.starts, SEPARATOR + query + SEPARATOR
+        else:
+            raise ValueError(f"Unknown filter type: {filter_type}")
+
+        position = text.find(needle)
+        while position != -1:
+            # Anchored needles begin on the separator before the value
+            value_id = bisect_right(starts, position if filter_type == "Contains" else position + 1) - 1
+            hits[value_id] = True
+            position = text.find(needle, starts[value_id + 1] - (filter_type != "Contains"))
+        return hits
+
+    def match(self, query: str, filter_type: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask over ``rows`` (or every row) whose value matches."""
+        hits = self.matching_values(query, filter_type)
+        codes = self.codes if rows is None else self.codes[rows]
+        return hits[codes]
+
+
+class SearchIndex:
+    """
+    Search index over every column of a DataFrame, built once at load time.
+
+    Contains is case-insensitive and Equals / Starts with are case-sensitive,
+    as in the existing searches; all of them compare against the value as it
+    is displayed (``astype(str)``). Queries are matched literally, not as
+    regular expressions.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.results: "OrderedDict[Tuple[Condition, ...], np.ndarray]" = OrderedDict()
+        self.columns: Dict[str, _ColumnIndex] = {}
+        for position in range(df.shape[1]):
+            name = df.columns[position]
+            if name not in self.columns:
+                self.columns[name] = _ColumnIndex(df.iloc[:, position])
+        logging.info(f"Built search index for {len(df)} rows x {len(self.columns)} columns")
+
+    def __len__(self):
+        return len(self.df)
+
+    def mask(self, query: str, column: str = ALL_COLUMNS, filter_type: str = "Contains",
+             rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask over ``rows`` (or every row) matching ``query``."""
+        size = len(self.df) if rows is None else len(rows)
+        if not query:
+            return np.ones(size, dtype=bool)
+
+        if column == ALL_COLUMNS:
+            result = np.zeros(size, dtype=bool)
+            for index in self.columns.values():
+                result |= index.match(query, filter_type, rows)
+            return result
+
+        return self.columns[column].match(query, filter_type, rows)
+
+    def match(self, query: str, column: str = ALL_COLUMNS, filter_type: str = "Contains",
+              rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Row positions (``iloc``) matching ``query``. Pass the result of an
+        earlier match as ``rows`` to narrow it with another query.
+        """
+        if rows is None:
+            rows = np.arange(len(self.df), dtype=np.intp)
+        if not query or len(rows) == 0:
+            return rows
+        return rows[self.mask(query, column, filter_type, rows)]
+
+    def search(self, conditions: Sequence[Condition]) -> np.ndarray:
+        """
+        Row positions matching every ``(query, column, filter_type)`` condition,
+        e.g. a main search followed by its sub-searches. Conditions with an
+        empty query are ignored.
+
+        Results are remembered, so narrowing an earlier search (typing more
+        characters, adding a sub-search or another comma term) only filters
+        the rows that search returned.
+        """
+        conditions = tuple((query, column, filter_type) for query, column, filter_type in conditions if query)
+        if conditions in self.results:
+            self.results.move_to_end(conditions)
+            return self.results[conditions]
+
+        rows, pending = None, conditions
+        for previous, previous_rows in self.results.items():
+            remaining = self._narrowing(previous, conditions)
+            if remaining is not None and (rows is None or len(previous_rows) < len(rows)):
+                rows, pending = previous_rows, remaining
+
+        for query, column, filter_type in pending:
+            rows = self.match(query, column, filter_type, rows)
+        if rows is None:
+            rows = np.arange(len(self.df), dtype=np.intp)
+
+        self.results[conditions] = rows
+        if len(self.results) > RESULT_CACHE_SIZE:
+            self.results.popitem(last=False)
+        return rows
+
+    @staticmethod
+    def _narrowing(previous: Tuple[Condition, ...], conditions: Tuple[Condition, ...]):
+        """
+        The conditions still to apply to ``previous``'s rows to answer
+        ``conditions``, or None if ``previous`` may have dropped matching rows.
+        """
+        if len(previous) > len(conditions):
+            return None
+        remaining = []
+        for old, new in zip(previous, conditions):
+            if not refines(new, old):
+                return None
+            if new != old:
+                remaining.append(new)
+        return remaining + list(conditions[len(previous):])
+
+    def filter(self, query: str, column: str = ALL_COLUMNS, filter_type: str = "Contains") -> pd.DataFrame:
+        return self.df.iloc[self.match(query, column, filter_type)]
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class DataFrameModel(QAbstractTableModel):
+    """
+    Read-only table model that reads straight from a DataFrame.
+
+    Nothing is copied into Qt items: the view asks for the cells it is about to
+    paint and only those are formatted. Filtering and sorting work on an array
+    of row positions into the frame, so a new search or a header click never
+    rebuilds the table.
+    """
+
+    def __init__(self, df=None, parent=None, alignment=Qt.AlignCenter):
+        super().__init__(parent)
+        self._df = pd.DataFrame()
+        self._rows = np.arange(0, dtype=np.intp)
+        self._alignment = alignment
+        self._sort_key = None  # (column, order) of the last sort, re-applied to new rows
+        if df is not None:
+            self.set_dataframe(df)
+
+    # ----- Qt model interface -----
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._df.shape[1]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return str(self._df.iat[self._rows[index.row()], index.column()])
+        if role == Qt.TextAlignmentRole:
+            return int(self._alignment)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self._df.columns[section])
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Stable sort of the visible rows by one column; the frame itself is untouched."""
+        if column < 0 or column >= self._df.shape[1]:
+            self._sort_key = None
+            return
+
+        self._sort_key = (column, order)
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        self._rows = self._sorted_rows(old_rows, column, order)
+
+        # Keep the selection and current cell on the same records
+        persistent = self.persistentIndexList()
+        if persistent:
+            new_position = np.empty(len(self._df), dtype=np.intp)
+            new_position[self._rows] = np.arange(len(self._rows))
+            self.changePersistentIndexList(persistent, [
+                self.index(int(new_position[old_rows[index.row()]]), index.column())
+                for index in persistent
+            ])
+        self.layoutChanged.emit()
+
+    def _sorted_rows(self, rows, column, order):
+        if len(rows) < 2:
+            return rows
+        values = self._df.iloc[rows, column].reset_index(drop=True)
+        ascending = order == Qt.AscendingOrder
+        try:
+            ordered = values.sort_values(ascending=ascending, kind="stable", na_position="last")
+        except TypeError:
+            # Mixed types in one column: fall back to comparing the displayed text
+            ordered = values.astype(str).sort_values(ascending=ascending, kind="stable")
+        return rows[ordered.index.to_numpy()]
+
+    # ----- Data and proxy rows -----
+
+    @property
+    def dataframe(self):
+        return self._df
+
+    @property
+    def row_positions(self):
+        """Positions (``iloc``) of the rows currently shown, in display order."""
+        return self._rows
+
+    def set_dataframe(self, df):
+        """Show a new frame with all of its rows, keeping the current sort."""
+        self.beginResetModel()
+        self._df = df if df is not None else pd.DataFrame()
+        if self._sort_key and self._sort_key[0] >= self._df.shape[1]:
+            self._sort_key = None
+        self._rows = self._apply_sort(np.arange(len(self._df), dtype=np.intp))
+        self.endResetModel()
+
+    def set_rows(self, rows=None):
+        """
+        Show only the given row positions. Accepts an array of positions or a
+        boolean mask over the frame; ``None`` shows every row. The rows keep
+        the current sort, if any, otherwise the given order.
+        """
+        if rows is None:
+            rows = np.arange(len(self._df), dtype=np.intp)
+        else:
+            rows = np.asarray(rows)
+            if rows.dtype == bool:
+                rows = np.flatnonzero(rows)
+        self.beginResetModel()
+        self._rows = self._apply_sort(rows.astype(np.intp, copy=False))
+        self.endResetModel()
+
+    def _apply_sort(self, rows):
+        if self._sort_key is None:
+            return rows
+        return self._sorted_rows(rows, *self._sort_key)
+
+    def visible_dataframe(self):
+        """The rows currently shown, in display order, e.g. for exporting."""
+        return self._df.iloc[self._rows]
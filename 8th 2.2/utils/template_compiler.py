@@ -0,0 +1,264 @@
+import io
+import os
+import re
+import zlib
+import struct
+import zipfile
+import logging
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from xml.sax.saxutils import escape, unescape
+from docx import Document
+from utils.template_metadata import iter_template_paragraphs, template_metadata
+
+# {{PLACEHOLDER}} inside a single <w:t>; never spans XML markup
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^{}<>]+)\}\}')
+
+# {PLACEHOLDER} and { PLACEHOLDER } are filled too, for names the template also uses as {{PLACEHOLDER}}
+SINGLE_BRACE_FORMS = ('{{ {0} }}', '{{{0}}}')
+
+# XML parts of a DOCX package that can hold placeholder text
+TEMPLATE_PART_PATTERN = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Fixed DOS timestamp (1980-01-01) for every rendered zip entry so identical input gives identical bytes
+ZIP_DOS_TIME = 0
+ZIP_DOS_DATE = (1 << 5) | 1
+
+# (path, key_func, paragraph_hook) -> (mtime, size, compiled); an edited template replaces its entry
+_COMPILED_CACHE: Dict[tuple, Tuple[int, int, "CompiledTemplate"]] = {}
+
+
+def merge_runs_into_first(paragraph):
+    """Collapse a paragraph into its first run, keeping the first run's formatting"""
+    text = paragraph.text
+    if not paragraph.runs:
+        paragraph.text = text
+        return
+
+    for run in paragraph.runs[1:]:
+        run.text = ""
+
+    first_run = paragraph.runs[0]
+    first_run.text = text
+
+    first_run.bold = any(run.bold for run in paragraph.runs)
+    first_run.italic = any(run.italic for run in paragraph.runs)
+    first_run.underline = any(run.underline for run in paragraph.runs)
+
+
+def _xml_text(value: str) -> str:
+    """Escape a value for use inside <w:t>, mapping line breaks and tabs to Word markup"""
+    text = escape(value)
+    if '\n' in text or '\t' in text:
+        text = (text.replace('\r\n', '\n')
+                .replace('\n', '</w:t><w:br/><w:t xml:space="preserve">')
+                .replace('\t', '</w:t><w:tab/><w:t xml:space="preserve">'))
+    return text
+
+
+class _ZipMember:
+    """Compressed payload of one zip entry with the fields its headers need"""
+    __slots__ = ('method', 'crc', 'size', 'payload')
+
+    def __init__(self, method: int, crc: int, size: int, payload: bytes):
+        self.method = method
+        self.crc = crc
+        self.size = size
+        self.payload = payload
+
+    @classmethod
+    def build(cls, data: bytes, compress_type: int = zipfile.ZIP_DEFLATED) -> "_ZipMember":
+        if compress_type == zipfile.ZIP_STORED:
+            return cls(zipfile.ZIP_STORED, zlib.crc32(data), len(data), data)
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        payload = compressor.compress(data) + compressor.flush()
+        return cls(zipfile.ZIP_DEFLATED, zlib.crc32(data), len(data), payload)
+
+
+def _write_zip(members: List[Tuple[bytes, _ZipMember]]) -> bytes:
+    """Assemble a zip archive from already compressed members"""
+    out = bytearray()
+    central = bytearray()
+    for name, member in members:
+        offset = len(out)
+        out += struct.pack('<4s5H3L2H', b'PK\x03\x04', 20, 0x800, member.method,
+                           ZIP_DOS_TIME, ZIP_DOS_DATE, member.crc, len(member.payload), member.size,
+                           len(name), 0)
+        out += name
+        out += member.payload
+        central += struct.pack('<4s6H3L5H2L', b'PK\x01\x02', 20, 20, 0x800, member.method,
+                               ZIP_DOS_TIME, ZIP_DOS_DATE, member.crc, len(member.payload), member.size,
+                               len(name), 0, 0, 0, 0, 0, offset)
+        central += name
+    directory_offset = len(out)
+    out += central
+    out += struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, len(members), len(members),
+                       len(central), directory_offset, 0)
+    return bytes(out)
+
+
+class CompiledPart:
+    """One XML part split into static chunks around placeholder slots"""
+
+    def __init__(self, name: str, chunks: List[str], slots: List[str], raw_slots: List[str],
+                 texts: List[str]):
+        self.name = name
+        self.chunks = chunks
+        self.slots = slots
+        self.raw_slots = raw_slots
+        self.texts = texts  # Each slot as written in the template, kept when a value is missing
+
+    def render(self, values: Mapping[str, str], missing_value: Optional[str],
+               used: Optional[Set[str]], missing: Optional[Set[str]]) -> bytes:
+        out = [self.chunks[0]]
+        for key, raw, text, chunk in zip(self.slots, self.raw_slots, self.texts, self.chunks[1:]):
+            value = values.get(key)
+            if value is None:
+                if missing is not None:
+                    missing.add(raw)
+                if missing_value is None:
+                    out.append(text)
+                    out.append(chunk)
+                    continue
+                value = missing_value
+            elif used is not None:
+                used.add(key)
+            out.append(_xml_text(str(value)))
+            out.append(chunk)
+        return ''.join(out).encode('utf-8')
+
+
+class CompiledTemplate:
+    """
+    A DOCX template parsed once and kept as pre-split XML parts.
+
+    Paragraphs holding placeholders are normalised once (runs merged by
+    ``paragraph_hook``) and every XML part is stored as static chunks plus
+    placeholder slots, so rendering a row only joins strings and zips.
+    The placeholder names and where they appear come from the shared
+    template scan (template_metadata), keyed by ``key_func``.
+    """
+
+    def __init__(self, template_path: str, key_func: Optional[Callable[[str], str]] = None,
+                 paragraph_hook: Optional[Callable] = None):
+        self.template_path = template_path
+        self.key_func = key_func or (lambda key: key.strip())
+        self.paragraph_hook = paragraph_hook or merge_runs_into_first
+        self.entries: List[Tuple[bytes, int, object]] = []
+        self.locations: Dict[str, List[str]] = {}
+        self.single_forms: Dict[str, str] = {}
+        self._compile()
+
+    @property
+    def placeholders(self) -> Set[str]:
+        return set(self.locations)
+
+    def _compile(self):
+        metadata = template_metadata(self.template_path)
+        for name, parts in metadata.locations.items():
+            locations = self.locations.setdefault(self.key_func(name), [])
+            locations.extend(part for part in parts if part not in locations)
+
+        doc = Document(self.template_path)
+
+        for paragraph in iter_template_paragraphs(doc):
+            if '{{' not in paragraph.text or not PLACEHOLDER_PATTERN.search(paragraph.text):
+                continue
+            self.paragraph_hook(paragraph)
+            for t in paragraph._p.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'):
+                if t.text and '{{' in t.text:
+                    t.set(XML_SPACE, 'preserve')
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+
+        with zipfile.ZipFile(buffer) as package:
+            parts = {info.filename: package.read(info.filename).decode('utf-8')
+                     for info in package.infolist() if TEMPLATE_PART_PATTERN.match(info.filename)}
+            pattern = self._slot_pattern(metadata.placeholders)
+
+            for info in package.infolist():
+                data = package.read(info.filename)
+                name = info.filename.encode('utf-8')
+                if info.filename in parts:
+                    part = self._compile_part(info.filename, parts[info.filename], pattern)
+                    if part is not None:
+                        self.entries.append((name, info.compress_type, part))
+                        continue
+                # Static parts are compressed once here and copied verbatim on every render
+                self.entries.append((name, info.compress_type, _ZipMember.build(data, info.compress_type)))
+
+        logging.info(f"Compiled template {os.path.basename(self.template_path)}: "
+                     f"{len(self.locations)} placeholders")
+
+    def _slot_pattern(self, names: Iterable[str]):
+        """{{NAME}}, plus the single-brace forms of the names used with double braces"""
+        # Single-brace text as it appears in the XML (escaped) -> placeholder name
+        self.single_forms = {escape(form.format(name)): escape(name)
+                             for name in sorted(names) for form in SINGLE_BRACE_FORMS}
+        if not self.single_forms:
+            return PLACEHOLDER_PATTERN
+        forms = sorted(self.single_forms, key=len, reverse=True)
+        return re.compile(PLACEHOLDER_PATTERN.pattern + '|' + '|'.join(map(re.escape, forms)))
+
+    def _compile_part(self, name: str, xml: str, pattern=PLACEHOLDER_PATTERN) -> Optional[CompiledPart]:
+        chunks, raw_slots, texts = [], [], []
+        position = 0
+        for match in pattern.finditer(xml):
+            text = match.group(0)
+            chunks.append(xml[position:match.start()])
+            raw = match.group(1) if match.group(1) is not None else self.single_forms[text]
+            raw_slots.append(unescape(raw))  # Names as typed, not as escaped in the XML
+            texts.append(text)
+            position = match.end()
+        if not raw_slots:
+            return None
+        chunks.append(xml[position:])
+
+        slots = [self.key_func(raw) for raw in raw_slots]
+        return CompiledPart(name, chunks, slots, raw_slots, texts)
+
+    def render(self, values: Mapping[str, str], missing_value: Optional[str] = " - ",
+               used: Optional[Set[str]] = None, missing: Optional[Set[str]] = None) -> bytes:
+        """
+        Fill the template and return the DOCX package as bytes.
+
+        Args:
+            values: Placeholder values keyed by ``key_func(placeholder)``
+            missing_value: Text for placeholders without a value (None keeps the placeholder)
+            used: Optional set collecting the keys that were filled
+            missing: Optional set collecting raw placeholder names without a value
+        """
+        members = []
+        for name, compress_type, content in self.entries:
+            if isinstance(content, CompiledPart):
+                content = _ZipMember.build(content.render(values, missing_value, used, missing), compress_type)
+            members.append((name, content))
+        return _write_zip(members)
+
+    def render_to_file(self, output_path: str, values: Mapping[str, str], **kwargs) -> str:
+        """Render the template and write the DOCX to ``output_path``"""
+        with open(output_path, 'wb') as f:
+            f.write(self.render(values, **kwargs))
+        return output_path
+
+
+def compile_template(template_path: str, key_func: Optional[Callable[[str], str]] = None,
+                     paragraph_hook: Optional[Callable] = None) -> CompiledTemplate:
+    """Return the compiled form of a template, compiling it only when the file changed"""
+    stat = os.stat(template_path)
+    cache_key = (os.path.abspath(template_path), key_func, paragraph_hook)
+
+    cached = _COMPILED_CACHE.get(cache_key)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    compiled = CompiledTemplate(template_path, key_func=key_func, paragraph_hook=paragraph_hook)
+    _COMPILED_CACHE[cache_key] = (stat.st_mtime_ns, stat.st_size, compiled)
+    return compiled
+
+
+def clear_compiled_templates():
+    """Drop every compiled template held in memory"""
+    _COMPILED_CACHE.clear()
@@ -6,6 +6,7 @@ import fitz
 import os
 from utils.file_utils import export_filtered_data
 from utils.data_utils import filter_data
+from utils.search_index import SearchIndex
 from utils.docx_filler import fill_docx_template
 from views.pdf_view import PDFView
 from utils.gui_utils import display_data, create_table_widget
@@ -15,6 +16,7 @@ class MainView(QWidget):
         super().__init__(parent)
         self.df = None
         self.filtered_df = None
+        self.search_index = None
         self.sort_orders = {}  # Track sorting order for columns
         self.template_file = None
         self.output_folder = None
@@ -139,6 +141,7 @@ class MainView(QWidget):
                     self.df = pd.read_excel(file_path)
                 elif file_path.endswith(".csv"):
                     self.df = pd.read_csv(file_path)
+                self.search_index = SearchIndex(self.df)
                 self.column_dropdown.clear()
                 self.column_dropdown.addItem("All Columns")
                 self.column_dropdown.addItems(list(self.df.columns))
@@ -157,7 +160,8 @@ class MainView(QWidget):
             return
 
         # Apply filtering
-        filtered_df = filter_data(self.df, search_query, sub_query, main_column, sub_column, filter_type)
+        filtered_df = filter_data(self.df, search_query, sub_query, main_column, sub_column, filter_type,
+                                  index=self.search_index)
 
         # Update Treeview
         display_data(self.tree, filtered_df, self.sort_orders)
@@ -5,13 +5,18 @@ import ttkbootstrap as tb  # Modern UI Framework
 import darkdetect #detect system default active UI
 from fpdf import FPDF
 import openpyxl
-import pdfplumber  # Extract tables from PDFs
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 import os
+import sys
+import tempfile
+import subprocess
+from virtual_tree import VirtualTreeview
+from search_index import SearchIndex
+from sort_index import SortIndex, toggle_key
 
 
 # Detect System Theme (Light/Dark)
@@ -25,9 +30,12 @@ def change_theme(selected_theme):
 
 # Global variables
 df = None
+search_index = None  # SearchIndex over df, built once per upload
+sort_index = None  # SortIndex over df; its sort orders are kept until the next upload
 
 # Global variable to store the last filtered dataset
 filtered_df = None
+filtered_rows = None  # Positions of filtered_df's rows in df (None: all of df)
 
 # Initialize GUI
 theme = "darkly" if darkdetect.isDark() else "journal"
@@ -39,7 +47,7 @@ root.state("zoomed")
 
 # 🟢 Upload File Function
 def upload_file():
-    global df
+    global df, search_index, sort_index, sort_keys
     file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls"), ("CSV files", "*.csv")])
     if file_path:
         try:
@@ -49,6 +57,9 @@ def upload_file():
                 messagebox.showerror("Error", "Loaded file is empty or could not be read.")
                 return
 
+            search_index = SearchIndex(df)
+            sort_index = SortIndex(df)
+            sort_keys = []
             update_columns()
             display_data(df)  # Now tree exists, so no error.
             messagebox.showinfo("Success", "File uploaded successfully!")
@@ -57,61 +68,63 @@ def upload_file():
             print("Upload Error:", e)  # Debugging
 
 # Display Data in Treeview with Proper Table Formatting
-def display_data(data):
-    global filtered_df
+def display_data(data, rows=None):
+    global filtered_df, filtered_rows
     filtered_df = data  # Store filtered data
+    filtered_rows = rows
 
-    tree.delete(*tree.get_children())  # Clear existing data
     tree["columns"] = list(data.columns)
     tree["show"] = "headings"  # Ensure only table headers are visible, not row indices
 
     # Adjust columns dynamically
+    sort_directions = dict(sort_keys)
     for col in data.columns:
         arrow = ""
-        if col in sort_orders and sort_orders[col] is not None:  # Show arrow only if column was sorted
-            arrow = " ⬆" if sort_orders[col] else " ⬇"
+        if col in sort_directions:  # Show arrow only if column is sorted; numbered when several are
+            arrow = " ⬆" if sort_directions[col] else " ⬇"
+            if len(sort_keys) > 1:
+                arrow += str([name for name, _ in sort_keys].index(col) + 1)
 
         tree.heading(col, text=f"{col}{arrow}", command=lambda c=col: toggle_sort_order(c))
         tree.column(col, width=150, anchor="center")  # Set a default width
 
-    for _, row in data.iterrows():
-        tree.insert("", "end", values=list(row))
+    if sort_keys and sort_index is not None:
+        # Sorted view of df itself: the frame is not reordered, only the visible window is read
+        tree_view.set_data(df, order=sort_index.order(sort_keys, rows))
+    else:
+        tree_view.set_data(data)  # Inserts only the visible window of rows
 
     tree.update_idletasks()  # Refresh to apply changes
 
 # 🔼🔽 Toggle Sort Order
-sort_orders = {}  # Dictionary to track column sorting order
-def toggle_sort_order(column):
-    global filtered_df
+sort_keys = []  # [(column, ascending)], first key first
+def toggle_sort_order(column, add=False):
+    global sort_keys
 
     if filtered_df is None or column not in filtered_df.columns:
         messagebox.showerror("Error", "Invalid column selection.")
         return
 
-    # Reset all sorting indicators except the selected column
-    for col in sort_orders:
-        if col != column:
-            sort_orders[col] = None  # Remove sorting order for other columns
-
-    # Toggle sorting order for the selected column
-    sort_orders[column] = not sort_orders.get(column, False)
-    ascending = sort_orders[column]
+    # Click sorts by the column alone; Shift+Click adds it as a further key (clicking again flips it)
+    sort_keys = toggle_key(sort_keys, column, add)
 
-    # Sort the data based on the selected column and order
-    filtered_df = filtered_df.sort_values(by=column, ascending=ascending)
+    display_data(filtered_df, filtered_rows)  # Refresh sorted data
 
-    display_data(filtered_df)  # Refresh sorted data
+def on_heading_shift_click(event):
+    if tree.identify_region(event.x, event.y) != "heading":
+        return None
+    toggle_sort_order(tree.column(tree.identify_column(event.x), "id"), add=True)
+    return "break"
 
 
 # Clear Data Searched and Reset Sorting
 def clear_filters():
-    global filtered_df, sort_orders
+    global sort_keys
     if df is None:
         messagebox.showerror("Error", "No data loaded to clear filters.")
         return
 
-    filtered_df = df.copy()  # Reset data
-    sort_orders = {}  # Reset sorting order
+    sort_keys = []  # Reset sorting order
 
     search_var.set("")
     sub_search_var.set("")
@@ -119,13 +132,11 @@ def clear_filters():
     sub_search_column_var.set("All Columns")
     filter_var.set("Contains")
 
-    display_data(filtered_df)  # Refresh without sorting icons
+    display_data(df)  # Refresh without sorting icons
 
 
 # 🔍 Combined Search (Main & Sub-Search)
 def search_and_generate():
-    global df, filtered_df
-
     if df is None:
         messagebox.showerror("Error", "Please upload a file first.")
         return
@@ -140,46 +151,16 @@ def search_and_generate():
         messagebox.showerror("Error", "Please enter a search term.")
         return
 
-    filtered_data = df.copy()
-
-    # 🔹 Apply Main Search
-    if main_query:
-        if main_column == "All Columns":
-            filtered_data = filtered_data[
-                filtered_data.apply(lambda row: row.astype(str).str.contains(main_query, case=False, na=False).any(), axis=1)
-            ]
-        else:
-            if filter_type == "Contains":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str).str.contains(main_query, case=False, na=False)]
-            elif filter_type == "Equals":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str) == main_query]
-            elif filter_type == "Starts with":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str).str.startswith(main_query, na=False)]
-
-    # 🔹 Apply Sub-Search on Filtered Data
-    if sub_query:
-        if sub_column == "All Columns":
-            filtered_data = filtered_data[
-                filtered_data.apply(lambda row: row.astype(str).str.contains(sub_query, case=False, na=False).any(), axis=1)
-            ]
-        else:
-            filtered_data = filtered_data[filtered_data[sub_column].astype(str).str.contains(sub_query, case=False, na=False)]
+    # 🔹 Apply Main Search, then the Sub-Search on its matches; narrowing an earlier search only filters its rows
+    rows = search_index.search([(main_query, main_column, filter_type), (sub_query, sub_column, "Contains")])
+    filtered_data = df.iloc[rows]
 
     # 🛑 FIXED: Correct placement of "No Results" message
     if filtered_data.empty:
         messagebox.showinfo("No Results", "No matching records found.")
         return
 
-    display_data(filtered_data)  # ✅ Display only once
-    filtered_df = filtered_data  # ✅ Store for sorting
-
-    # Store filtered data for sorting
-
-    if filtered_data.empty:
-        messagebox.showinfo("No Results", "No matching records found.")
-        return
-
-    display_data(filtered_data)
+    display_data(filtered_data, rows)  # ✅ Display only once; the current sort keys carry over
 
 # 📤 Export Data
 def export_filtered_data(format):
@@ -190,12 +171,13 @@ def export_filtered_data(format):
     save_path = filedialog.asksaveasfilename(defaultextension=f".{format}", filetypes=[(f"{format.upper()} files", f"*.{format}")])
     if save_path:
         try:
+            data = tree_view.view_data()  # In the order shown
             if format == "xlsx":
-                filtered_df.to_excel(save_path, index=False)
+                data.to_excel(save_path, index=False)
             elif format == "csv":
-                filtered_df.to_csv(save_path, index=False)
+                data.to_csv(save_path, index=False)
             elif format == "pdf":
-                save_df_as_pdf(filtered_df, save_path)
+                save_df_as_pdf(data, save_path)
             messagebox.showinfo("Success", f"Filtered data saved as {format.upper()} successfully!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save file: {e}")
@@ -269,7 +251,6 @@ def save_df_as_pdf(df, save_path):
 
  # Function to Export Each Row Individually as PDF
 def export_each_row_as_pdf():
-    global filtered_df
     if filtered_df is None or filtered_df.empty:
         messagebox.showerror("Error", "No data to export.")
         return
@@ -279,7 +260,7 @@ def export_each_row_as_pdf():
         return
 
     styles = getSampleStyleSheet()
-    for index, row in filtered_df.iterrows():
+    for index, row in tree_view.view_data().iterrows():  # In the order shown
         file_path = os.path.join(save_directory, f"Row_{index + 1}.pdf")
         doc = SimpleDocTemplate(file_path, pagesize=letter)
         elements = []
@@ -306,37 +287,35 @@ def convert_pdf_to_excel():
     if not file_path:
         return
 
-    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx",
+                                             filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")])
     if not save_path:
         return
 
-    extracted_data = []
-    headers = None  # Store column headers separately
-
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
-
-            for table in tables:
-                if table:
-                    first_row = table[0]  # First row of the table
-                    if headers is None:  # Set headers only once
-                        #headers = first_row
-                        extracted_data.append(headers)
-                    else:
-                        # If the first row is just numbers, ignore it
-                        if all(cell.isdigit() for cell in first_row if cell):
-                            table = table[1:]  # Skip first row
-
-                    for row in table:
-                        extracted_data.append(row)
-
-    if extracted_data:
-        df = pd.DataFrame(extracted_data[1:], columns=extracted_data[0])  # Use first row as headers
-        df.to_excel(save_path, index=False)
-        messagebox.showinfo("Success", "PDF converted to Excel successfully!")
-    else:
-        messagebox.showerror("Error", "No tables found in the PDF.")
+    # Pages are extracted by a process pool in a separate run of table_extraction.py, so the
+    # workers never re-import this script (which would open another window in each of them)
+    extractor = os.path.join(os.path.dirname(os.path.abspath(__file__)), "table_extraction.py")
+    errors = tempfile.TemporaryFile(mode="w+")
+    process = subprocess.Popen([sys.executable, extractor, file_path, save_path],
+                               stdout=subprocess.DEVNULL, stderr=errors, text=True)
+    pdf_to_excel_btn.config(state=tk.DISABLED, text="⏳ Converting...")
+
+    def check_extraction():
+        if process.poll() is None:
+            root.after(200, check_extraction)
+            return
+        pdf_to_excel_btn.config(state=tk.NORMAL, text="📥 PDF to Excel")
+        errors.seek(0)
+        log = errors.read().strip().splitlines()
+        errors.close()
+        if process.returncode == 0:
+            messagebox.showinfo("Success", "PDF converted to Excel successfully!")
+        elif process.returncode == 1:
+            messagebox.showerror("Error", "No tables found in the PDF.")
+        else:
+            messagebox.showerror("Error", f"PDF conversion failed: {log[-1] if log else process.returncode}")
+
+    root.after(200, check_extraction)
 
 
 # 🔹 UI Layout - Top Bar
@@ -425,8 +404,13 @@ theme_dropdown.bind("<<ComboboxSelected>>", change_theme_emoji)
 frame2 = tb.Frame(root)
 frame2.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
 
+tree_scroll_y = tk.Scrollbar(frame2, orient="vertical")
+tree_scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+
 tree = ttk.Treeview(frame2, style="Custom.Treeview")
 tree.pack(pady=10, fill=tk.BOTH, expand=True)
+tree_view = VirtualTreeview(tree, tree_scroll_y)  # Keeps only the visible rows in the tree
+tree.bind("<Shift-Button-1>", on_heading_shift_click)  # Shift+Click a header to sort by several columns
 
 # 🔄 Update column dropdown when a file is loaded
 def update_columns():
@@ -0,0 +1,308 @@
+import os
+import json
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from overlay_filler import (DEFAULT_FONT_SIZE, DEFAULT_PAGE_SIZE, FONT_NAME, LINE_SPACING,
+                            OverlayField, OverlayTemplate)
+from batch_engine import BatchEngine
+
+# Version 1 was the bare list of {x, y, width, height, column} written by save_structure
+LAYOUT_VERSION = 2
+
+MIN_FONT_SIZE = 6
+FONT_SIZE_STEP = 0.5
+
+# Laid-out values remembered per box; repeated values (dates, names) skip the wrap
+LAYOUT_CACHE_SIZE = 1024
+
+ALIGNMENTS = ("left", "center", "right")
+FIT_MODES = ("shrink", "clip")
+
+
+class LayoutBox:
+    """A box on the template canvas that receives one column of each row"""
+
+    FIELDS = ('column', 'x', 'y', 'width', 'height', 'fontsize', 'align', 'wrap', 'fit', 'color', 'page')
+
+    def __init__(self, column: str, x: float, y: float, width: float, height: float,
+                 fontsize: float = DEFAULT_FONT_SIZE, align: str = "left", wrap: bool = True,
+                 fit: str = "shrink", color: Tuple[float, float, float] = (0, 0, 0), page: int = 0):
+        if align not in ALIGNMENTS:
+            raise ValueError(f"Unknown alignment '{align}' for column {column}")
+        if fit not in FIT_MODES:
+            raise ValueError(f"Unknown fit mode '{fit}' for column {column}")
+        self.column = column
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.fontsize = fontsize
+        self.align = align
+        self.wrap = wrap
+        self.fit = fit
+        self.color = tuple(color)
+        self.page = page
+
+    def to_dict(self) -> Dict:
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data['color'] = list(self.color)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LayoutBox":
+        return cls(**{name: data[name] for name in cls.FIELDS if name in data})
+
+
+class BoxLayout:
+    """
+    Versioned description of an overlay export: the background, the size of
+    the canvas the boxes were drawn on and the boxes themselves.
+
+    Box coordinates are canvas units from the top left (the pixels of the
+    background image in the editor); ``compile`` scales them to the PDF page.
+    """
+
+    def __init__(self, boxes: List[LayoutBox], background: Optional[str] = None,
+                 canvas: Optional[Tuple[float, float]] = None,
+                 page_size: Tuple[float, float] = DEFAULT_PAGE_SIZE):
+        self.boxes = boxes
+        self.background = background
+        self.page_size = tuple(page_size)
+        self.canvas = tuple(canvas) if canvas else self.page_size
+
+    @property
+    def columns(self) -> List[str]:
+        return [box.column for box in self.boxes]
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': LAYOUT_VERSION,
+            'background': self.background,
+            'canvas': list(self.canvas),
+            'page_size': list(self.page_size),
+            'boxes': [box.to_dict() for box in self.boxes]
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> "BoxLayout":
+        if isinstance(data, list):
+            # Version 1: boxes only, drawn straight on an A4 page
+            return cls([LayoutBox.from_dict(item) for item in data])
+        version = data.get('version')
+        if version != LAYOUT_VERSION:
+            raise ValueError(f"Unsupported layout version {version}")
+        return cls([LayoutBox.from_dict(item) for item in data['boxes']], data.get('background'),
+                   data.get('canvas'), data.get('page_size') or DEFAULT_PAGE_SIZE)
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "BoxLayout":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def compile(self, template: Optional[OverlayTemplate] = None) -> "RenderPlan":
+        """Render plan for this layout; ``template`` overrides the background"""
+        return compile_layout(self, template)
+
+
+class FontMetrics:
+    """Advance widths of the overlay font per WinAnsi byte, in units of the font size"""
+
+    def __init__(self, fontname: str = FONT_NAME):
+        font = fitz.Font(fontname)
+        self.ascender = font.ascender
+        self.descender = font.descender
+        self.widths = []
+        for code in range(256):
+            char = bytes([code]).decode('cp1252', errors='replace')
+            self.widths.append(font.glyph_advance(ord(char)))
+
+
+class CompiledBox(OverlayField):
+    """
+    A layout box resolved for one page size: scaled geometry, the font sizes
+    to try and how many lines fit at each, so laying out a value is only
+    measuring it against precomputed limits.
+    """
+    __slots__ = ('width', 'align', 'wrap', 'sizes', 'widths', 'ascender', '_cache')
+
+    def __init__(self, box: LayoutBox, scale_x: float, scale_y: float, metrics: FontMetrics):
+        super().__init__(box.column, box.x * scale_x, box.y * scale_y, box.fontsize, box.color, box.page)
+        self.width = box.width * scale_x
+        height = box.height * scale_y
+        self.align = box.align
+        self.wrap = box.wrap
+        self.widths = metrics.widths
+        self.ascender = metrics.ascender
+
+        # (font size, maximum lines); shrinking tries each size in turn
+        sizes = [box.fontsize]
+        if box.fit == "shrink":
+            size = box.fontsize - FONT_SIZE_STEP
+            while size >= MIN_FONT_SIZE:
+                sizes.append(size)
+                size -= FONT_SIZE_STEP
+        extent = metrics.ascender - metrics.descender
+        self.sizes = []
+        for size in sizes:
+            max_lines = 1 + int(max(0.0, height - size * extent) // (size * LINE_SPACING))
+            self.sizes.append((size, max_lines if self.wrap else 1))
+        self._cache = {}
+
+    def _measure(self, text: str) -> float:
+        widths = self.widths
+        return sum(widths[code] for code in text.encode('cp1252', errors='replace'))
+
+    def _wrap(self, text: str, limit: float) -> List[str]:
+        """Greedy word wrap to ``limit`` (in font-size units); over-long words are broken"""
+        lines = []
+        for paragraph in text.split("\n"):
+            line, line_width = "", 0.0
+            space = self._measure(" ")
+            for word in paragraph.split(" "):
+                word_width = self._measure(word)
+                if line and line_width + space + word_width <= limit:
+                    line, line_width = f"{line} {word}", line_width + space + word_width
+                    continue
+                if line:
+                    lines.append(line)
+                while word_width > limit and len(word) > 1:
+                    cut = len(word) - 1
+                    while cut > 1 and self._measure(word[:cut]) > limit:
+                        cut -= 1
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    word_width = self._measure(word)
+                line, line_width = word, word_width
+            lines.append(line)
+        return lines
+
+    def layout(self, value) -> Tuple[float, List[Tuple[float, float, str]]]:
+        text = str(value)
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+
+        for size, max_lines in self.sizes:
+            lines = self._wrap(text, self.width / size) if self.wrap else text.split("\n")[:1]
+            if len(lines) <= max_lines and all(self._measure(line) * size <= self.width for line in lines):
+                break
+        else:
+            # Nothing fits: smallest size, clipped to the lines the box holds
+            lines = lines[:max_lines]
+
+        placed = []
+        baseline = self.y + size * self.ascender
+        for line in lines:
+            x = self.x
+            if self.align != "left":
+                slack = self.width - self._measure(line) * size
+                x += slack if self.align == "right" else slack / 2
+            placed.append((x, baseline, line))
+            baseline += size * LINE_SPACING
+
+        if len(self._cache) >= LAYOUT_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[text] = (size, placed)
+        return size, placed
+
+
+class RenderPlan:
+    """
+    A compiled layout: the prepared background and the boxes with their
+    geometry and fitting resolved. It holds no GUI or fitz objects, so it can
+    be pickled into worker processes.
+    """
+
+    def __init__(self, template: OverlayTemplate, boxes: List[CompiledBox]):
+        self.template = template
+        self.boxes = boxes
+
+    def fill(self, row: Mapping) -> bytes:
+        """The filled PDF for one row"""
+        return self.template.fill(row, self.boxes)
+
+    def write_merged(self, rows: Iterable[Mapping], path: str) -> int:
+        """Write every row into one PDF; returns the number of rows written"""
+        return self.template.write_merged(rows, self.boxes, path)
+
+    def write_files(self, rows: Iterable[Tuple[object, Mapping]], folder: str,
+                    name: Callable[[object, Mapping], str], workers: Optional[int] = None,
+                    chunk_size: int = 200) -> Iterator[Dict]:
+        """
+        Write one PDF per ``(index, row)`` spread over worker processes, yielding
+        one result dict per row in input order. Rows are reduced to the layout's
+        columns before they are sent to the workers.
+        """
+        yield from self._render(rows, lambda index, row: os.path.join(folder, name(index, row)),
+                                workers, chunk_size)
+
+    def fill_rows(self, rows: Iterable[Tuple[object, Mapping]], workers: Optional[int] = None,
+                  chunk_size: int = 200) -> Iterator[Dict]:
+        """As ``write_files``, but each result carries the filled PDF as ``pdf`` instead of writing it"""
+        yield from self._render(rows, None, workers, chunk_size)
+
+    def _render(self, rows: Iterable[Tuple[object, Mapping]], output: Optional[Callable[[object, Mapping], str]],
+                workers: Optional[int], chunk_size: int) -> Iterator[Dict]:
+        columns = sorted({box.column for box in self.boxes})
+
+        def jobs():
+            for index, row in rows:
+                yield {'index': index, 'plan': self,
+                       'row_data': {column: row[column] for column in columns},
+                       'output': output(index, row) if output else None}
+
+        engine = BatchEngine(render_rows, workers=workers, chunk_size=chunk_size, per_chunk=True)
+        yield from engine.run(jobs())
+
+
+def render_rows(jobs: List[Dict]) -> List[Dict]:
+    """Worker: write the filled PDF of every job in a chunk, or return it for jobs without an output"""
+    results = []
+    for job in jobs:
+        try:
+            data = job['plan'].fill(job['row_data'])
+            if job['output'] is None:
+                results.append({'index': job['index'], 'doc_type': None, 'ok': True,
+                                'output': None, 'error': None, 'pdf': data})
+                continue
+            with open(job['output'], 'wb') as f:
+                f.write(data)
+            results.append({'index': job['index'], 'doc_type': None, 'ok': True,
+                            'output': job['output'], 'error': None})
+        except Exception as e:
+            logging.error(f"Error rendering row {job['index']}: {str(e)}")
+            results.append({'index': job['index'], 'doc_type': None, 'ok': False,
+                            'output': None, 'error': str(e)})
+    return results
+
+
+def compile_layout(layout: BoxLayout, template: Optional[OverlayTemplate] = None) -> RenderPlan:
+    """Resolve fonts, scale the boxes to the page and precompute their fitting"""
+    if template is None:
+        if layout.background and layout.background.lower().endswith(".pdf"):
+            template = OverlayTemplate.from_pdf(layout.background)
+        elif layout.background:
+            template = OverlayTemplate.from_image(layout.background, layout.page_size)
+        else:
+            blank = fitz.open()
+            blank.new_page(width=layout.page_size[0], height=layout.page_size[1])
+            template = OverlayTemplate.from_pdf(blank)
+            blank.close()
+
+    metrics = FontMetrics()
+    boxes = []
+    for box in layout.boxes:
+        if box.page >= template.page_count:
+            raise ValueError(f"Box for column {box.column} is on page {box.page + 1}, "
+                             f"the template has {template.page_count}")
+        _xref, width, height, *_rest = template.pages[box.page]
+        boxes.append(CompiledBox(box, width / layout.canvas[0], height / layout.canvas[1], metrics))
+    logging.info(f"Compiled layout with {len(boxes)} boxes over {template.page_count} template pages")
+    return RenderPlan(template, boxes)
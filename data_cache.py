@@ -0,0 +1,224 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet needs pyarrow; frames are pickled without it
+    pa = None
+    pq = None
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "DocumentGenerator", "data_cache"
+)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+INDEX_FILE = "index.json"
+HASH_BLOCK = 1 << 20
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DataCache:
+    """
+    On-disk cache of cleaned DataFrames, keyed by the content hash of the
+    input file.
+
+    Frames are stored as Parquet (pickle when pyarrow is missing or a column
+    cannot be stored as Parquet), so reloading an unchanged workbook skips
+    parsing and cleaning. ``namespace`` separates caches of different
+    cleaning steps; change it whenever the cleaning changes. The least
+    recently used entries are evicted once the cache exceeds ``max_bytes``.
+
+    Content hashes are remembered per path, size and modification time, so
+    an unchanged file is not even re-read to be recognised.
+    """
+
+    def __init__(self, namespace: str, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.namespace = namespace
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ----- Keys -----
+
+    def _load_index(self) -> Dict:
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict):
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+
+    def key(self, file_path: str) -> str:
+        """Cache key for the current contents of ``file_path``"""
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        with self._lock:
+            index = self._load_index()
+            known = index.get(path)
+            if known and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+                digest = known['digest']
+            else:
+                digest = file_digest(file_path)
+                index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+                self._save_index(index)
+        return hashlib.sha256(f"{self.namespace}:{digest}".encode()).hexdigest()
+
+    def _entry(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    # ----- Reading and writing -----
+
+    def load(self, file_path: str) -> Optional[pd.DataFrame]:
+        """The cached frame for ``file_path``, or None"""
+        key = self.key(file_path)
+        for ext, reader in (('.parquet', pd.read_parquet), ('.pkl', pd.read_pickle)):
+            entry = self._entry(key, ext)
+            if not os.path.exists(entry):
+                continue
+            try:
+                df = reader(entry)
+            except Exception as e:
+                logging.warning(f"Discarding unreadable cache entry {entry}: {str(e)}")
+                self._remove(entry)
+                continue
+            os.utime(entry)  # Mark as recently used
+            logging.info(f"Loaded {os.path.basename(file_path)} from cache ({len(df)} rows)")
+            return df
+        return None
+
+    def store(self, file_path: str, df: pd.DataFrame, key: Optional[str] = None):
+        """Cache ``df`` as the cleaned contents of ``file_path``"""
+        key = key or self.key(file_path)
+        entry = self._entry(key, '.parquet')
+        tmp_path = f"{entry}.{os.getpid()}.tmp"
+        try:
+            if pq is None:
+                raise ImportError("pyarrow is not installed")
+            df.to_parquet(tmp_path, index=True)
+        except Exception as e:
+            # Mixed-type object columns cannot be stored as Parquet
+            logging.info(f"Caching {os.path.basename(file_path)} as pickle: {str(e)}")
+            self._remove(tmp_path)
+            entry = self._entry(key, '.pkl')
+            tmp_path = f"{entry}.{os.getpid()}.tmp"
+            df.to_pickle(tmp_path, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry)
+        self.evict()
+
+    def get_or_load(self, file_path: str, loader: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """The cached frame for ``file_path``, or ``loader(file_path)``, which is then cached"""
+        try:
+            df = self.load(file_path)
+            if df is not None:
+                return df
+        except OSError as e:
+            logging.warning(f"Data cache unavailable: {str(e)}")
+            return loader(file_path)
+
+        df = loader(file_path)
+        if df is not None:
+            try:
+                self.store(file_path, df)
+            except Exception as e:
+                logging.warning(f"Could not cache {file_path}: {str(e)}")
+        return df
+
+    def store_batches(self, file_path: str, batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Pass ``batches`` through unchanged while writing them to the cache, so
+        a streamed file is cached without ever being held in memory whole.
+        Caching is abandoned (the batches still flow) if pyarrow is missing or
+        a batch does not fit the schema of the first one; the entry only
+        appears once every batch has been written.
+        """
+        if pq is None:
+            yield from batches
+            return
+
+        key = self.key(file_path)
+        entry = self._entry(key, '.parquet')
+        tmp_path = f"{entry}.{os.getpid()}.tmp"
+        writer = None
+        caching = True
+        finished = False
+        try:
+            for batch in batches:
+                if caching:
+                    try:
+                        if writer is None:
+                            table = pa.Table.from_pandas(batch, preserve_index=True)
+                            writer = pq.ParquetWriter(tmp_path, table.schema)
+                        else:
+                            table = pa.Table.from_pandas(batch, schema=writer.schema, preserve_index=True)
+                        writer.write_table(table)
+                    except Exception as e:
+                        logging.info(f"Not caching {os.path.basename(file_path)}: {str(e)}")
+                        caching = False
+                yield batch
+            finished = True
+        finally:
+            # A run that was cancelled or failed part-way leaves no entry
+            if writer is not None:
+                writer.close()
+            if finished and caching and writer is not None:
+                os.replace(tmp_path, entry)
+                self.evict()
+            else:
+                self._remove(tmp_path)
+
+    # ----- Maintenance -----
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in ``max_bytes``"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(('.parquet', '.pkl')):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logging.info(f"Evicting cache entry {os.path.basename(path)}")
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            self._remove(os.path.join(self.cache_dir, name))
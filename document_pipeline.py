@@ -0,0 +1,178 @@
+import os
+import logging
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List
+from pdf_converter import get_converter, resolve_backend
+from docx_pdf_renderer import render_template_to_pdf_file
+from template_compiler import compile_template
+
+
+def normalize_placeholder_key(key) -> str:
+    """Normalize placeholder keys to consistent format"""
+    if not isinstance(key, str):
+        key = str(key)
+    return (
+        key.strip()
+        .upper()
+        .replace(' ', '_')
+        .replace('-', '_')
+        .replace('{', '')
+        .replace('}', '')
+        .replace('[', '')
+        .replace(']', '')
+        .replace('(', '')
+        .replace(')', '')
+    )
+
+
+def normalize_replacements(replacements: Dict) -> Dict[str, str]:
+    """Normalize replacement keys and turn empty values into a dash"""
+    return {
+        normalize_placeholder_key(k): " - " if (pd.isna(v) or str(v).strip() in ['', 'nan']) else str(v).strip()
+        for k, v in replacements.items()
+    }
+
+
+def log_replacement_stats(used_placeholders, missing_placeholders, replacements):
+    """Log statistics about placeholder replacement"""
+    unused_replacements = set(replacements.keys()) - used_placeholders
+    if unused_replacements:
+        logging.warning(f"Unused replacement values: {sorted(unused_replacements)}")
+
+    if missing_placeholders:
+        logging.warning(f"Missing replacements for placeholders: {sorted(missing_placeholders)}")
+
+    total_placeholders = len(used_placeholders) + len(missing_placeholders)
+    if total_placeholders > 0:
+        success_rate = len(used_placeholders) / total_placeholders * 100
+        logging.info(f"Placeholder replacement success: {success_rate:.1f}%")
+
+
+def document_basename(doc_type: str, row_data: Dict, idx) -> str:
+    """File name (without extension) for a generated document"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    invoice_num = str(row_data.get('INVOICE_NUMBER', f"ROW_{idx}")).strip()
+    return f"{doc_type.replace(' ', '_')}_{invoice_num}_{timestamp}"
+
+
+def _fill_replacements(job: Dict):
+    """Compiled template, normalized values and file base name for one job (None if no template)"""
+    template_path = job['template_path']
+    if not template_path or not os.path.exists(template_path):
+        return None, None, None
+
+    # Template is parsed once per process; each row only fills the placeholder slots
+    compiled = compile_template(template_path, key_func=normalize_placeholder_key)
+    replacements = normalize_replacements(job['row_data'])
+    basename = job.get('basename') or document_basename(job['doc_type'], job['row_data'], job['index'])
+    return compiled, replacements, basename
+
+
+def fill_document(job: Dict) -> Dict:
+    """
+    Fill the compiled template for one job and write the temporary DOCX.
+
+    Job keys: index, doc_type, template_path, row_data, output_folder
+    and optionally pdf_backend (defaults to "auto") and basename (the output
+    file name without extension; a timestamped name by default).
+    """
+    result = {'index': job['index'], 'doc_type': job['doc_type'], 'ok': False, 'output': None, 'error': None,
+              'docx': None}
+
+    compiled, replacements, basename = _fill_replacements(job)
+    if compiled is None:
+        result['error'] = f"No template found for document type: {job['doc_type']}"
+        logging.error(result['error'])
+        return result
+
+    temp_dir = os.path.join(job['output_folder'], "temp_docx")
+    os.makedirs(temp_dir, exist_ok=True)
+    docx_path = os.path.join(temp_dir, f"{basename}.docx")
+
+    used_placeholders = set()
+    missing_placeholders = set()
+    compiled.render_to_file(docx_path, replacements, used=used_placeholders, missing=missing_placeholders)
+    log_replacement_stats(used_placeholders, missing_placeholders, replacements)
+    logging.info(f"Temporary DOCX created: {docx_path}")
+
+    result['docx'] = docx_path
+    return result
+
+
+def render_native_document(job: Dict) -> Dict:
+    """Fill the template in memory and write the PDF directly, with no temporary DOCX"""
+    result = {'index': job['index'], 'doc_type': job['doc_type'], 'ok': False, 'output': None, 'error': None,
+              'docx': None}
+
+    compiled, replacements, basename = _fill_replacements(job)
+    if compiled is None:
+        result['error'] = f"No template found for document type: {job['doc_type']}"
+        logging.error(result['error'])
+        return result
+
+    used_placeholders = set()
+    missing_placeholders = set()
+    pdf_path = os.path.join(job['output_folder'], f"{basename}.pdf")
+    render_template_to_pdf_file(compiled, pdf_path, replacements,
+                                used=used_placeholders, missing=missing_placeholders)
+    log_replacement_stats(used_placeholders, missing_placeholders, replacements)
+
+    result['ok'] = True
+    result['output'] = pdf_path
+    return result
+
+
+def render_documents(jobs: List[Dict]) -> List[Dict]:
+    """
+    Generate a batch of documents: fill every template, convert all DOCX files
+    with one converter call per output folder and remove the temporary DOCX
+    files. The native backend renders each PDF straight from memory instead.
+    Runs in batch worker processes, so it only touches the files named by
+    the jobs. Returns one result per job, in order.
+    """
+    results = []
+    batches: Dict[tuple, List[Dict]] = {}
+    for job in jobs:
+        try:
+            backend = resolve_backend(job.get('pdf_backend', 'auto'))
+            if backend == "native":
+                result = render_native_document(job)
+            else:
+                result = fill_document(job)
+        except Exception as e:
+            logging.error(f"Error generating document for row {job.get('index')}: {str(e)}", exc_info=True)
+            result = {'index': job.get('index'), 'doc_type': job.get('doc_type'), 'ok': False,
+                      'output': None, 'error': str(e), 'docx': None}
+        results.append(result)
+        if result['docx']:
+            key = (backend, job['output_folder'])
+            batches.setdefault(key, []).append(result)
+
+    for (backend, output_folder), batch in batches.items():
+        try:
+            converted = get_converter(backend).convert_many([r['docx'] for r in batch], output_folder)
+        except Exception as e:
+            logging.error(f"Error converting to PDF: {str(e)}")
+            converted = {}
+
+        for result in batch:
+            pdf_path = converted.get(result['docx'])
+            if not pdf_path:
+                result['error'] = f"Error converting to PDF: {os.path.basename(result['docx'])}"
+                continue
+
+            logging.info(f"PDF generated: {pdf_path}")
+            os.remove(result['docx'])
+            logging.info(f"Deleted temporary DOCX: {result['docx']}")
+            result['ok'] = True
+            result['output'] = pdf_path
+
+    for result in results:
+        del result['docx']
+    return results
+
+
+def render_document(job: Dict) -> Dict:
+    """Generate one document; see ``render_documents``"""
+    return render_documents([job])[0]
@@ -0,0 +1,272 @@
+"""
+Generate documents from a data file without the GUI.
+
+Runs the same pipeline as Document_Generator5 (row preparation, template
+filling, PDF conversion, the resume manifest and the data cache) from the
+command line, so month-end runs can be scheduled on headless servers and
+timed. Examples:
+
+    python generate_documents.py invoices.xlsx out/
+    python generate_documents.py invoices.csv out/ --workers 8 --chunk-size 16 --backend native
+    python generate_documents.py invoices.xlsx out/ --templates templates.json --mode merged --max-pages 5000
+
+``--templates`` is a JSON object mapping document types to template files
+(relative paths are taken from the JSON file's folder); ``--template TYPE=PATH``
+sets a single type. Types not given use the default templates folder.
+
+Exit status: 0 when every row was generated or already up to date, 1 when
+some rows failed, 2 when the run could not start.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from batch_engine import BatchEngine, default_worker_count
+from data_cache import DataCache
+from data_reader import estimate_row_count, iter_data_batches, read_data, should_stream
+from document_pipeline import render_documents
+from generation_run import (DATA_CACHE_NAMESPACE, DEFAULT_TEMPLATE_FILES, clean_data, default_templates,
+                            run_generation)
+from merged_pdf import MergedPdfOutput
+from pdf_converter import CONVERTERS, close_converters
+from run_manifest import RunManifest
+
+# Log a progress line every this many rows
+PROGRESS_EVERY = 500
+
+OUTPUT_MODES = ("individual", "merged")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate tax documents from an Excel/CSV file without the GUI.")
+    parser.add_argument("data_file", help="Excel (.xlsx/.xls) or CSV file with one row per document")
+    parser.add_argument("output_folder", help="Folder the PDFs (and the resume manifest) are written to")
+    parser.add_argument("--templates", metavar="JSON",
+                        help="JSON file mapping document types to template files")
+    parser.add_argument("--template", action="append", default=[], metavar="TYPE=PATH",
+                        help="Template for one document type; may be repeated")
+    parser.add_argument("--templates-dir", metavar="DIR",
+                        help="Folder with the default template files (default: the bundled templates)")
+    parser.add_argument("--workers", type=int, default=default_worker_count(),
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=8,
+                        help="Rows handed to a worker at a time (default: 8)")
+    parser.add_argument("--backend", default="auto", choices=["auto"] + list(CONVERTERS),
+                        help="PDF backend (default: auto)")
+    parser.add_argument("--mode", default="individual", choices=OUTPUT_MODES,
+                        help="individual: one PDF per row; merged: one PDF per document type")
+    parser.add_argument("--max-pages", type=int, metavar="N",
+                        help="Merged mode: start a new part after N pages")
+    parser.add_argument("--max-mb", type=float, metavar="MB",
+                        help="Merged mode: start a new part before a part exceeds MB megabytes")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Render every row, even documents that are already up to date")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the data cache")
+    parser.add_argument("--log-file", help="Also write the log to this file")
+    parser.add_argument("--quiet", action="store_true", help="Only log warnings and errors")
+    return parser.parse_args(argv)
+
+
+def configure_logging(args: argparse.Namespace):
+    handlers = [logging.StreamHandler()]
+    if args.log_file:
+        handlers.append(logging.FileHandler(args.log_file))
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s", handlers=handlers)
+
+
+def resolve_templates(args: argparse.Namespace) -> Dict[str, Optional[str]]:
+    """Document type -> template path: defaults, then the JSON mapping, then --template options"""
+    templates = default_templates(args.templates_dir)
+
+    overrides: List[Tuple[str, str]] = []
+    if args.templates:
+        with open(args.templates, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        if not isinstance(mapping, dict):
+            raise ValueError(f"{args.templates} must hold a JSON object of document type -> template")
+        base = os.path.dirname(os.path.abspath(args.templates))
+        overrides.extend((doc_type, os.path.join(base, path)) for doc_type, path in mapping.items())
+    for item in args.template:
+        doc_type, sep, path = item.partition("=")
+        if not sep:
+            raise ValueError(f"--template expects TYPE=PATH, got '{item}'")
+        overrides.append((doc_type.strip(), path.strip()))
+
+    for doc_type, path in overrides:
+        if doc_type not in DEFAULT_TEMPLATE_FILES:
+            logging.warning(f"Unknown document type '{doc_type}'; known types: {', '.join(DEFAULT_TEMPLATE_FILES)}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Template for {doc_type} not found: {path}")
+        templates[doc_type] = path
+    return templates
+
+
+def load_batches(data_file: str, use_cache: bool) -> Tuple[Iterable[pd.DataFrame], Optional[int]]:
+    """The cleaned data as batches, and the row count if known; large files are streamed"""
+    data_cache = None
+    if use_cache:
+        try:
+            data_cache = DataCache(DATA_CACHE_NAMESPACE)
+            cached = data_cache.load(data_file)
+            if cached is not None:
+                return [cached], len(cached)
+        except Exception as e:
+            logging.warning(f"Data cache unavailable: {str(e)}")
+
+    if should_stream(data_file):
+        batches = iter_data_batches(data_file, clean=clean_data)
+        if data_cache is not None:
+            batches = data_cache.store_batches(data_file, batches)
+        return batches, estimate_row_count(data_file)
+
+    df = read_data(data_file, clean=clean_data)
+    if data_cache is not None:
+        try:
+            data_cache.store(data_file, df)
+        except Exception as e:
+            logging.warning(f"Could not cache {data_file}: {str(e)}")
+    return [df], len(df)
+
+
+def log_template_changes(output_folder: str, templates: Dict[str, Optional[str]]):
+    """Log the documents an edited template will regenerate (the GUI asks first; here we just go ahead)"""
+    if not RunManifest.exists(output_folder):
+        return
+    manifest = RunManifest(output_folder)
+    try:
+        for template_path, doc_types, count in manifest.invalidated(templates):
+            logging.info(f"Template {template_path} changed: {count} documents ({', '.join(doc_types)}) "
+                         f"will be regenerated")
+    finally:
+        manifest.close()
+
+
+class RunReport:
+    """Counts results as they arrive and, in merged mode, appends each PDF to its type's merged file"""
+
+    def __init__(self, output_folder: str, total_rows: Optional[int], merged: bool = False,
+                 max_pages: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.output_folder = output_folder
+        self.total_rows = total_rows
+        self.merged = merged
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.outputs: Dict[str, MergedPdfOutput] = {}
+        self.processed = 0
+        self.succeeded = 0
+        self.skipped = 0
+        self.failures: List[Dict] = []
+        self.started = time.perf_counter()
+
+    def __call__(self, result: Dict):
+        self.processed += 1
+        if result.get('skipped'):
+            self.skipped += 1
+        elif result.get('ok') and (not self.merged or self._append_to_merged(result)):
+            self.succeeded += 1
+        else:
+            self.failures.append(result)
+
+        if self.processed % PROGRESS_EVERY == 0:
+            total = f" of {self.total_rows}" if self.total_rows else ""
+            logging.info(f"Processed {self.processed}{total} rows ({self.rate:.1f} rows/s)")
+
+    def _append_to_merged(self, result: Dict) -> bool:
+        """Move the row's PDF into its type's merged file; a row that cannot be added is marked failed"""
+        doc_type = result['doc_type']
+        output = self.outputs.get(doc_type)
+        if output is None:
+            path = os.path.join(self.output_folder, f"{doc_type.replace(' ', '_')}_Merged.pdf")
+            output = self.outputs[doc_type] = MergedPdfOutput(path, self.max_pages, self.max_bytes)
+        pdf_path = result['output']
+        try:
+            result['output'] = output.append(pdf_path, os.path.splitext(os.path.basename(pdf_path))[0])
+        except Exception as e:
+            logging.error(f"Could not add row {result['index']} to the merged PDF: {str(e)}")
+            result.update(ok=False, error=f"Merge failed: {str(e)}")
+            return False
+        try:
+            os.remove(pdf_path)
+        except OSError as e:
+            logging.warning(f"Could not remove {pdf_path} after merging: {str(e)}")
+        return True
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def close(self) -> List[str]:
+        """Finish the merged files; returns their paths"""
+        parts = []
+        for output in self.outputs.values():
+            parts.extend(output.close())
+        return parts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_logging(args)
+
+    try:
+        if not os.path.exists(args.data_file):
+            raise FileNotFoundError(f"Data file not found: {args.data_file}")
+        templates = resolve_templates(args)
+        if not any(templates.values()):
+            raise ValueError("No templates loaded! Cannot generate documents.")
+        os.makedirs(args.output_folder, exist_ok=True)
+        batches, total_rows = load_batches(args.data_file, not args.no_cache)
+    except Exception as e:
+        logging.error(str(e))
+        return 2
+
+    merged = args.mode == "merged"
+    # Merged runs delete the single PDFs, so there is nothing on disk to resume from
+    resume = not args.no_resume and not merged
+    if resume:
+        try:
+            log_template_changes(args.output_folder, templates)
+        except Exception as e:
+            logging.warning(f"Could not check the generation manifest: {str(e)}")
+
+    engine = BatchEngine(render_documents, workers=max(1, args.workers), chunk_size=args.chunk_size,
+                         per_chunk=True)
+    max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb else None
+    report = RunReport(args.output_folder, total_rows, merged, args.max_pages, max_bytes)
+    logging.info(f"Generating documents from {args.data_file} with {engine.workers} worker(s), "
+                 f"{args.chunk_size} rows per chunk, {args.backend} backend, {args.mode} output")
+    try:
+        run_generation(engine, batches, templates, args.output_folder, args.backend, report, resume)
+    except KeyboardInterrupt:
+        engine.cancel()
+        logging.warning("Interrupted; rows already rendered are kept")
+    finally:
+        parts = report.close()
+        close_converters()
+
+    for result in report.failures:
+        logging.error(f"Row {result.get('index')} failed: {result.get('error')}")
+    for path in parts:
+        logging.info(f"Merged file: {path}")
+    logging.info(
+        f"Generation complete in {report.elapsed:.1f}s ({report.rate:.1f} rows/s): "
+        f"{report.succeeded} generated, {report.skipped} already up to date, {len(report.failures)} failed"
+    )
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import os
+import sys
+import logging
+import pandas as pd
+from typing import Callable, Dict, Iterable, Optional
+
+from batch_engine import BatchEngine, failed_result, resolved_job
+from row_preparation import prepare_rows
+from run_manifest import RunManifest
+from template_metadata import template_metadata
+
+# Cache entries are only valid for one version of clean_data; bump this whenever it changes
+DATA_CACHE_NAMESPACE = "document_generator5/clean_data-1"
+
+# Document type -> template file in the templates folder
+DEFAULT_TEMPLATE_FILES = {
+    "Tax Invoice": "Tax-Note.docx",
+    "Credit Note": "Tax-Note.docx",
+    "Debit Note": "Tax-Note.docx",
+    "Eligible": "eligible_template.docx",
+    "Ineligible": "ineligible_template.docx"
+}
+
+# Receives every row's result dict: rendered, failed or already up to date
+Reporter = Callable[[Dict], None]
+
+
+def templates_folder() -> str:
+    """The templates folder shipped next to the script, or inside the PyInstaller bundle"""
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, "templates")
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+
+def default_templates(folder: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """Document type -> template path for the default templates that exist (None for missing ones)"""
+    folder = folder or templates_folder()
+    templates = {}
+    for doc_type, filename in DEFAULT_TEMPLATE_FILES.items():
+        template_path = os.path.join(folder, filename)
+        if os.path.exists(template_path):
+            templates[doc_type] = template_path
+            logging.info(f"Loaded {doc_type} template: {template_path}")
+        else:
+            templates[doc_type] = None
+            logging.warning(f"Template not found: {template_path}")
+    return templates
+
+
+def clean_data(df):
+    """Normalize columns and values of a data file, or of one batch of it"""
+    # Clean column names
+    df.columns = [str(col).strip().upper().replace(' ', '_') for col in df.columns]
+
+    # Fix eligibility column typos (a batch where the column is blank reads as float)
+    if 'ELIGIBLE/INELIGIBLE' in df.columns and not pd.api.types.is_numeric_dtype(df['ELIGIBLE/INELIGIBLE']):
+        df['ELIGIBLE/INELIGIBLE'] = (
+            df['ELIGIBLE/INELIGIBLE']
+            .str.strip()
+            .str.lower()
+            .replace({
+                'inelgible': 'ineligible',
+                'inellgible': 'ineligible'
+            })
+        )
+
+    # Convert numeric columns
+    tax_cols = [col for col in df.columns if any(x in col for x in ['IGST', 'CGST', 'SGST', 'UTGST', 'AMOUNT'])]
+    for col in tax_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    # Remove empty rows
+    df = df.dropna(how='all')
+
+    return df
+
+
+def iter_document_jobs(batches: Iterable[pd.DataFrame], templates: Dict[str, Optional[str]], output_folder: str,
+                       pdf_backend: str, manifest: Optional[RunManifest] = None):
+    """
+    Yield one generation job per row; rows that cannot be prepared, and
+    rows the manifest shows to be up to date, come as resolved jobs carrying
+    their result, so they are reported in input order with the rest
+    """
+    for data in batches:
+        try:
+            # Document types and placeholder values for the batch in one column-wise pass
+            records = prepare_rows(data)
+        except Exception as e:
+            logging.error(f"Error preparing row data: {str(e)}", exc_info=True)
+            for idx in data.index:
+                yield resolved_job(failed_result({'index': idx}, "failed to prepare data"))
+            continue
+
+        for record in records:
+            idx = record['index']
+            doc_type = record['doc_type']
+            if not doc_type:
+                logging.warning(f"Skipping row {idx} - could not determine document type")
+                yield resolved_job(failed_result({'index': idx}, "could not determine document type"))
+                continue
+
+            job = {
+                'index': idx,
+                'doc_type': doc_type,
+                'template_path': templates.get(doc_type),
+                'row_data': record['row_data'],
+                'output_folder': output_folder,
+                'pdf_backend': pdf_backend
+            }
+            if manifest is not None:
+                done = manifest.plan(job)
+                if done is not None:
+                    yield resolved_job(done)
+                    continue
+            yield job
+
+
+def run_generation(engine: BatchEngine, batches: Iterable[pd.DataFrame], templates: Dict[str, Optional[str]],
+                   output_folder: str, pdf_backend: str, report: Reporter, resume: bool = True):
+    """
+    Render every row of ``batches`` on ``engine`` and pass each row's result
+    to ``report``, in input order. With ``resume`` the output folder's
+    manifest skips documents that are already up to date. The manifest is
+    opened here, so call this from the thread that runs the batch.
+    """
+    # Scan each template once up front and record the document types rendered from it
+    for doc_type, template_path in templates.items():
+        if template_path and os.path.exists(template_path):
+            try:
+                template_metadata(template_path, doc_type)
+            except Exception as e:
+                logging.warning(f"Could not scan template {template_path}: {str(e)}")
+
+    manifest = None
+    if resume:
+        try:
+            manifest = RunManifest(output_folder)
+        except Exception as e:
+            logging.warning(f"Generation manifest unavailable, rendering every row: {str(e)}")
+
+    try:
+        jobs = iter_document_jobs(batches, templates, output_folder, pdf_backend, manifest)
+        for result in engine.run(jobs):
+            if manifest is not None:
+                manifest.record(result)
+            report(result)
+    finally:
+        if manifest is not None:
+            try:
+                manifest.close()
+            except Exception as e:
+                logging.error(f"Could not save the generation manifest: {str(e)}")
+
+    # Remove temp directory if empty
+    try:
+        os.rmdir(os.path.join(output_folder, "temp_docx"))
+    except OSError:
+        pass
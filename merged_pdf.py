@@ -0,0 +1,379 @@
+import io
+import os
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject,
+                            create_string_object)
+
+PDF_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+
+# Object numbers fixed up front: the page tree root is referenced by every page as it is written
+PAGES_OBJECT = 1
+CATALOG_OBJECT = 2
+
+# Content hashes of shared objects (fonts, images...) remembered for reuse; the
+# least recently used are forgotten beyond this, which caps the writer's memory
+SHARED_OBJECT_LIMIT = 4096
+
+# Page entries whose objects belong to that page alone and are never shared
+PAGE_PRIVATE_KEYS = ("/Contents", "/Annots")
+
+PdfSource = Union[bytes, str, BinaryIO, PdfReader]
+
+
+def open_pdf(source: PdfSource) -> PdfReader:
+    """A reader for PDF bytes, a path, a binary file or an existing reader"""
+    if isinstance(source, PdfReader):
+        return source
+    return PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+class MergedPdfWriter:
+    """
+    Writes a PDF by appending whole documents to it, one at a time.
+
+    Each appended document's pages and the objects they use are written to
+    the file as soon as the document is added, so only the object offsets,
+    the page references and one outline entry per document are kept in
+    memory, however many documents go in. The page tree, outline and
+    cross-reference table are written by ``close``.
+
+    With ``deduplicate``, resources such as embedded fonts and images are
+    identified by a hash of their content (including everything they
+    reference), and a resource already written for an earlier document is
+    referenced again instead of being copied. At most ``SHARED_OBJECT_LIMIT``
+    hashes are remembered, so memory stays bounded.
+    """
+
+    def __init__(self, path: str, deduplicate: bool = True):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(PDF_HEADER)
+        self.offsets: Dict[int, int] = {}
+        self.next_number = CATALOG_OBJECT + 1
+        self.page_refs: List[int] = []
+        self.bookmarks: List[Tuple[str, int]] = []  # (title, object number of the first page)
+        self.documents = 0
+        self.deduplicate = deduplicate
+        self.shared: "OrderedDict[bytes, int]" = OrderedDict()
+        self.reused = 0
+        self._mapping: Dict[Tuple[int, int], int] = {}
+        self._pending: List[Tuple[int, IndirectObject]] = []
+        self._digests: Dict[Tuple[int, int], Optional[bytes]] = {}
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_refs)
+
+    @property
+    def size(self) -> int:
+        """Bytes written so far"""
+        return self.file.tell()
+
+    # ----- Appending -----
+
+    def append(self, source: PdfSource, title: Optional[str] = None) -> int:
+        """
+        Append every page of ``source`` (PDF bytes, a path, a binary file or a reader),
+        with an outline entry ``title`` pointing at its first page. Returns
+        the number of pages added. A document that cannot be read is left
+        out completely.
+        """
+        self._mapping = {}
+        self._pending = []
+        self._digests = {}
+        start = (self.file.tell(), self.next_number, len(self.page_refs))
+
+        try:
+            reader = open_pdf(source)
+            # Numbered up front so links between the document's pages point at the copies
+            pages = list(reader.pages)
+            numbers = [self._reserve(getattr(page, 'indirect_ref', None)) for page in pages]
+            for number, page in zip(numbers, pages):
+                self._write_object(number, page, is_page=True)
+                self.page_refs.append(number)
+                self._drain()
+        except Exception:
+            self._rollback(*start)
+            raise
+
+        self.documents += 1
+        if title and numbers:
+            self.bookmarks.append((str(title), numbers[0]))
+        return len(pages)
+
+    def _rollback(self, position: int, next_number: int, page_count: int):
+        """Drop everything written by a failed ``append``"""
+        self.file.seek(position)
+        self.file.truncate()
+        self.offsets = {number: offset for number, offset in self.offsets.items() if number < next_number}
+        for digest in [digest for digest, number in self.shared.items() if number >= next_number]:
+            del self.shared[digest]
+        self.next_number = next_number
+        del self.page_refs[page_count:]
+
+    def _reserve(self, reference: Optional[IndirectObject]) -> int:
+        number = self.next_number
+        self.next_number += 1
+        if reference is not None:
+            self._mapping[(reference.idnum, reference.generation)] = number
+        return number
+
+    def _reference(self, reference: IndirectObject, share: bool = True) -> int:
+        """Number of the copy of ``reference``, queueing the object to be copied"""
+        key = (reference.idnum, reference.generation)
+        number = self._mapping.get(key)
+        if number is not None:
+            return number
+
+        digest = self._digest(reference, set()) if share and self.deduplicate else None
+        if digest is not None and digest in self.shared:
+            self.shared.move_to_end(digest)
+            number = self._mapping[key] = self.shared[digest]
+            self.reused += 1
+            return number
+
+        number = self._reserve(reference)
+        self._pending.append((number, reference))
+        if digest is not None:
+            self.shared[digest] = number
+            if len(self.shared) > SHARED_OBJECT_LIMIT:
+                self.shared.popitem(last=False)
+        return number
+
+    def _digest(self, reference: IndirectObject, visiting: set) -> Optional[bytes]:
+        """
+        Hash of an object and everything it references, or None if it cannot
+        be shared: it leads to a page or is part of a reference cycle.
+        """
+        key = (reference.idnum, reference.generation)
+        if key in self._digests:
+            return self._digests[key]
+        if key in visiting:
+            return None
+
+        visiting.add(key)
+        obj = reference.get_object()
+        digest = hashlib.sha256()
+        shareable = not (isinstance(obj, DictionaryObject) and obj.get("/Type") in ("/Page", "/Pages")) \
+            and self._hash_value(obj, digest, visiting)
+        visiting.discard(key)
+
+        result = digest.digest() if shareable else None
+        self._digests[key] = result
+        return result
+
+    def _hash_value(self, obj, digest, visiting: set) -> bool:
+        if isinstance(obj, IndirectObject):
+            child = self._digest(obj, visiting)
+            if child is None:
+                return False
+            digest.update(b"R" + child)
+        elif isinstance(obj, DictionaryObject):
+            digest.update(b"<<")
+            for key in sorted(obj):
+                if isinstance(obj, StreamObject) and key == "/Length":
+                    continue
+                digest.update(key.encode('utf-8') + b" ")
+                if not self._hash_value(obj[key], digest, visiting):
+                    return False
+            digest.update(b">>")
+            if isinstance(obj, StreamObject):
+                digest.update(b"stream%d:" % len(obj._data))
+                digest.update(obj._data)
+        elif isinstance(obj, ArrayObject):
+            digest.update(b"[")
+            for value in obj:
+                if not self._hash_value(value, digest, visiting):
+                    return False
+            digest.update(b"]")
+        else:
+            out = io.BytesIO()
+            obj.write_to_stream(out, None)
+            digest.update(type(obj).__name__.encode() + b":" + out.getvalue() + b" ")
+        return True
+
+    def _drain(self):
+        while self._pending:
+            number, reference = self._pending.pop()
+            self._write_object(number, reference.get_object())
+
+    # ----- Serialising -----
+
+    def _write_object(self, number: int, obj, is_page: bool = False):
+        out = io.BytesIO()
+        out.write(b"%d 0 obj\n" % number)
+        if is_page:
+            page = DictionaryObject({key: value for key, value in obj.items() if key != "/Parent"})
+            page[NameObject("/Parent")] = IndirectObject(PAGES_OBJECT, 0, None)
+            obj = page
+        self._serialise(obj, out, is_page=is_page)
+        out.write(b"\nendobj\n")
+        self.offsets[number] = self.file.tell()
+        self.file.write(out.getvalue())
+
+    def _serialise(self, obj, out: BinaryIO, share: bool = True, is_page: bool = False):
+        if isinstance(obj, IndirectObject):
+            if obj.pdf is None:  # One of ours, already renumbered
+                out.write(b"%d 0 R" % obj.idnum)
+            else:
+                out.write(b"%d 0 R" % self._reference(obj, share))
+        elif isinstance(obj, DictionaryObject):
+            out.write(b"<<")
+            for key, value in obj.items():
+                if isinstance(obj, StreamObject) and key == "/Length":
+                    continue
+                out.write(b"\n")
+                NameObject(key).write_to_stream(out, None)
+                out.write(b" ")
+                # Page content is unique; hashing it would only push shared fonts out of the cache
+                self._serialise(value, out, share and not (is_page and key in PAGE_PRIVATE_KEYS))
+            if isinstance(obj, StreamObject):
+                data = obj._data
+                out.write(b"\n/Length %d\n>>\nstream\n" % len(data))
+                out.write(data)
+                out.write(b"\nendstream")
+            else:
+                out.write(b"\n>>")
+        elif isinstance(obj, ArrayObject):
+            out.write(b"[")
+            for position, value in enumerate(obj):
+                if position:
+                    out.write(b" ")
+                self._serialise(value, out, share)
+            out.write(b"]")
+        else:
+            obj.write_to_stream(out, None)
+
+    def _write_raw(self, number: int, body: bytes):
+        self.offsets[number] = self.file.tell()
+        self.file.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _string(self, text: str) -> bytes:
+        out = io.BytesIO()
+        create_string_object(text).write_to_stream(out, None)
+        return out.getvalue()
+
+    # ----- Finishing -----
+
+    def _write_outline(self) -> Optional[int]:
+        if not self.bookmarks:
+            return None
+        root = self.next_number
+        first = root + 1
+        last = root + len(self.bookmarks)
+        self.next_number = last + 1
+
+        for position, (title, page) in enumerate(self.bookmarks):
+            number = first + position
+            links = b"/Parent %d 0 R" % root
+            if number > first:
+                links += b" /Prev %d 0 R" % (number - 1)
+            if number < last:
+                links += b" /Next %d 0 R" % (number + 1)
+            self._write_raw(number, b"<< /Title " + self._string(title) + b" " + links
+                            + b" /Dest [%d 0 R /Fit] >>" % page)
+        self._write_raw(root, b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>"
+                        % (first, last, len(self.bookmarks)))
+        return root
+
+    def close(self):
+        """Write the page tree, outline, cross-reference table and trailer"""
+        if self.file.closed:
+            return
+        kids = b" ".join(b"%d 0 R" % number for number in self.page_refs)
+        self._write_raw(PAGES_OBJECT, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.page_refs))
+
+        outline = self._write_outline()
+        catalog = b"<< /Type /Catalog /Pages %d 0 R" % PAGES_OBJECT
+        if outline:
+            catalog += b" /Outlines %d 0 R /PageMode /UseOutlines" % outline
+        self._write_raw(CATALOG_OBJECT, catalog + b" >>")
+
+        xref_offset = self.file.tell()
+        size = self.next_number
+        lines = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        for number in range(1, size):
+            offset = self.offsets.get(number)
+            lines.append(b"%010d 00000 n \n" % offset if offset is not None else b"0000000000 65535 f \n")
+        self.file.write(b"".join(lines))
+        self.file.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                        % (size, CATALOG_OBJECT, xref_offset))
+        self.file.close()
+        logging.info(f"Merged PDF saved: {self.path} ({self.documents} documents, {self.page_count} pages, "
+                     f"{self.reused} shared objects reused)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MergedPdfOutput:
+    """
+    Merged output, optionally split into parts. With a ``max_pages`` or
+    ``max_bytes`` limit, ``Merged.pdf`` is written as ``Merged_001.pdf``,
+    ``Merged_002.pdf``..., and a new part is started before a document that
+    would take the current one past either limit; a document is never split
+    across parts. With no limits everything goes into ``Merged.pdf``.
+    """
+
+    def __init__(self, path: str, max_pages: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.base, self.ext = os.path.splitext(path)
+        self.ext = self.ext or ".pdf"
+        self.max_pages = max_pages or None
+        self.max_bytes = max_bytes or None
+        self.writer: Optional[MergedPdfWriter] = None
+        self.parts: List[str] = []
+        self.last_document_size = 0
+
+    def _full(self, pages: int, size: int) -> bool:
+        writer = self.writer
+        if writer is None or not writer.documents:
+            return writer is None
+        if self.max_pages and writer.page_count + pages > self.max_pages:
+            return True
+        return bool(self.max_bytes and writer.size + size > self.max_bytes)
+
+    def append(self, source: PdfSource, title: Optional[str] = None) -> str:
+        """Append one document; returns the path of the part it went into"""
+        if isinstance(source, bytes):
+            size = len(source)
+        elif isinstance(source, str):
+            size = os.path.getsize(source)
+        else:
+            size = self.last_document_size  # Unknown: assume it is like the previous one
+        reader = open_pdf(source)
+
+        if self._full(len(reader.pages), size):
+            self._next_part()
+        self.writer.append(reader, title)
+        self.last_document_size = size
+        return self.writer.path
+
+    def _next_part(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.max_pages or self.max_bytes:
+            path = f"{self.base}_{len(self.parts) + 1:03d}{self.ext}"
+        else:
+            path = f"{self.base}{self.ext}"
+        self.writer = MergedPdfWriter(path)
+        self.parts.append(path)
+
+    def close(self) -> List[str]:
+        """Finish the last part and return the paths of all parts"""
+        if self.writer is not None:
+            self.writer.close()
+        return self.parts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
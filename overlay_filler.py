@@ -0,0 +1,241 @@
+import os
+import logging
+from typing import Callable, Iterable, List, Mapping, Sequence, Tuple
+
+import fitz  # PyMuPDF
+
+# Base-14 font registered once on the template; rows write WinAnsi text with it
+FONT_NAME = "helv"
+DEFAULT_FONT_SIZE = 11
+LINE_SPACING = 1.2
+
+# Default page for image backgrounds: A4 portrait in points, as fitz.Document.new_page uses
+DEFAULT_PAGE_SIZE = (595, 842)
+
+
+class OverlayField:
+    """
+    One value drawn on the template: ``column`` of the row, with its baseline
+    at ``(x, y)`` from the top left. Subclasses can override ``layout`` to
+    wrap or fit the text.
+    """
+    __slots__ = ('column', 'x', 'y', 'fontsize', 'color', 'page')
+
+    def __init__(self, column, x: float, y: float, fontsize: float = DEFAULT_FONT_SIZE,
+                 color: Tuple[float, float, float] = (0, 0, 0), page: int = 0):
+        self.column = column
+        self.x = x
+        self.y = y
+        self.fontsize = fontsize
+        self.color = color
+        self.page = page
+
+    def layout(self, value) -> Tuple[float, List[Tuple[float, float, str]]]:
+        """Font size and ``(x, baseline y, text)`` lines to draw for ``value``; one line per newline"""
+        step = self.fontsize * LINE_SPACING
+        return self.fontsize, [(self.x, self.y + i * step, line) for i, line in enumerate(str(value).split("\n"))]
+
+
+def _pdf_text(value) -> bytes:
+    """A value as a PDF string literal in WinAnsi encoding"""
+    data = str(value).encode('cp1252', errors='replace')
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class OverlayTemplate:
+    """
+    A PDF (or image) template prepared once for filling many rows.
+
+    Every template page is turned into a single Form XObject with the text
+    font registered next to it. Filling a row then only produces a small
+    text content stream per page that draws on top of the shared page:
+
+    * ``fill`` / ``write_files`` give one PDF per row by appending an
+      incremental update (the text stream and the page pointing at it) to
+      the prepared template bytes, so nothing is parsed or re-rendered;
+    * ``write_merged`` streams every row into one PDF the same way: one
+      update holds all rows' pages, each referencing the shared XObject and
+      resources, so the template is stored once.
+    """
+
+    def __init__(self, base: "fitz.Document"):
+        work = fitz.open("pdf", base.tobytes())
+        try:
+            self._register_font(work)
+            # Renumbered and compacted, so the object numbers below are those of base_bytes
+            self.base_bytes = work.tobytes(garbage=3, deflate=True)
+        finally:
+            work.close()
+        prepared = fitz.open("pdf", self.base_bytes)
+        try:
+            self.root = prepared.pdf_catalog()
+            self.page_tree = int(prepared.xref_get_key(self.root, "Pages")[1].split()[0])
+            self.size = prepared.xref_length()
+            self.pages = []  # (page xref, width, height, resources, template contents)
+            for page in prepared:
+                contents = prepared.xref_get_key(page.xref, "Contents")[1].strip("[] ")
+                resources = prepared.xref_get_key(page.xref, "Resources")[1]
+                self.pages.append((page.xref, page.rect.width, page.rect.height, resources, contents))
+            # Page dictionaries as rewritten by every row's update, with a slot for the text stream
+            self.page_objects = []
+            for number, (xref, *_rest) in enumerate(self.pages):
+                prepared.xref_set_key(xref, "Contents", f"[{self.pages[number][4]} {self.size + number} 0 R]")
+                self.page_objects.append(prepared.xref_object(xref, compressed=True).encode('latin-1'))
+        finally:
+            prepared.close()
+        tail = self.base_bytes.rstrip()
+        self.base_xref = int(tail[tail.rindex(b"startxref") + 9:].split()[0])
+
+    @staticmethod
+    def _register_font(doc: "fitz.Document"):
+        """
+        Point /Font/helv of every page's resources at one Helvetica font object.
+        Done by hand: Page.insert_font skips pages when the document already
+        holds a font of that name, as templates made with PyMuPDF do.
+        """
+        font = doc.get_new_xref()
+        doc.update_object(font, "<</Type/Font/Subtype/Type1/BaseFont/Helvetica/Encoding/WinAnsiEncoding>>")
+        for page in doc:
+            xref, key = page.xref, "Resources/Font"
+            kind, value = doc.xref_get_key(xref, "Resources")
+            if kind == "xref":
+                xref, key = int(value.split()[0]), "Font"
+            kind, value = doc.xref_get_key(xref, key)
+            if kind == "xref":
+                xref, key = int(value.split()[0]), ""
+            doc.xref_set_key(xref, f"{key}/{FONT_NAME}".lstrip("/"), f"{font} 0 R")
+
+    @classmethod
+    def from_pdf(cls, source) -> "OverlayTemplate":
+        """Template from a PDF path or an open fitz.Document; every page is kept"""
+        template = source if isinstance(source, fitz.Document) else fitz.open(source)
+        base = fitz.open()
+        try:
+            for page in template:
+                new_page = base.new_page(width=page.rect.width, height=page.rect.height)
+                new_page.show_pdf_page(new_page.rect, template, page.number)
+            return cls(base)
+        finally:
+            base.close()
+            if template is not source:
+                template.close()
+
+    @classmethod
+    def from_image(cls, image_path: str, page_size: Tuple[float, float] = DEFAULT_PAGE_SIZE) -> "OverlayTemplate":
+        """Template with an image stretched over a single page"""
+        image_page = fitz.open()
+        try:
+            page = image_page.new_page(width=page_size[0], height=page_size[1])
+            page.insert_image(page.rect, filename=image_path)
+            return cls.from_pdf(image_page)
+        finally:
+            image_page.close()
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    # ----- Row text -----
+
+    def text_stream(self, row: Mapping, fields: Sequence[OverlayField], page: int) -> bytes:
+        """Content stream drawing the row's values for one template page"""
+        height = self.pages[page][2]
+        ops = [b"q BT"]
+        for field in fields:
+            if field.page != page:
+                continue
+            fontsize, lines = field.layout(row[field.column])
+            r, g, b = field.color
+            ops.append(b"/%s %.2f Tf %.3f %.3f %.3f rg" % (FONT_NAME.encode(), fontsize, r, g, b))
+            for x, y, line in lines:
+                ops.append(b"1 0 0 1 %.2f %.2f Tm %s Tj" % (x, height - y, _pdf_text(line)))
+        ops.append(b"ET Q")
+        return b"\n".join(ops)
+
+    # ----- One file per row -----
+
+    def fill(self, row: Mapping, fields: Sequence[OverlayField]) -> bytes:
+        """The filled PDF for one row"""
+        out = bytearray(self.base_bytes)
+        if not out.endswith(b"\n"):
+            out += b"\n"
+        offsets = []
+        for number, page_object in enumerate(self.page_objects):
+            stream = self.text_stream(row, fields, number)
+            offsets.append((self.size + number, len(out)))
+            out += b"%d 0 obj\n<</Length %d>>\nstream\n" % (self.size + number, len(stream))
+            out += stream + b"\nendstream\nendobj\n"
+            offsets.append((self.pages[number][0], len(out)))
+            out += b"%d 0 obj\n" % self.pages[number][0] + page_object + b"\nendobj\n"
+
+        xref_offset = len(out)
+        # Entry 0 repeated so readers that expect a zero-based table accept the update
+        out += b"xref\n0 1\n0000000000 65535 f \n"
+        for number, offset in sorted(offsets):
+            out += b"%d 1\n%010d 00000 n \n" % (number, offset)
+        out += (b"trailer\n<</Size %d/Root %d 0 R/Prev %d>>\nstartxref\n%d\n%%%%EOF\n"
+                % (self.size + len(self.pages), self.root, self.base_xref, xref_offset))
+        return bytes(out)
+
+    def write_files(self, rows: Iterable[Tuple[object, Mapping]], fields: Sequence[OverlayField],
+                    folder: str, name: Callable[[object, Mapping], str]) -> List[str]:
+        """Write one PDF per ``(index, row)``, named by ``name(index, row)``; returns the paths"""
+        paths = []
+        for index, row in rows:
+            path = os.path.join(folder, name(index, row))
+            with open(path, 'wb') as f:
+                f.write(self.fill(row, fields))
+            paths.append(path)
+        logging.info(f"Wrote {len(paths)} filled PDFs to {folder}")
+        return paths
+
+    # ----- All rows in one file -----
+
+    def write_merged(self, rows: Iterable[Mapping], fields: Sequence[OverlayField], path: str) -> int:
+        """
+        Write every row into one PDF; returns the number of rows written. Rows
+        are written to the file as they come and a new page tree replaces the
+        template's, so memory and time grow linearly with the rows.
+        """
+        count = 0
+        offsets = []  # Object offsets of the update, numbered from self.size
+        kids = []
+        with open(path, 'wb') as out:
+            out.write(self.base_bytes)
+            position = len(self.base_bytes)
+            if not self.base_bytes.endswith(b"\n"):
+                out.write(b"\n")
+                position += 1
+
+            number = self.size
+            for row in rows:
+                for page, (_xref, width, height, resources, contents) in enumerate(self.pages):
+                    stream = self.text_stream(row, fields, page)
+                    text = (b"%d 0 obj\n<</Length %d>>\nstream\n" % (number, len(stream)) + stream
+                            + b"\nendstream\nendobj\n")
+                    page_object = (b"%d 0 obj\n<</Type/Page/Parent %d 0 R/MediaBox[0 0 %g %g]/Resources %s"
+                                   b"/Contents[%s %d 0 R]>>\nendobj\n"
+                                   % (number + 1, self.page_tree, width, height, resources.encode('latin-1'),
+                                      contents.encode('latin-1'), number))
+                    offsets.append(position)
+                    offsets.append(position + len(text))
+                    kids.append(number + 1)
+                    out.write(text)
+                    out.write(page_object)
+                    position += len(text) + len(page_object)
+                    number += 2
+                count += 1
+
+            tree_offset = position
+            out.write(b"%d 0 obj\n<</Type/Pages/Count %d/Kids[" % (self.page_tree, len(kids))
+                      + b" ".join(b"%d 0 R" % kid for kid in kids) + b"]>>\nendobj\n")
+            xref_offset = out.tell()
+            # Entry 0 repeated so readers that expect a zero-based table accept the update
+            out.write(b"xref\n0 1\n0000000000 65535 f \n%d 1\n%010d 00000 n \n" % (self.page_tree, tree_offset))
+            if offsets:
+                out.write(b"%d %d\n" % (self.size, len(offsets)))
+                out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+            out.write(b"trailer\n<</Size %d/Root %d 0 R/Prev %d>>\nstartxref\n%d\n%%%%EOF\n"
+                      % (number, self.root, self.base_xref, xref_offset))
+        logging.info(f"Wrote {count} filled rows to {path}")
+        return count
@@ -0,0 +1,73 @@
+import re
+from typing import Callable, Mapping, Optional, Set
+
+# {{X}} / {{ X }} first, then the single-brace forms {X} / { X }, in one alternation
+PLACEHOLDER_VARIANTS = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}|\{\s*([^{}]+?)\s*\}')
+DOUBLE_BRACE_PLACEHOLDER = re.compile(r'\{\{\s*([^{}]+?)\s*\}\}')
+
+
+class PlaceholderEngine:
+    """
+    Substitutes every placeholder in a text in a single regex pass.
+
+    All placeholder variants are matched by one compiled alternation and
+    each match is looked up once in the values, instead of one ``findall``
+    plus a ``str.replace`` per placeholder and variant. Keys are passed
+    through ``key_func`` before the lookup.
+
+    ``{{X}}`` is always a placeholder: without a value it becomes
+    ``missing_value`` (or is left as is when that is None). The single-brace
+    forms are only replaced when their key has a value, so literal braces in
+    the template text survive. ``used`` collects the keys that were filled
+    and ``missing`` the raw names that were not, for the replacement stats.
+    """
+
+    def __init__(self, key_func: Optional[Callable[[str], str]] = None, missing_value: Optional[str] = " - ",
+                 single_braces: bool = True):
+        self.key_func = key_func or str.strip
+        self.missing_value = missing_value
+        self.pattern = PLACEHOLDER_VARIANTS if single_braces else DOUBLE_BRACE_PLACEHOLDER
+
+    def substitute(self, text: str, values: Mapping[str, str], used: Optional[Set[str]] = None,
+                   missing: Optional[Set[str]] = None) -> str:
+        """``text`` with its placeholders filled from ``values``"""
+        if not text or '{' not in text:
+            return text
+
+        def fill(match):
+            raw = match.group(1)
+            double = raw is not None
+            if not double:
+                raw = match.group(2)
+            key = self.key_func(raw)
+            value = values.get(key)
+            if value is not None:
+                if used is not None:
+                    used.add(key)
+                return str(value)
+            if not double or self.missing_value is None:
+                if double and missing is not None:
+                    missing.add(raw)
+                return match.group(0)
+            if missing is not None:
+                missing.add(raw)
+            return self.missing_value
+
+        return self.pattern.sub(fill, text)
+
+    def fill_paragraph(self, paragraph, values: Mapping[str, str], used: Optional[Set[str]] = None,
+                       missing: Optional[Set[str]] = None, update: Optional[Callable] = None) -> bool:
+        """
+        Fill the placeholders in a python-docx paragraph. The new text is
+        written with ``update(paragraph, text)`` (default: ``paragraph.text = text``).
+        Returns True if the paragraph changed.
+        """
+        text = paragraph.text
+        new_text = self.substitute(text, values, used, missing)
+        if new_text == text:
+            return False
+        if update is None:
+            paragraph.text = new_text
+        else:
+            update(paragraph, new_text)
+        return True
@@ -0,0 +1,235 @@
+"""
+Export every row of a table as its own PDF: the row's columns and values in
+a two-column grid under a "Row Data" title.
+
+The page (title, grid and column names) is drawn once with ReportLab and
+compiled into a box layout, so each row only adds its values on top of the
+shared page (see box_layout). Rows are filled in chunks by a pool of worker
+processes and streamed to the output in order; the output path picks the
+format:
+
+    python row_pdf_export.py rows.pkl out_folder/    # one Row_N.pdf per row
+    python row_pdf_export.py rows.csv rows.zip       # the same files in a zip archive
+    python row_pdf_export.py rows.xlsx rows.pdf      # every row in one PDF
+
+Run it as a script so the pool can start safely from the GUI tools (they
+build their window at import time).
+"""
+import io
+import os
+import numbers
+import sys
+import logging
+import zipfile
+import argparse
+import multiprocessing
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from batch_engine import default_worker_count
+from box_layout import BoxLayout, FontMetrics, LayoutBox, MIN_FONT_SIZE, RenderPlan
+from data_reader import iter_data_batches
+from overlay_filler import OverlayTemplate
+
+TITLE = "Row Data"
+TITLE_FONT = ("Helvetica-Bold", 18)
+TITLE_HEIGHT = 28  # Leading plus the space after, as the sample Title style
+
+FONT_SIZE = 10
+ROW_HEIGHT = 18
+CELL_PADDING = (6, 3)  # Horizontal, vertical
+MARGIN = 72
+
+# Widest share of the table the column names may take
+LABEL_SHARE = 0.4
+
+# Rows sent to a worker at a time; filling a row is cheap, so chunks are large
+CHUNK_SIZE = 500
+
+OUTPUT_MODES = ("files", "zip", "merged")
+
+# (index, values by column position)
+Row = Tuple[object, Sequence]
+
+
+def output_mode(output_path: str) -> str:
+    """``merged`` for a .pdf path, ``zip`` for a .zip path, otherwise a folder of files"""
+    lower = output_path.lower()
+    if lower.endswith(".pdf"):
+        return "merged"
+    if lower.endswith(".zip"):
+        return "zip"
+    return "files"
+
+
+def row_file_name(index) -> str:
+    """The file of one row: numbered from 1 for the usual integer index"""
+    if isinstance(index, numbers.Integral):
+        return f"Row_{int(index) + 1}.pdf"
+    return f"Row_{index}.pdf"
+
+
+def _fit_label(text: str, font: str, width: float) -> float:
+    size = FONT_SIZE
+    while size > MIN_FONT_SIZE and stringWidth(text, font, size) > width:
+        size -= 0.5
+    return size
+
+
+def build_row_plan(columns: Sequence, title: str = TITLE,
+                   page_size: Tuple[float, float] = A4) -> RenderPlan:
+    """
+    Draw the page shared by every row and compile the value boxes over it.
+    Boxes read values by column position, so duplicate or non-text column
+    names are fine; tables taller than a page continue on further pages.
+    """
+    page_width, page_height = page_size
+    pad_x, pad_y = CELL_PADDING
+    table_width = page_width - 2 * MARGIN
+    labels = [str(column) for column in columns]
+    label_width = max([stringWidth(label, "Helvetica-Bold", FONT_SIZE) for label in labels] + [0]) + 2 * pad_x
+    label_width = min(max(label_width, 60), table_width * LABEL_SHARE)
+    value_width = table_width - label_width
+    ascender = FontMetrics().ascender
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=page_size)
+    pdf.setFont(*TITLE_FONT)
+    pdf.drawCentredString(page_width / 2, page_height - MARGIN - TITLE_FONT[1], title)
+    top = MARGIN + TITLE_HEIGHT  # From the top of the page, as the boxes are
+    page = 0
+    boxes = []
+    for position, label in enumerate(labels):
+        if top + ROW_HEIGHT > page_height - MARGIN:
+            pdf.showPage()
+            page += 1
+            top = MARGIN
+        bottom = page_height - top - ROW_HEIGHT
+
+        # The first row is styled as a header, as the per-row tables were
+        header = position == 0
+        if header:
+            pdf.setFillColor(colors.grey)
+            pdf.rect(MARGIN, bottom, table_width, ROW_HEIGHT, stroke=0, fill=1)
+        pdf.setLineWidth(1)
+        pdf.setStrokeColor(colors.black)
+        pdf.rect(MARGIN, bottom, label_width, ROW_HEIGHT, stroke=1, fill=0)
+        pdf.rect(MARGIN + label_width, bottom, value_width, ROW_HEIGHT, stroke=1, fill=0)
+
+        font = "Helvetica-Bold" if header else "Helvetica"
+        size = _fit_label(label, font, label_width - 2 * pad_x)
+        pdf.setFont(font, size)
+        pdf.setFillColor(colors.whitesmoke if header else colors.black)
+        pdf.drawString(MARGIN + pad_x, page_height - (top + pad_y + size * ascender), label)
+
+        color = colors.whitesmoke.rgb() if header else (0, 0, 0)
+        boxes.append(LayoutBox(position, MARGIN + label_width + pad_x, top + pad_y,
+                               value_width - 2 * pad_x, ROW_HEIGHT - 2 * pad_y, fontsize=FONT_SIZE,
+                               wrap=False, fit="shrink", color=color, page=page))
+        top += ROW_HEIGHT
+    pdf.showPage()
+    pdf.save()
+
+    with fitz.open("pdf", buffer.getvalue()) as source:
+        template = OverlayTemplate.from_pdf(source)
+    return BoxLayout(boxes, canvas=page_size, page_size=page_size).compile(template)
+
+
+def iter_frame_rows(df: pd.DataFrame) -> Iterator[Row]:
+    """``(index, values)`` per row, values by column position"""
+    for values in df.itertuples(index=True, name=None):
+        yield values[0], values[1:]
+
+
+def export_rows(rows: Iterable[Row], columns: Sequence, output_path: str, workers: Optional[int] = None,
+                chunk_size: int = CHUNK_SIZE, title: str = TITLE) -> Tuple[int, List]:
+    """
+    Export ``rows`` to ``output_path`` (a folder, .zip or .pdf); returns the
+    number of rows written and the indices of the rows that failed
+    """
+    plan = build_row_plan(columns, title)
+    mode = output_mode(output_path)
+    logging.info(f"Exporting rows of {len(columns)} columns to {output_path} ({mode}), "
+                 f"{plan.template.page_count} page(s) per row")
+
+    if mode == "merged":
+        # Every page references the shared template, so there is nothing to spread over workers
+        written = plan.write_merged((values for _index, values in rows), output_path)
+        return written, []
+
+    written, failed = 0, []
+    if mode == "zip":
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED) as archive:
+            # PDF streams are already compressed; storing keeps the archive as fast as the files
+            for result in plan.fill_rows(rows, workers, chunk_size):
+                if result['ok']:
+                    archive.writestr(row_file_name(result['index']), result['pdf'])
+                    written += 1
+                else:
+                    failed.append(result['index'])
+    else:
+        os.makedirs(output_path, exist_ok=True)
+        for result in plan.write_files(rows, output_path, lambda index, values: row_file_name(index),
+                                       workers, chunk_size):
+            if result['ok']:
+                written += 1
+            else:
+                failed.append(result['index'])
+    return written, failed
+
+
+def read_rows(data_path: str) -> Tuple[List, Iterator[Row]]:
+    """The columns of a pickled frame, CSV or Excel file and its rows; files are read in batches"""
+    if data_path.lower().endswith((".pkl", ".pickle")):
+        df = pd.read_pickle(data_path)
+        return list(df.columns), iter_frame_rows(df)
+
+    batches = iter_data_batches(data_path)
+    first = next(batches, None)
+    if first is None:
+        return [], iter(())
+
+    def rows():
+        yield from iter_frame_rows(first)
+        for batch in batches:
+            yield from iter_frame_rows(batch)
+
+    return list(first.columns), rows()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export every row of a table as its own PDF.")
+    parser.add_argument("data_path", help="Pickled DataFrame (.pkl), CSV or Excel file")
+    parser.add_argument("output_path", help="Folder for one PDF per row, a .zip archive or a merged .pdf")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows handed to a worker at a time")
+    parser.add_argument("--title", default=TITLE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        columns, rows = read_rows(args.data_path)
+        if not columns:
+            raise ValueError(f"No rows in {args.data_path}")
+        written, failed = export_rows(rows, columns, args.output_path, args.workers or default_worker_count(),
+                                      max(1, args.chunk_size), args.title)
+    except Exception as e:
+        logging.error(f"Row export failed: {str(e)}")
+        return 2
+
+    for index in failed:
+        logging.error(f"Row {index} could not be exported")
+    logging.info(f"Exported {written} rows to {args.output_path}")
+    # Exit status 1 tells the caller that some rows are missing
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
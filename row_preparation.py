@@ -0,0 +1,309 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+from amount_words import amount_in_words
+
+# Placeholder name → accepted column names, in order of preference
+COMMON_FIELDS = {
+    'INVOICE_NUMBER': ['INVOICE_NUMBER', 'INVOICENUMBER'],
+    'INVOICE_DATE': ['INVOICE_DATE', 'INVOICEDATE'],
+    'ISD_DISTRIBUTOR_NAME': ['ISD_DISTRIBUTOR_NAME', 'ISDDISTRIBUTORNAME'],
+    'ISD_DISTRIBUTOR_ADDRESS': ['ISD_DISTRIBUTOR_ADDRESS', 'ISDDISTRIBUTORADDRESS'],
+    'ISD_DISTRIBUTOR_STATE': ['ISD_DISTRIBUTOR_STATE', 'ISDDISTRIBUTORSTATE'],
+    'ISD_DISTRIBUTOR_PINCODE': ['ISD_DISTRIBUTOR_PINCODE', 'ISDDISTRIBUTORPINCODE'],
+    'ISD_DISTRIBUTOR_STATE_CODE': ['ISD_DISTRIBUTOR_STATE_CODE', 'ISDDISTRIBUTORSTATECODE'],
+    'ISD_DISTRIBUTOR_GSTIN': ['ISD_DISTRIBUTOR_GSTIN', 'ISDDISTRIBUTORGSTIN'],
+    'CREDIT_RECIPIENT_NAME': ['CREDIT_RECIPIENT_NAME', 'CREDITRECIPIENTNAME'],
+    'CREDIT_RECIPIENT_ADDRESS': ['CREDIT_RECIPIENT_ADDRESS', 'CREDITRECIPIENTADDRESS'],
+    'CREDIT_RECIPIENT_STATE': ['CREDIT_RECIPIENT_STATE', 'CREDITRECIPIENTSTATE'],
+    'CREDIT_RECIPIENT_PINCODE': ['CREDIT_RECIPIENT_PINCODE', 'CREDITRECIPIENTPINCODE'],
+    'CREDIT_RECIPIENT_STATE_CODE': ['CREDIT_RECIPIENT_STATE_CODE', 'CREDITRECIPIENTSTATECODE'],
+    'CREDIT_RECIPIENT_GSTIN': ['CREDIT_RECIPIENT_GSTIN', 'CREDITRECIPIENTGSTIN'],
+    'DOCUMENT_TYPE': ['DOCUMENT_TYPE', 'DOCUMENTTYPE'],
+    'SUPPLIER_NAME': ['SUPPLIER_NAME', 'SUPPLIERNAME'],
+    'SUPPLIER_ADDRESS': ['SUPPLIER_ADDRESS', 'SUPPLIERADDRESS'],
+    'SUPPLIER_PINCODE': ['SUPPLIER_PINCODE', 'SUPPLIERPINCODE'],
+    'SUPPLIER_STATE': ['SUPPLIER_STATE', 'SUPPLIERSTATE'],
+    'SUPPLIER_STATE_CODE': ['SUPPLIER_STATE_CODE', 'SUPPLIERSTATECODE'],
+    'SUPPLIER_GSTIN': ['SUPPLIER_GSTIN', 'SUPPLIERGSTIN'],
+    'DOCUMENT_NUMBER': ['DOCUMENT_NUMBER', 'DOCUMENTNUMBER'],
+    'DOCUMENT_DATE': ['DOCUMENT_DATE', 'DOCUMENTDATE'],
+    'VOUCHER_NO': ['VOUCHER_NO', 'VOUCHERNO'],
+    'VOUCHER_DATE': ['VOUCHER_DATE', 'VOUCHERDATE'],
+    'RECIPIENT_NAME_BILL_TO': ['RECIPIENT_NAME_BILL_TO', 'RECIPIENTNAMEBILLTO'],
+    'RECIPIENT_ADDRESS_BILL_TO': ['RECIPIENT_ADDRESS_BILL_TO', 'RECIPIENTADDRESSBILLTO'],
+    'RECIPIENT_PINCODE_BILL_TO': ['RECIPIENT_PINCODE_BILL_TO', 'RECIPIENTPINCODEBILLTO'],
+    'RECIPIENT_STATE_NAME_BILL_TO': ['RECIPIENT_STATE_NAME_BILL_TO', 'RECIPIENTSTATENAMEBILLTO'],
+    'RECIPIENT_STATE_CODE_BILL_TO': ['RECIPIENT_STATE_CODE_BILL_TO', 'RECIPIENTSTATECODEBILLTO'],
+    'RECIPIENT_GSTIN_BILL_TO': ['RECIPIENT_GSTIN_BILL_TO', 'RECIPIENTGSTINBILLTO'],
+    'POS': ['POS'],
+    'RECIPIENT_NAME_SHIP_TO': ['RECIPIENT_NAME_SHIP_TO', 'RECIPIENTNAMESHIPTO'],
+    'RECIPIENT_ADDRESS_SHIP_TO': ['RECIPIENT_ADDRESS_SHIP_TO', 'RECIPIENTADDRESSSHIPTO'],
+    'RECIPIENT_PINCODE_SHIP_TO': ['RECIPIENT_PINCODE_SHIP_TO', 'RECIPIENTPINCODESHIPTO'],
+    'RECIPIENT_STATE_NAME_SHIP_TO': ['RECIPIENT_STATE_NAME_SHIP_TO', 'RECIPIENTSTATENAMESHIPTO'],
+    'RECIPIENT_STATE_CODE_SHIP_TO': ['RECIPIENT_STATE_CODE_SHIP_TO', 'RECIPIENTSTATECODESHIPTO'],
+    'RECIPIENT_GSTIN_SHIP_TO': ['RECIPIENT_GSTIN_SHIP_TO', 'RECIPIENTGSTINSHIPTO'],
+    'DESCRIPTION_OF_GOODS': ['DESCRIPTION_OF_GOODS', 'DESCRIPTIONOFGOODS'],
+    'HSN': ['HSN'],
+    'QUANTITY': ['QUANTITY'],
+    'UNIT': ['UNIT'],
+    'UNIT_PRICE': ['UNIT_PRICE', 'UNITPRICE'],
+    'DISCOUNT': ['DISCOUNT'],
+    'TAX_RATE': ['TAX_RATE', 'TAXRATE'],
+    'BENEFICIARY_NAME': ['BENEFICIARY_NAME', 'BENEFICIARYNAME'],
+    'BANK_NAME': ['BANK_NAME', 'BANKNAME'],
+    'BANK_ADDRESS': ['BANK_ADDRESS', 'BANKADDRESS'],
+    'BANK_ACCOUNT_NO': ['BANK_ACCOUNT_NO', 'BANKACCOUNTNO'],
+    'BANK_IFSC_CODE': ['BANK_IFSC_CODE', 'BANKIFSCCODE'],
+
+    'REG_OFFICE': ['REG_OFFICE', 'REGOFFICE'],
+    'CIN': ['CIN'],
+    'E_MAIL': ['E_MAIL', 'EMAIL'],
+    'WEBSITE': ['WEBSITE']
+}
+
+# Tax columns for ISD documents (Eligible/Ineligible)
+ISD_TAX_FIELDS = {
+    'IGST_AS_IGST': ['IGST_AS_IGST'],
+    'CGST_AS_IGST': ['CGST_AS_IGST'],
+    'SGST_UTGST_AS_IGST': ['SGST_UTGST_AS_IGST'],
+    'IGST_SUM': ['IGST_SUM'],
+    'CGST_AS_CGST': ['CGST_AS_CGST'],
+    'CGST_SUM': ['CGST_SUM'],
+    'SGST_UTGST_AS_SGST_UTGST': ['SGST_UTGST_AS_SGST_UTGST'],
+    'SGST_UTGST_SUM': ['SGST_UTGST_SUM'],
+    'AMOUNT': ['AMOUNT']
+}
+
+# Tax columns for Tax Invoice/Credit Note/Debit Note
+TAX_NOTE_TAX_FIELDS = {
+    'TAXABLE_VALUE': ['TAXABLE_VALUE'],
+    'IGST_SUM': ['IGST_SUM'],
+    'CGST_SUM': ['CGST_SUM'],
+    'SGST_SUM': ['SGST_SUM', 'SGST_UTGST_SUM'],
+    'AMOUNT': ['AMOUNT']
+}
+
+ISD_DOCUMENT_TYPES = ['Eligible', 'Ineligible']
+TAX_NOTE_TYPES = ['Tax Invoice', 'Credit Note', 'Debit Note']
+
+EMPTY_VALUE = " - "
+EMPTY_MARKERS = ['', 'nan', 'None']
+
+
+def is_amount_key(key: Optional[str]) -> bool:
+    return bool(key) and any(x in str(key).lower() for x in ['amount', 'igst', 'cgst', 'sgst'])
+
+
+def format_value(value, key=None) -> str:
+    """Format values for display in the document, replacing empty values with ' - '"""
+    if pd.isna(value) or value in ['', None, 'nan', 'None']:
+        return EMPTY_VALUE  # Return dash for empty values
+
+    # Handle numpy types
+    if hasattr(value, 'item'):
+        value = value.item()
+
+    # Format amounts with 2 decimal places
+    if is_amount_key(key):
+        try:
+            # Remove any existing formatting
+            if isinstance(value, str):
+                value = value.replace(',', '').replace('[', '').replace(']', '')
+            return "{:,.2f}".format(float(value))
+        except (TypeError, ValueError):
+            return str(value)
+
+    # Special handling for GSTIN (format with spaces)
+    if key and 'gstin' in key.lower() and isinstance(value, str) and len(value) == 25:
+        return f"{value[0:25]}"
+
+    # Format dates
+    if key and 'date' in key.lower():
+        try:
+            if isinstance(value, str):
+                return value
+            return value.strftime('%d-%m-%Y') if hasattr(value, 'strftime') else str(value)
+        except (TypeError, ValueError):
+            return str(value)
+
+    return str(value).strip()
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Upper-case/underscore column names; on clashes the last column wins, as with a row dict"""
+    columns = [str(col).strip().upper().replace(' ', '_') for col in df.columns]
+    df = df.set_axis(columns, axis=1)
+    return df.loc[:, ~df.columns.duplicated(keep='last')]
+
+
+def resolve_alias(df: pd.DataFrame, variations: Sequence[str]) -> Optional[pd.Series]:
+    """Per row, the first non-empty value among the alias columns (None if no alias column exists)"""
+    present = [col for col in variations if col in df.columns]
+    if not present:
+        return None
+    if len(present) == 1:
+        return df[present[0]]
+    return df[present].bfill(axis=1).iloc[:, 0]
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    """Numbers from a column that may hold '1,234.50' style strings"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    cleaned = series.where(~series.map(lambda v: isinstance(v, str)),
+                           series.astype(str).str.replace(r'[,\[\]]', '', regex=True))
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def _map_unique(series: pd.Series, func) -> pd.Series:
+    """Apply ``func`` once per distinct value; invoice columns repeat a lot"""
+    codes, uniques = pd.factorize(series)
+    formatted = np.array([func(value) for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(formatted[codes], index=series.index, dtype=object)
+
+
+def _format_amounts(numbers: pd.Series) -> pd.Series:
+    return _map_unique(numbers, "{:,.2f}".format)
+
+
+def format_column(series: pd.Series, key: str) -> pd.Series:
+    """Vectorised ``format_value`` over a whole column"""
+    missing = series.isna() | series.isin(EMPTY_MARKERS)
+    is_text = not pd.api.types.is_numeric_dtype(series)
+
+    key_lower = key.lower()
+    if is_amount_key(key):
+        numbers = _numeric(series)
+        text = _format_amounts(numbers.fillna(0))
+        if numbers.isna().any():
+            # Values that are not numbers keep their text, as format_value does
+            text = text.where(numbers.notna(), _map_unique(series, str))
+    elif 'date' in key_lower:
+        text = _map_unique(series, lambda v: v if isinstance(v, str)
+                           else v.strftime('%d-%m-%Y') if hasattr(v, 'strftime') else str(v))
+    elif 'gstin' in key_lower and is_text:
+        text = _map_unique(series, lambda v: v if isinstance(v, str) and len(v) == 25 else str(v).strip())
+    else:
+        text = _map_unique(series, lambda v: str(v).strip())
+
+    return text.where(~missing, EMPTY_VALUE)
+
+
+def determine_document_types(df: pd.DataFrame) -> pd.Series:
+    """Document type per row (None where it cannot be determined), column by column"""
+    df = normalize_columns(df)
+    doc_types = pd.Series([None] * len(df), index=df.index, dtype=object)
+
+    # Fallback to checking tax amounts
+    if 'IGST_AS_IGST' in df.columns:
+        eligibility = df['ELIGIBLE/INELIGIBLE'] if 'ELIGIBLE/INELIGIBLE' in df.columns else pd.Series('', index=df.index)
+        has_igst = _numeric(df['IGST_AS_IGST']) > 0
+        is_eligible = eligibility.astype(str).str.upper().str.contains('ELIGIBLE', regex=False)
+        doc_types[has_igst] = np.where(is_eligible[has_igst], "Eligible", "Ineligible")
+
+    # Then try ELIGIBLE/INELIGIBLE column
+    if 'ELIGIBLE/INELIGIBLE' in df.columns:
+        eligibility = df['ELIGIBLE/INELIGIBLE']
+        values = eligibility.astype(str).str.strip().str.lower()
+        matched = eligibility.notna() & values.isin(['eligible', 'ineligible'])
+        doc_types[matched] = values[matched].str.title()
+
+    # First try DOCUMENT_TYPE column
+    if 'DOCUMENT_TYPE' in df.columns:
+        declared = df['DOCUMENT_TYPE']
+        values = declared.astype(str).str.strip().str.title()
+        matched = declared.notna() & values.isin(TAX_NOTE_TYPES)
+        doc_types[matched] = values[matched]
+
+    return doc_types
+
+
+def prepare_rows(df: pd.DataFrame, doc_types: Optional[Sequence] = None) -> List[Dict]:
+    """
+    Build the placeholder values for every row at once.
+
+    Column aliases are resolved, amounts and dates formatted and the tax sums
+    computed as whole-column operations. Returns one compact record per row:
+    ``{'index', 'doc_type', 'row_data'}``; ``row_data`` only holds fields that
+    have a value, exactly like the per-row preparation did.
+    """
+    df = normalize_columns(df)
+    if doc_types is None:
+        doc_types = determine_document_types(df)
+    doc_types = pd.Series(list(doc_types), index=df.index, dtype=object)
+    is_isd = doc_types.isin(ISD_DOCUMENT_TYPES)
+
+    columns: Dict[str, pd.Series] = {}   # formatted text, NaN where the row has no value
+    raw: Dict[str, pd.Series] = {}       # resolved raw values for the sums
+
+    def add(fields: Dict[str, List[str]], rows: Optional[pd.Series] = None):
+        for standard_name, variations in fields.items():
+            values = resolve_alias(df, variations)
+            if values is None:
+                continue
+            present = values.notna() if rows is None else values.notna() & rows
+            if not present.any():
+                continue
+            text = format_column(values, standard_name).where(present)
+            columns[standard_name] = columns[standard_name].fillna(text) if standard_name in columns else text
+            raw[standard_name] = values.where(present) if standard_name not in raw else raw[standard_name].fillna(
+                values.where(present))
+
+    add(COMMON_FIELDS)
+    add(ISD_TAX_FIELDS, is_isd)
+    add(TAX_NOTE_TAX_FIELDS, ~is_isd)
+
+    def numbers(name: str) -> pd.Series:
+        return _numeric(df[name]) if name in df.columns else pd.Series(np.nan, index=df.index)
+
+    def fill_sum(name: str, total: pd.Series, available: pd.Series):
+        current = columns.get(name, pd.Series(np.nan, index=df.index, dtype=object))
+        needed = current.isna() & available
+        if needed.any():
+            columns[name] = current.where(~needed, _format_amounts(total.fillna(0)).where(needed))
+            raw[name] = raw.get(name, pd.Series(np.nan, index=df.index)).where(~needed, total)
+
+    # Calculate sums if not provided
+    igst_parts = ['IGST_AS_IGST', 'CGST_AS_IGST', 'SGST_UTGST_AS_IGST']
+    if all(col in df.columns for col in igst_parts):
+        available = df[igst_parts].notna().all(axis=1)
+        fill_sum('IGST_SUM', numbers('IGST_AS_IGST') + numbers('CGST_AS_IGST') + numbers('SGST_UTGST_AS_IGST'),
+                 available)
+    if 'CGST_AS_CGST' in df.columns:
+        fill_sum('CGST_SUM', numbers('CGST_AS_CGST'), df['CGST_AS_CGST'].notna())
+    if 'SGST_UTGST_AS_SGST_UTGST' in df.columns:
+        fill_sum('SGST_UTGST_SUM', numbers('SGST_UTGST_AS_SGST_UTGST'), df['SGST_UTGST_AS_SGST_UTGST'].notna())
+
+    sum_names = ['IGST_SUM', 'CGST_SUM', 'SGST_UTGST_SUM']
+    if all(name in columns for name in sum_names):
+        available = pd.concat([columns[name].notna() for name in sum_names], axis=1).all(axis=1)
+        total = sum(_numeric(raw[name]) for name in sum_names)
+        fill_sum('AMOUNT', total, available)
+
+    # Amount in words, converted once per distinct amount
+    if 'AMOUNT' in raw:
+        amounts = _numeric(raw['AMOUNT']).where(columns['AMOUNT'].notna(), 0)
+    else:
+        amounts = pd.Series(0.0, index=df.index)
+    words_cache = {}
+    for amount in pd.unique(amounts.dropna()):
+        try:
+            words_cache[amount] = amount_in_words(float(amount))
+        except Exception as e:
+            logging.error(f"Amount conversion error: {str(e)}")
+            words_cache[amount] = "Rupees Only"
+    columns['amount_in_words'] = amounts.map(words_cache).fillna("Rupees Only")
+
+    # Compact records: only the fields each row actually has
+    names = list(columns)
+    value_rows = zip(*(columns[name].tolist() for name in names))
+    records = []
+    for idx, doc_type, values in zip(df.index, doc_types.tolist(), value_rows):
+        records.append({
+            'index': idx,
+            'doc_type': doc_type,
+            'row_data': {name: value for name, value in zip(names, values) if isinstance(value, str)}
+        })
+    return records
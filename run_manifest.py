@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from data_cache import file_digest
+
+MANIFEST_FILE = "generation_manifest.sqlite"
+
+# Rows written to the manifest per transaction; a crash loses at most this many records
+COMMIT_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name          TEXT PRIMARY KEY,
+    row_index     TEXT,
+    row_hash      TEXT NOT NULL,
+    template_hash TEXT NOT NULL,
+    doc_type      TEXT NOT NULL,
+    pdf_backend   TEXT,
+    output_path   TEXT NOT NULL,
+    rendered_at   REAL NOT NULL
+)
+"""
+
+
+def row_hash(row_data: Dict) -> str:
+    """Content hash of a row's placeholder values"""
+    payload = json.dumps(row_data, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def template_fingerprint(template_path: str) -> str:
+    """
+    Content fingerprint of a template. For DOCX files it covers the name, CRC
+    and size of every part except the document properties, so re-saving a
+    template without editing it (which rewrites timestamps and the revision
+    count) does not invalidate the documents rendered from it.
+    """
+    try:
+        with zipfile.ZipFile(template_path) as archive:
+            parts = sorted((info.filename, info.CRC, info.file_size) for info in archive.infolist()
+                           if not info.filename.startswith('docProps/'))
+    except zipfile.BadZipFile:
+        return file_digest(template_path)
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+
+def template_dependencies(templates: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
+    """Document types rendered from each template file, e.g. Tax-Note.docx -> three note types"""
+    dependencies: Dict[str, List[str]] = {}
+    for doc_type, template_path in templates.items():
+        if template_path:
+            dependencies.setdefault(os.path.abspath(template_path), []).append(doc_type)
+    return dependencies
+
+
+def stable_basename(doc_type: str, row_data: Dict, idx) -> str:
+    """File name (without extension) that stays the same from one run to the next"""
+    invoice_num = str(row_data.get('INVOICE_NUMBER', f"ROW_{idx}")).strip()
+    name = f"{doc_type.replace(' ', '_')}_{invoice_num}"
+    # Invoice numbers such as 12/2024 must not create sub-folders
+    return "".join("_" if c in '<>:"/\\|?*' else c for c in name)
+
+
+class RunManifest:
+    """
+    Record of the documents generated into an output folder, kept in an
+    SQLite file next to them.
+
+    Each document is stored under its output name with the hash of its row
+    data, the hash of the template it was rendered from, its document type
+    and PDF backend. A rerun over the same data skips every row whose record
+    still matches and whose PDF is still on disk, so an interrupted run
+    resumes where it stopped and only changed rows are rendered again.
+
+    Output names no longer carry a timestamp: a row keeps its name across
+    runs, and a regenerated document replaces the old file.
+
+    The connection belongs to the thread that opened the manifest.
+    """
+
+    @staticmethod
+    def exists(output_folder: str) -> bool:
+        return os.path.exists(os.path.join(output_folder, MANIFEST_FILE))
+
+    def __init__(self, output_folder: str):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, MANIFEST_FILE)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        self.template_hashes: Dict[str, str] = {}
+        self.pending: Dict = {}  # index -> record awaiting its result
+        self.names = set()  # Output names handed out in this run
+        self.uncommitted = 0
+        self.skipped = 0
+
+    # ----- Fingerprints -----
+
+    def template_hash(self, template_path: Optional[str]) -> str:
+        """Fingerprint of a template, computed once per run"""
+        if not template_path:
+            return ""
+        if template_path not in self.template_hashes:
+            try:
+                self.template_hashes[template_path] = template_fingerprint(template_path)
+            except OSError:
+                self.template_hashes[template_path] = ""
+        return self.template_hashes[template_path]
+
+    def invalidated(self, templates: Dict[str, Optional[str]]) -> List[Tuple[str, List[str], int]]:
+        """
+        Templates that changed since documents were rendered from them, as
+        ``(template_path, doc_types, documents to regenerate)``. Only the
+        document types that use a changed template are counted; a template
+        shared by several types invalidates all of them.
+        """
+        counts = self.connection.execute(
+            "SELECT doc_type, template_hash, COUNT(*) FROM documents GROUP BY doc_type, template_hash"
+        ).fetchall()
+
+        changes = []
+        for template_path, doc_types in template_dependencies(templates).items():
+            current = self.template_hash(template_path)
+            stale = sum(count for doc_type, rendered_hash, count in counts
+                        if doc_type in doc_types and rendered_hash != current)
+            if stale:
+                changes.append((template_path, doc_types, stale))
+        return changes
+
+    def _unique_name(self, job: Dict) -> str:
+        # Rows sharing an invoice number get their row index appended, in input order
+        name = stable_basename(job['doc_type'], job['row_data'], job['index'])
+        if name in self.names:
+            name = f"{name}_ROW_{job['index']}"
+        self.names.add(name)
+        return name
+
+    # ----- Planning and recording -----
+
+    def plan(self, job: Dict) -> Optional[Dict]:
+        """
+        Name ``job``'s output (sets ``job['basename']``) and decide whether it
+        must be rendered. Returns None if it must, or the result to report
+        for a document that is already up to date.
+        """
+        name = self._unique_name(job)
+        job['basename'] = name
+        record = {
+            'name': name,
+            'row_index': str(job['index']),
+            'row_hash': row_hash(job['row_data']),
+            'template_hash': self.template_hash(job.get('template_path')),
+            'doc_type': job['doc_type'],
+            'pdf_backend': job.get('pdf_backend', 'auto')
+        }
+
+        known = self.connection.execute(
+            "SELECT row_hash, template_hash, doc_type, pdf_backend, output_path FROM documents WHERE name = ?",
+            (name,)
+        ).fetchone()
+        if known and known[:4] == (record['row_hash'], record['template_hash'], record['doc_type'],
+                                   record['pdf_backend']) and os.path.exists(known[4]):
+            self.skipped += 1
+            return {'index': job['index'], 'doc_type': job['doc_type'], 'ok': True, 'output': known[4],
+                    'error': None, 'skipped': True}
+
+        self.pending[job['index']] = record
+        return None
+
+    def record(self, result: Dict):
+        """Store the outcome of a rendered job; failed rows are rendered again next run"""
+        record = self.pending.pop(result.get('index'), None)
+        if record is None or not result.get('ok') or not result.get('output'):
+            return
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO documents "
+            "(name, row_index, row_hash, template_hash, doc_type, pdf_backend, output_path, rendered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (record['name'], record['row_index'], record['row_hash'], record['template_hash'],
+             record['doc_type'], record['pdf_backend'], result['output'], time.time())
+        )
+        self.uncommitted += 1
+        if self.uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self.connection.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+        if self.skipped:
+            logging.info(f"Skipped {self.skipped} documents that were already up to date")
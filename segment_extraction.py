@@ -0,0 +1,267 @@
+"""
+Extract fields from the text of PDF pages with a segment schema.
+
+A schema says where a record starts and stops on a page (``start`` and
+``stop`` regexes) and which columns to pull out of it (one regex per
+column, the first group being the value) with the column's type. It is
+compiled once and sent to worker processes that each read a range of pages
+with PyMuPDF; the records come back in page order and are written as one
+typed table (.xlsx, .csv or .parquet). Example schema:
+
+    {
+      "version": 1,
+      "start": "Invoice No",
+      "stop": "Authorised Signatory",
+      "per": "start",
+      "columns": [
+        {"name": "Invoice Number", "pattern": "Invoice No[.:]?\\s*(\\S+)"},
+        {"name": "Invoice Date", "pattern": "Date[.:]?\\s*(\\d{2}/\\d{2}/\\d{4})", "type": "date", "format": "%d/%m/%Y"},
+        {"name": "Amount", "pattern": "Total[^\\d]*([\\d,]+\\.\\d{2})", "type": "number"}
+      ]
+    }
+
+A schema without columns keeps the old export: each text block after the
+start anchor becomes a ``Segment N`` column. Pages without a text layer
+(scans that were never OCRed) yield no records.
+
+    python segment_extraction.py invoices.pdf invoices.xlsx --schema schema.json [--workers N]
+    python segment_extraction.py invoices.pdf invoices.xlsx --start "Invoice No"
+"""
+import re
+import sys
+import json
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+import pandas as pd
+
+from batch_engine import BatchEngine, default_worker_count
+
+SCHEMA_VERSION = 1
+
+COLUMN_TYPES = ("text", "number", "integer", "date")
+RECORD_MODES = ("page", "start")
+
+# Pages one worker reads per job
+PAGES_PER_JOB = 32
+
+# Thousands separators, currency signs and spaces dropped before numbers are parsed
+NUMBER_NOISE = r'[,\s₹$€£]|Rs\.?|INR'
+
+
+class SegmentColumn:
+    """One output column: a regex whose first group (or whole match) is the value, and its type"""
+
+    def __init__(self, name: str, pattern: str, type: str = "text", format: Optional[str] = None,
+                 flags: int = re.IGNORECASE):
+        if type not in COLUMN_TYPES:
+            raise ValueError(f"Unknown type '{type}' for column {name}; use one of {', '.join(COLUMN_TYPES)}")
+        self.name = name
+        self.pattern = re.compile(pattern, flags)
+        self.type = type
+        self.format = format
+
+    def find(self, text: str) -> Optional[str]:
+        match = self.pattern.search(text)
+        if match is None:
+            return None
+        value = match.group(1) if self.pattern.groups else match.group(0)
+        return value.strip() if value else None
+
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'pattern': self.pattern.pattern, 'type': self.type}
+        if self.format:
+            data['format'] = self.format
+        return data
+
+    def convert(self, values: pd.Series) -> pd.Series:
+        """The raw strings of this column as a typed Series; values that do not parse become missing"""
+        if self.type == "number":
+            return pd.to_numeric(values.str.replace(NUMBER_NOISE, "", regex=True), errors='coerce')
+        if self.type == "integer":
+            numbers = pd.to_numeric(values.str.replace(NUMBER_NOISE, "", regex=True), errors='coerce')
+            return numbers.round().astype("Int64")
+        if self.type == "date":
+            return pd.to_datetime(values, format=self.format, errors='coerce', dayfirst=self.format is None)
+        return values.astype("string")
+
+
+class SegmentSchema:
+    """
+    Where records are on a page and what to extract from them. ``per="page"``
+    makes one record per page (from the first ``start`` match to the next
+    ``stop``); ``per="start"`` makes one record per ``start`` match.
+    """
+
+    def __init__(self, columns: List[SegmentColumn], start: Optional[str] = None, stop: Optional[str] = None,
+                 per: str = "page"):
+        if per not in RECORD_MODES:
+            raise ValueError(f"Unknown record mode '{per}'; use one of {', '.join(RECORD_MODES)}")
+        self.columns = columns
+        self.start = re.compile(start, re.IGNORECASE) if start else None
+        self.stop = re.compile(stop, re.IGNORECASE) if stop else None
+        self.per = per
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SegmentSchema":
+        version = data.get('version', SCHEMA_VERSION)
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported segment schema version {version}")
+        columns = [SegmentColumn(**column) for column in data.get('columns', [])]
+        return cls(columns, data.get('start'), data.get('stop'), data.get('per', "page"))
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentSchema":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_start_text(cls, text: Optional[str]) -> "SegmentSchema":
+        """The old export: every block from the first one containing ``text``"""
+        return cls([], re.escape(text) if text else None)
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': SCHEMA_VERSION,
+            'start': self.start.pattern if self.start else None,
+            'stop': self.stop.pattern if self.stop else None,
+            'per': self.per,
+            'columns': [column.to_dict() for column in self.columns]
+        }
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def _windows(self, text: str) -> List[str]:
+        """The parts of a page's text that hold records"""
+        if self.start is None:
+            starts = [0]
+        else:
+            starts = [match.start() for match in self.start.finditer(text)]
+            if not starts:
+                return []
+            if self.per == "page":
+                starts = starts[:1]
+
+        windows = []
+        for i, begin in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else len(text)
+            if self.stop is not None:
+                # The stop anchor is part of the record, so totals printed on it can be matched
+                stop = self.stop.search(text, begin, end)
+                if stop is not None:
+                    end = text.find("\n", stop.end(), end)
+                    end = len(text) if end < 0 else end
+            windows.append(text[begin:end])
+        return windows
+
+    def records(self, blocks: List[str]) -> List[Dict]:
+        """Records found in the text blocks of one page, in reading order"""
+        if not self.columns:
+            # Block mode: everything from the block holding the start anchor on
+            if self.start is not None:
+                first = next((i for i, block in enumerate(blocks) if self.start.search(block)), None)
+                if first is None:
+                    return [{}]
+                blocks = blocks[first:]
+            return [{f"Segment {i + 1}": block for i, block in enumerate(blocks)}]
+
+        records = []
+        for window in self._windows("\n".join(blocks)):
+            records.append({column.name: column.find(window) for column in self.columns})
+        return records
+
+
+def extract_page_records(job: Dict) -> Dict:
+    """Worker: records of pages ``start``..``stop``, each tagged with its page number"""
+    schema: SegmentSchema = job['schema']
+    records = []
+    with fitz.open(job['path']) as doc:
+        for number in range(job['start'], job['stop']):
+            # Text blocks only (type 0); image blocks carry no text
+            blocks = [block[4] for block in doc[number].get_text("blocks") if block[6] == 0]
+            for record in schema.records(blocks):
+                record["Page Number"] = number + 1
+                records.append(record)
+    return {'index': job['index'], 'doc_type': None, 'ok': True, 'output': None, 'error': None,
+            'records': records}
+
+
+def records_to_frame(records: List[Dict], schema: SegmentSchema) -> pd.DataFrame:
+    """The records as a table with the schema's column order and types"""
+    if not schema.columns:
+        df = pd.DataFrame.from_records(records)
+        segments = sorted((c for c in df.columns if c != "Page Number"), key=lambda c: int(c.split()[-1]))
+        return df.reindex(columns=segments + ["Page Number"])
+
+    names = [column.name for column in schema.columns]
+    raw = {name: pd.Series([record.get(name) for record in records], dtype=object) for name in names}
+    data = {column.name: column.convert(raw[column.name].astype("string")) for column in schema.columns}
+    data["Page Number"] = pd.Series([record["Page Number"] for record in records], dtype="int64")
+    return pd.DataFrame(data)
+
+
+def write_frame(df: pd.DataFrame, output_path: str):
+    """Write the table in the format given by the file extension"""
+    lower = output_path.lower()
+    if lower.endswith(".parquet"):
+        df.to_parquet(output_path, index=False)
+    elif lower.endswith(".csv"):
+        df.to_csv(output_path, index=False, encoding="utf-8-sig")
+    else:
+        df.to_excel(output_path, index=False)
+
+
+def extract_segments(pdf_path: str, schema: SegmentSchema, output_path: str, workers: Optional[int] = None,
+                     pages_per_job: int = PAGES_PER_JOB) -> int:
+    """Extract the schema's records from every page of ``pdf_path`` into ``output_path``; returns the record count"""
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+
+    jobs = [{'index': index, 'path': pdf_path, 'schema': schema, 'start': start,
+             'stop': min(start + pages_per_job, page_count)}
+            for index, start in enumerate(range(0, page_count, pages_per_job))]
+    workers = min(workers or default_worker_count(), max(1, len(jobs)))
+    engine = BatchEngine(extract_page_records, workers=workers, chunk_size=1)
+    logging.info(f"Extracting segments from {page_count} pages of {pdf_path} with {engine.workers} worker(s)")
+
+    records = []
+    for result in engine.run(jobs):
+        if not result['ok']:
+            raise RuntimeError(f"Could not extract pages of {pdf_path}: {result['error']}")
+        records.extend(result['records'])
+
+    df = records_to_frame(records, schema)
+    write_frame(df, output_path)
+    logging.info(f"Wrote {len(df)} records to {output_path}")
+    return len(df)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract fields from the text of PDF pages with a segment schema.")
+    parser.add_argument("pdf_path")
+    parser.add_argument("output_path", help="Output .xlsx, .csv or .parquet file")
+    parser.add_argument("--schema", help="Segment schema JSON file")
+    parser.add_argument("--start", help="Without a schema: export the text blocks from this text on")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--pages-per-job", type=int, default=PAGES_PER_JOB)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        schema = SegmentSchema.load(args.schema) if args.schema else SegmentSchema.from_start_text(args.start)
+        records = extract_segments(args.pdf_path, schema, args.output_path, args.workers,
+                                   max(1, args.pages_per_job))
+    except Exception as e:
+        logging.error(f"Segment extraction failed: {str(e)}")
+        return 2
+    return 0 if records else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Full-frame orders kept per index, one per distinct key list
+ORDER_CACHE_SIZE = 16
+
+# Filters smaller than this share of the frame are sorted directly instead of
+# being picked out of an order over the whole frame
+SUBSET_FRACTION = 1 / 16
+
+# (column, ascending)
+SortKey = Tuple[str, bool]
+
+
+def toggle_key(keys: Sequence[SortKey], column: str, add: bool = False) -> List[SortKey]:
+    """
+    The sort keys after a click on ``column``'s header: a plain click sorts by
+    the column alone (flipping it if it already was the only key), ``add``
+    (shift+click) appends it as a further key or flips it where it is.
+    """
+    keys = list(keys)
+    for position, (name, ascending) in enumerate(keys):
+        if name == column:
+            if add or len(keys) == 1:
+                keys[position] = (column, not ascending)
+                return keys
+            break
+    if add:
+        return keys + [(column, True)]
+    return [(column, True)]
+
+
+class SortIndex:
+    """
+    Sort orders over one DataFrame, built lazily and kept for its lifetime.
+
+    Each column is reduced once to integer ranks (equal values share a
+    rank, missing values rank last in either direction), so a sort on any
+    number of keys is one stable ``np.lexsort`` over small integer arrays
+    instead of a ``sort_values`` over the frame. The order of every key list
+    used over the whole frame is cached; a filtered subset takes its rows
+    from that order with a mask, so changing the search keeps the sort free.
+    Ties keep frame order, as the rows of a search result do.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.ranks: Dict[str, Tuple[np.ndarray, int]] = {}
+        self.orders: "OrderedDict[Tuple[SortKey, ...], np.ndarray]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.df)
+
+    def _ranks(self, column: str) -> Tuple[np.ndarray, int]:
+        """Rank of every row's value in ``column`` and the number of distinct values"""
+        cached = self.ranks.get(column)
+        if cached is not None:
+            return cached
+
+        # The first column of that name, as the search index does
+        series = self.df.iloc[:, list(self.df.columns).index(column)]
+        try:
+            codes, uniques = pd.factorize(series, sort=True)
+        except TypeError:
+            # Mixed types (numbers and text in one column) compare as displayed
+            codes, uniques = pd.factorize(series.astype(str).where(series.notna()), sort=True)
+        size = len(uniques)
+        codes = codes.astype(np.int32 if size < 2 ** 31 - 1 else np.int64, copy=False)
+        codes[codes < 0] = size  # Missing values last
+
+        self.ranks[column] = (codes, size)
+        logging.info(f"Ranked column {column}: {size} distinct values")
+        return codes, size
+
+    def key(self, column: str, ascending: bool = True, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Integer sort key of ``column`` over ``rows`` (or every row)"""
+        codes, size = self._ranks(column)
+        if rows is not None:
+            codes = codes[rows]
+        if ascending:
+            return codes
+        return np.where(codes == size, size, size - 1 - codes)
+
+    def _sort(self, keys: Sequence[SortKey], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        arrays = [self.key(column, ascending, rows) for column, ascending in keys]
+        if len(arrays) == 1:
+            return np.argsort(arrays[0], kind="stable")
+        # lexsort sorts by its last array first
+        return np.lexsort(arrays[::-1])
+
+    def full_order(self, keys: Sequence[SortKey]) -> np.ndarray:
+        """Row positions of the whole frame sorted by ``keys``"""
+        keys = tuple(keys)
+        order = self.orders.get(keys)
+        if order is not None:
+            self.orders.move_to_end(keys)
+            return order
+
+        order = self._sort(keys)
+        self.orders[keys] = order
+        if len(self.orders) > ORDER_CACHE_SIZE:
+            self.orders.popitem(last=False)
+        return order
+
+    def order(self, keys: Sequence[SortKey], rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Positions (``iloc``) of ``rows`` (or every row) sorted by ``keys``;
+        ``rows`` as given without keys. ``rows`` must hold each position once at most.
+        """
+        keys = tuple(keys)
+        if not keys:
+            return rows
+        if rows is None:
+            return self.full_order(keys)
+        if len(rows) == 0:
+            return rows
+
+        if keys not in self.orders and len(rows) < len(self.df) * SUBSET_FRACTION:
+            return rows[self._sort(keys, rows)]
+
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[rows] = True
+        order = self.full_order(keys)
+        return order[mask[order]]
@@ -0,0 +1,198 @@
+"""
+Extract the tables of a PDF into one Excel or CSV sheet.
+
+Pages are read in chunks by a pool of worker processes and the rows are
+written to the output as chunks finish, in page order, so memory stays flat
+however long the statement is. Run it as a script so the pool can start
+safely from the GUI tools (they build their window at import time):
+
+    python table_extraction.py statement.pdf statement.xlsx [--workers N] [--pages-per-job N]
+"""
+import os
+import re
+import sys
+import csv
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, Iterator, List, Optional
+
+import pdfplumber
+
+from batch_engine import BatchEngine, default_worker_count
+
+# Pages one worker extracts per job; large enough to amortise opening the PDF
+PAGES_PER_JOB = 16
+
+# Rows per worksheet: Excel's limit, less the header row
+MAX_SHEET_ROWS = 1048575
+
+# Control characters openpyxl refuses to write
+ILLEGAL_CHARACTERS = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+
+def extract_page_tables(job: Dict) -> Dict:
+    """Worker: the tables of pages ``start``..``stop`` of one PDF, as lists of rows per page"""
+    tables = []
+    with pdfplumber.open(job['path']) as pdf:
+        for number in range(job['start'], job['stop']):
+            page = pdf.pages[number]
+            tables.extend(table for table in page.extract_tables() if table)
+            page.close()  # Drop the page's parsed objects before the next one
+    return {'index': job['index'], 'doc_type': None, 'ok': True, 'output': None, 'error': None,
+            'pages': (job['start'], job['stop']), 'tables': tables}
+
+
+def _clean(cell) -> Optional[str]:
+    if cell is None:
+        return None
+    text = str(cell).strip()
+    return text or None
+
+
+def _key(row: List) -> tuple:
+    return tuple(" ".join(cell.split()).lower() if cell else "" for cell in row)
+
+
+class HeaderReconciler:
+    """
+    Keeps one header for the whole document. The first row of the first
+    table becomes the header, unless it is all digits: then it is kept as
+    data and the columns are named by position. Once a header is known, a
+    repeated header or a row of column numbers opening a later table is
+    dropped, and rows are padded (or the header extended) so every row has
+    the header's width.
+    """
+
+    def __init__(self):
+        self.header: Optional[List[str]] = None
+        self._header_key = None
+
+    @staticmethod
+    def _is_column_numbers(row: List) -> bool:
+        cells = [cell for cell in row if cell]
+        return bool(cells) and all(cell.isdigit() for cell in cells)
+
+    def rows(self, table: List[List]) -> Iterator[List]:
+        """The data rows of one table; sets the header from the first table"""
+        table = [[_clean(cell) for cell in row] for row in table]
+        table = [row for row in table if any(row)]
+        if not table:
+            return
+
+        first = table[0]
+        if self.header is None:
+            if not self._is_column_numbers(first):
+                self.header = [cell or f"Column {i + 1}" for i, cell in enumerate(first)]
+                self._header_key = _key(first)
+                table = table[1:]
+        elif _key(first) == self._header_key or (self._header_key and self._is_column_numbers(first)):
+            table = table[1:]
+
+        for row in table:
+            if self.header is None:
+                # A table without any header row: name the columns by position
+                self.header = [f"Column {i + 1}" for i in range(len(row))]
+                self._header_key = ()
+            if len(row) > len(self.header):
+                self.header.extend(f"Column {i + 1}" for i in range(len(self.header), len(row)))
+            elif len(row) < len(self.header):
+                row = row + [None] * (len(self.header) - len(row))
+            yield row
+
+
+class TableWriter:
+    """
+    Writes rows straight to an .xlsx (write-only workbook, new sheet every
+    ``MAX_SHEET_ROWS``) or .csv file. The header is written when the first
+    row arrives; columns added later extend the header of the next sheet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.csv = path.lower().endswith(".csv")
+        self.rows_written = 0
+        self._sheet_rows = 0
+        if self.csv:
+            self._file = open(path, 'w', newline='', encoding='utf-8-sig')
+            self._writer = csv.writer(self._file)
+        else:
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+            self._sheet = None
+
+    def write(self, header: List[str], row: List):
+        if self.csv:
+            if self.rows_written == 0:
+                self._writer.writerow(header)
+            self._writer.writerow(["" if cell is None else cell for cell in row])
+        else:
+            if self._sheet is None or self._sheet_rows >= MAX_SHEET_ROWS:
+                title = "Sheet1" if self._sheet is None else f"Sheet{len(self._workbook.worksheets) + 1}"
+                self._sheet = self._workbook.create_sheet(title)
+                self._sheet.append(header)
+                self._sheet_rows = 0
+            self._sheet.append([ILLEGAL_CHARACTERS.sub("", cell) if cell else cell for cell in row])
+            self._sheet_rows += 1
+        self.rows_written += 1
+
+    def close(self):
+        if self.csv:
+            self._file.close()
+        else:
+            if self._sheet is None:
+                self._workbook.create_sheet("Sheet1")
+            self._workbook.save(self.path)
+
+
+def extract_tables(pdf_path: str, output_path: str, workers: Optional[int] = None,
+                   pages_per_job: int = PAGES_PER_JOB) -> int:
+    """Extract every table of ``pdf_path`` into ``output_path`` (.xlsx or .csv); returns the rows written"""
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+
+    jobs = [{'index': index, 'path': pdf_path, 'start': start, 'stop': min(start + pages_per_job, page_count)}
+            for index, start in enumerate(range(0, page_count, pages_per_job))]
+    workers = min(workers or default_worker_count(), max(1, len(jobs)))
+    engine = BatchEngine(extract_page_tables, workers=workers, chunk_size=1)
+    logging.info(f"Extracting tables from {page_count} pages of {pdf_path} with {engine.workers} worker(s)")
+
+    reconciler = HeaderReconciler()
+    writer = TableWriter(output_path)
+    try:
+        for result in engine.run(jobs):
+            if not result['ok']:
+                raise RuntimeError(f"Could not extract pages of {pdf_path}: {result['error']}")
+            for table in result['tables']:
+                for row in reconciler.rows(table):
+                    writer.write(reconciler.header, row)
+            logging.info(f"Extracted pages {result['pages'][0] + 1}-{result['pages'][1]} of {page_count}")
+    finally:
+        writer.close()
+    if writer.rows_written == 0:
+        os.remove(output_path)
+    logging.info(f"Wrote {writer.rows_written} rows to {output_path}")
+    return writer.rows_written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extract the tables of a PDF into an Excel or CSV file.")
+    parser.add_argument("pdf_path")
+    parser.add_argument("output_path", help="Output .xlsx or .csv file")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--pages-per-job", type=int, default=PAGES_PER_JOB)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    try:
+        rows = extract_tables(args.pdf_path, args.output_path, args.workers, max(1, args.pages_per_job))
+    except Exception as e:
+        logging.error(f"Table extraction failed: {str(e)}")
+        return 2
+    # Exit status 1 tells the caller that the PDF had no tables
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -7,15 +7,19 @@ from fpdf import FPDF
 import fitz  # PyMuPDF
 from PIL import Image, ImageTk
 import openpyxl
-import pdfplumber  # Extract tables from PDFs
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 import subprocess
 import sys
+import tempfile
 import os
+from virtual_tree import VirtualTreeview
+from search_index import SearchIndex
+from sort_index import SortIndex, toggle_key
+from overlay_filler import OverlayTemplate, OverlayField
+from segment_extraction import SegmentSchema
 
 
 # Detect System Theme (Light/Dark)
@@ -29,6 +33,8 @@ def change_theme(selected_theme):
 
 # Global variables
 df = None
+search_index = None  # SearchIndex over df, built once per upload
+sort_index = None  # SortIndex over df; its sort orders are kept until the next upload
 pdf_path = None
 pdf_document = None
 pdf_img = None
@@ -36,12 +42,15 @@ pdf_canvas = None
 text_boxes = []
 box_data = []
 base_name = "Invoice"  # Default base name
+segment_start = None  # Text that block extraction starts from
+segment_schema_path = None  # Segment schema JSON for structured extraction
 current_zoom = 1.0  # Zoom Level
 selected_font = tk.StringVar(value="Arial")  # Default font
 selected_size = tk.IntVar(value=12)  # Default size
 
 # Global variable to store the last filtered dataset
 filtered_df = None
+filtered_rows = None  # Positions of filtered_df's rows in df (None: all of df)
 
 # Initialize GUI
 theme = "darkly" if darkdetect.isDark() else "journal"
@@ -80,6 +89,14 @@ def load_pdf():
     btn_export = tk.Button(frame_right, text="📤 Export PDFs", command=export_filled_pdfs)
     btn_export.pack(pady=10, padx=10, fill=tk.X)
 
+    # ✅ Text Extraction Controls
+    btn_extraction_start = tk.Button(frame_right, text="🔎 Set Extraction Start", command=set_extraction_start)
+    btn_extraction_start.pack(pady=5, padx=10, fill=tk.X)
+    btn_segment_schema = tk.Button(frame_right, text="🧩 Load Segment Schema", command=load_segment_schema)
+    btn_segment_schema.pack(pady=5, padx=10, fill=tk.X)
+    btn_extract = tk.Button(frame_right, text="📑 Extract to Excel", command=extract_to_excel)
+    btn_extract.pack(pady=5, padx=10, fill=tk.X)
+
     # ✅ Zoom Controls
     def zoom_in():
         global current_zoom
@@ -194,33 +211,68 @@ def set_extraction_start():
         messagebox.showinfo("Success", f"Extraction will start from: {segment_start}")
 
 
+def load_segment_schema():
+    global segment_schema_path
+    path = filedialog.askopenfilename(filetypes=[("Segment schema", "*.json")])
+    if not path:
+        return
+    try:
+        schema = SegmentSchema.load(path)
+    except Exception as e:
+        messagebox.showerror("Error", f"Invalid segment schema: {e}")
+        return
+    segment_schema_path = path
+    messagebox.showinfo("Success", f"Extraction will fill {len(schema.columns)} columns from {os.path.basename(path)}")
+
+
+def run_extraction_process(script, args, on_finish):
+    """
+    Run a pool-based module of this folder (extraction, row export) as its
+    own process, so its worker pool never re-imports this script, and call
+    ``on_finish(returncode, last log line)`` from the Tk loop when it ends
+    """
+    extractor = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+    errors = tempfile.TemporaryFile(mode="w+")
+    process = subprocess.Popen([sys.executable, extractor] + args,
+                               stdout=subprocess.DEVNULL, stderr=errors, text=True)
+
+    def check():
+        if process.poll() is None:
+            root.after(200, check)
+            return
+        errors.seek(0)
+        log = errors.read().strip().splitlines()
+        errors.close()
+        on_finish(process.returncode, log[-1] if log else "")
+
+    root.after(200, check)
+
+
 def extract_to_excel():
     if pdf_document is None:
         messagebox.showerror("Error", "No PDF loaded!")
         return
 
-    extracted_data = []
-    for page_num, page in enumerate(pdf_document):
-        text_blocks = page.get_text("blocks")  # Extract text in structured segments
-        filtered_blocks = []
-        start_found = False if segment_start else True
-
-        for block in text_blocks:
-            if segment_start and segment_start in block[4]:
-                start_found = True
-            if start_found:
-                filtered_blocks.append(block[4])
+    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[
+        ("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("Parquet files", "*.parquet")])
+    if not save_path:
+        return
 
-        page_data = {f"Segment {i + 1}": text for i, text in enumerate(filtered_blocks)}
-        page_data["Page Number"] = page_num + 1
-        extracted_data.append(page_data)
+    # Structured columns with a schema; otherwise every text block from the start text on
+    if segment_schema_path:
+        options = ["--schema", segment_schema_path]
+    else:
+        options = ["--start", segment_start] if segment_start else []
 
-    df = pd.DataFrame(extracted_data)
+    def finished(returncode, log):
+        if returncode == 0:
+            messagebox.showinfo("Success", f"Data extracted and saved to {save_path}")
+        elif returncode == 1:
+            messagebox.showerror("Error", "No records found in the PDF.")
+        else:
+            messagebox.showerror("Error", f"Extraction failed: {log or returncode}")
 
-    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
-    if save_path:
-        df.to_excel(save_path, index=False)
-        messagebox.showinfo("Success", f"Data extracted and saved to {save_path}")
+    run_extraction_process("segment_extraction.py", [pdf_path, save_path] + options, finished)
 
 
 def set_custom_name():
@@ -240,40 +292,41 @@ def export_filled_pdfs():
         messagebox.showerror("Error", "No text fields assigned for data mapping!")
         return
 
-    save_folder = filedialog.askdirectory()
-    if not save_folder:
-        return
-
     # ✅ **Ensure Text Boxes Have Assigned Columns**
     for box in text_boxes:
         if not box["column"].get():
             messagebox.showerror("Error", "Some text boxes have no assigned columns!")
             return
 
-    # ✅ **Generate PDFs for Each Row**
-    for index, row in df.iterrows():
-        filled_pdf = fitz.open()
-        for page in pdf_document:
-            new_page = filled_pdf.new_page(width=page.rect.width, height=page.rect.height)
-            new_page.show_pdf_page(new_page.rect, pdf_document, page.number)
-
-            for box in text_boxes:
-                field_column = box["column"].get()
-                if field_column in df.columns:
-                    text_value = str(row[field_column])
-                    x, y = box["frame"].winfo_x(), box["frame"].winfo_y()
-                    new_page.insert_text((x, y), text_value, fontsize=selected_size.get(), color=(0, 0, 0))
+    single_file = messagebox.askyesno("Export", "Save all rows in a single PDF?\n(No saves one PDF per row)")
+    if single_file:
+        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=f"{base_name}_all.pdf",
+                                                 filetypes=[("PDF files", "*.pdf")])
+        if not save_path:
+            return
+    else:
+        save_folder = filedialog.askdirectory()
+        if not save_folder:
+            return
 
-        output_file = os.path.join(save_folder, f"{base_name}_{index + 1}.pdf")
-        filled_pdf.save(output_file)
-        filled_pdf.close()
+    # ✅ **Prepare the Template Once; Each Row Only Adds Its Text**
+    template = OverlayTemplate.from_pdf(pdf_document)
+    fields = [OverlayField(box["column"].get(), box["frame"].winfo_x(), box["frame"].winfo_y(),
+                           fontsize=selected_size.get(), page=page.number)
+              for page in pdf_document for box in text_boxes if box["column"].get() in df.columns]
 
-    messagebox.showinfo("Success", f"PDFs saved in {save_folder}")
+    if single_file:
+        template.write_merged((row for _, row in df.iterrows()), fields, save_path)
+        messagebox.showinfo("Success", f"{len(df)} rows saved in {save_path}")
+    else:
+        template.write_files(df.iterrows(), fields, save_folder,
+                             lambda index, row: f"{base_name}_{index + 1}.pdf")
+        messagebox.showinfo("Success", f"PDFs saved in {save_folder}")
 
 
 # 🟢 Upload File Function
 def upload_file():
-    global df
+    global df, search_index, sort_index, sort_keys
     file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls"), ("CSV files", "*.csv")])
     if file_path:
         try:
@@ -283,6 +336,9 @@ def upload_file():
                 messagebox.showerror("Error", "Loaded file is empty or could not be read.")
                 return
 
+            search_index = SearchIndex(df)
+            sort_index = SortIndex(df)
+            sort_keys = []
             update_columns()
             display_data(df)  # Now tree exists, so no error.
             messagebox.showinfo("Success", "File uploaded successfully!")
@@ -291,61 +347,63 @@ def upload_file():
             print("Upload Error:", e)  # Debugging
 
 # Display Data in Treeview with Proper Table Formatting
-def display_data(data):
-    global filtered_df
+def display_data(data, rows=None):
+    global filtered_df, filtered_rows
     filtered_df = data  # Store filtered data
+    filtered_rows = rows
 
-    tree.delete(*tree.get_children())  # Clear existing data
     tree["columns"] = list(data.columns)
     tree["show"] = "headings"  # Ensure only table headers are visible, not row indices
 
     # Adjust columns dynamically
+    sort_directions = dict(sort_keys)
     for col in data.columns:
         arrow = ""
-        if col in sort_orders and sort_orders[col] is not None:  # Show arrow only if column was sorted
-            arrow = " ⬆" if sort_orders[col] else " ⬇"
+        if col in sort_directions:  # Show arrow only if column is sorted; numbered when several are
+            arrow = " ⬆" if sort_directions[col] else " ⬇"
+            if len(sort_keys) > 1:
+                arrow += str([name for name, _ in sort_keys].index(col) + 1)
 
         tree.heading(col, text=f"{col}{arrow}", command=lambda c=col: toggle_sort_order(c))
         tree.column(col, width=150, anchor="center")  # Set a default width
 
-    for _, row in data.iterrows():
-        tree.insert("", "end", values=list(row))
+    if sort_keys and sort_index is not None:
+        # Sorted view of df itself: the frame is not reordered, only the visible window is read
+        tree_view.set_data(df, order=sort_index.order(sort_keys, rows))
+    else:
+        tree_view.set_data(data)  # Inserts only the visible window of rows
 
     tree.update_idletasks()  # Refresh to apply changes
 
 # 🔼🔽 Toggle Sort Order
-sort_orders = {}  # Dictionary to track column sorting order
-def toggle_sort_order(column):
-    global filtered_df
+sort_keys = []  # [(column, ascending)], first key first
+def toggle_sort_order(column, add=False):
+    global sort_keys
 
     if filtered_df is None or column not in filtered_df.columns:
         messagebox.showerror("Error", "Invalid column selection.")
         return
 
-    # Reset all sorting indicators except the selected column
-    for col in sort_orders:
-        if col != column:
-            sort_orders[col] = None  # Remove sorting order for other columns
+    # Click sorts by the column alone; Shift+Click adds it as a further key (clicking again flips it)
+    sort_keys = toggle_key(sort_keys, column, add)
 
-    # Toggle sorting order for the selected column
-    sort_orders[column] = not sort_orders.get(column, False)
-    ascending = sort_orders[column]
+    display_data(filtered_df, filtered_rows)  # Refresh sorted data
 
-    # Sort the data based on the selected column and order
-    filtered_df = filtered_df.sort_values(by=column, ascending=ascending)
-
-    display_data(filtered_df)  # Refresh sorted data
+def on_heading_shift_click(event):
+    if tree.identify_region(event.x, event.y) != "heading":
+        return None
+    toggle_sort_order(tree.column(tree.identify_column(event.x), "id"), add=True)
+    return "break"
 
 
 # Clear Data Searched and Reset Sorting
 def clear_filters():
-    global filtered_df, sort_orders
+    global sort_keys
     if df is None:
         messagebox.showerror("Error", "No data loaded to clear filters.")
         return
 
-    filtered_df = df.copy()  # Reset data
-    sort_orders = {}  # Reset sorting order
+    sort_keys = []  # Reset sorting order
 
     search_var.set("")
     sub_search_var.set("")
@@ -353,13 +411,11 @@ def clear_filters():
     sub_search_column_var.set("All Columns")
     filter_var.set("Contains")
 
-    display_data(filtered_df)  # Refresh without sorting icons
+    display_data(df)  # Refresh without sorting icons
 
 
 # 🔍 Combined Search (Main & Sub-Search)
 def search_and_generate():
-    global df, filtered_df
-
     if df is None:
         messagebox.showerror("Error", "Please upload a file first.")
         return
@@ -374,46 +430,16 @@ def search_and_generate():
         messagebox.showerror("Error", "Please enter a search term.")
         return
 
-    filtered_data = df.copy()
-
-    # 🔹 Apply Main Search
-    if main_query:
-        if main_column == "All Columns":
-            filtered_data = filtered_data[
-                filtered_data.apply(lambda row: row.astype(str).str.contains(main_query, case=False, na=False).any(), axis=1)
-            ]
-        else:
-            if filter_type == "Contains":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str).str.contains(main_query, case=False, na=False)]
-            elif filter_type == "Equals":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str) == main_query]
-            elif filter_type == "Starts with":
-                filtered_data = filtered_data[filtered_data[main_column].astype(str).str.startswith(main_query, na=False)]
-
-    # 🔹 Apply Sub-Search on Filtered Data
-    if sub_query:
-        if sub_column == "All Columns":
-            filtered_data = filtered_data[
-                filtered_data.apply(lambda row: row.astype(str).str.contains(sub_query, case=False, na=False).any(), axis=1)
-            ]
-        else:
-            filtered_data = filtered_data[filtered_data[sub_column].astype(str).str.contains(sub_query, case=False, na=False)]
+    # 🔹 Apply Main Search, then the Sub-Search on its matches; narrowing an earlier search only filters its rows
+    rows = search_index.search([(main_query, main_column, filter_type), (sub_query, sub_column, "Contains")])
+    filtered_data = df.iloc[rows]
 
     # 🛑 FIXED: Correct placement of "No Results" message
     if filtered_data.empty:
         messagebox.showinfo("No Results", "No matching records found.")
         return
 
-    display_data(filtered_data)  # ✅ Display only once
-    filtered_df = filtered_data  # ✅ Store for sorting
-
-    # Store filtered data for sorting
-
-    if filtered_data.empty:
-        messagebox.showinfo("No Results", "No matching records found.")
-        return
-
-    display_data(filtered_data)
+    display_data(filtered_data, rows)  # ✅ Display only once; the current sort keys carry over
 
 # 🟢 **Function to Export PDFs**
 def export_filled_pdfs():
@@ -427,35 +453,36 @@ def export_filled_pdfs():
         messagebox.showerror("Error", "No text fields assigned for data mapping!")
         return
 
-    save_folder = filedialog.askdirectory()
-    if not save_folder:
-        return
-
     # ✅ **Ensure Text Boxes Have Assigned Columns**
     for box in text_boxes:
         if not box["column"].get():
             messagebox.showerror("Error", "Some text boxes have no assigned columns!")
             return
 
-    # ✅ **Generate PDFs for Each Row**
-    for index, row in df.iterrows():
-        filled_pdf = fitz.open()
-        for page in pdf_document:
-            new_page = filled_pdf.new_page(width=page.rect.width, height=page.rect.height)
-            new_page.show_pdf_page(new_page.rect, pdf_document, page.number)
-
-            for box in text_boxes:
-                field_column = box["column"].get()
-                if field_column in df.columns:
-                    text_value = str(row[field_column])
-                    x, y = box["frame"].winfo_x(), box["frame"].winfo_y()
-                    new_page.insert_text((x, y), text_value, fontsize=selected_size.get(), color=(0, 0, 0))
+    single_file = messagebox.askyesno("Export", "Save all rows in a single PDF?\n(No saves one PDF per row)")
+    if single_file:
+        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=f"{base_name}_all.pdf",
+                                                 filetypes=[("PDF files", "*.pdf")])
+        if not save_path:
+            return
+    else:
+        save_folder = filedialog.askdirectory()
+        if not save_folder:
+            return
 
-        output_file = os.path.join(save_folder, f"{base_name}_{index + 1}.pdf")
-        filled_pdf.save(output_file)
-        filled_pdf.close()
+    # ✅ **Prepare the Template Once; Each Row Only Adds Its Text**
+    template = OverlayTemplate.from_pdf(pdf_document)
+    fields = [OverlayField(box["column"].get(), box["frame"].winfo_x(), box["frame"].winfo_y(),
+                           fontsize=selected_size.get(), page=page.number)
+              for page in pdf_document for box in text_boxes if box["column"].get() in df.columns]
 
-    messagebox.showinfo("Success", f"PDFs saved in {save_folder}")
+    if single_file:
+        template.write_merged((row for _, row in df.iterrows()), fields, save_path)
+        messagebox.showinfo("Success", f"{len(df)} rows saved in {save_path}")
+    else:
+        template.write_files(df.iterrows(), fields, save_folder,
+                             lambda index, row: f"{base_name}_{index + 1}.pdf")
+        messagebox.showinfo("Success", f"PDFs saved in {save_folder}")
 
 # 🖨 Convert Excel DataFrame to PDF
 def save_df_as_pdf(df, save_path):
@@ -534,36 +561,39 @@ def save_df_as_pdf(df, save_path):
 
  # Function to Export Each Row Individually as PDF
 def export_each_row_as_pdf():
-    global filtered_df
     if filtered_df is None or filtered_df.empty:
         messagebox.showerror("Error", "No data to export.")
         return
 
-    save_directory = filedialog.askdirectory()
-    if not save_directory:
+    single_file = messagebox.askyesnocancel("Export", "Save all rows in a single PDF?\n(No saves one PDF per row)")
+    if single_file is None:
+        return
+    if single_file:
+        save_path = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile="Rows.pdf",
+                                                 filetypes=[("PDF files", "*.pdf")])
+    elif messagebox.askyesno("Export", "Put the row PDFs in a zip archive?\n(No saves them to a folder)"):
+        save_path = filedialog.asksaveasfilename(defaultextension=".zip", initialfile="Rows.zip",
+                                                 filetypes=[("Zip archives", "*.zip")])
+    else:
+        save_path = filedialog.askdirectory()
+    if not save_path:
         return
 
-    styles = getSampleStyleSheet()
-    for index, row in filtered_df.iterrows():
-        file_path = os.path.join(save_directory, f"Row_{index + 1}.pdf")
-        doc = SimpleDocTemplate(file_path, pagesize=A4)
-        elements = []
-
-        elements.append(Paragraph("Row Data", styles['Title']))
-        table_data = [[col, str(row[col])] for col in filtered_df.columns]
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-
-        elements.append(table)
-        doc.build(elements)
+    # The rows as shown go to row_pdf_export.py, which fills them on a process pool
+    handle, data_path = tempfile.mkstemp(suffix=".pkl")
+    os.close(handle)
+    tree_view.view_data().to_pickle(data_path)
+
+    def finished(returncode, log):
+        os.remove(data_path)
+        if returncode == 0:
+            messagebox.showinfo("Success", f"Each row exported as an individual PDF to {save_path}.")
+        elif returncode == 1:
+            messagebox.showerror("Error", f"Some rows could not be exported. {log}")
+        else:
+            messagebox.showerror("Error", f"Row export failed: {log or returncode}")
 
-    messagebox.showinfo("Success", "Each row exported as an individual PDF.")
+    run_extraction_process("row_pdf_export.py", [data_path, save_path], finished)
 
 #PDF TO EXCEL
 def convert_pdf_to_excel():
@@ -571,37 +601,23 @@ def convert_pdf_to_excel():
     if not file_path:
         return
 
-    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
+    save_path = filedialog.asksaveasfilename(defaultextension=".xlsx",
+                                             filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")])
     if not save_path:
         return
 
-    extracted_data = []
-    headers = None  # Store column headers separately
-
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            tables = page.extract_tables()
-
-            for table in tables:
-                if table:
-                    first_row = table[0]  # First row of the table
-                    if headers is None:  # Set headers only once
-                        #headers = first_row
-                        extracted_data.append(headers)
-                    else:
-                        # If the first row is just numbers, ignore it
-                        if all(cell.isdigit() for cell in first_row if cell):
-                            table = table[1:]  # Skip first row
-
-                    for row in table:
-                        extracted_data.append(row)
-
-    if extracted_data:
-        df = pd.DataFrame(extracted_data[1:], columns=extracted_data[0])  # Use first row as headers
-        df.to_excel(save_path, index=False)
-        messagebox.showinfo("Success", "PDF converted to Excel successfully!")
-    else:
-        messagebox.showerror("Error", "No tables found in the PDF.")
+    def finished(returncode, log):
+        pdf_to_excel_btn.config(state=tk.NORMAL, text="📥 PDF to Excel")
+        if returncode == 0:
+            messagebox.showinfo("Success", "PDF converted to Excel successfully!")
+        elif returncode == 1:
+            messagebox.showerror("Error", "No tables found in the PDF.")
+        else:
+            messagebox.showerror("Error", f"PDF conversion failed: {log or returncode}")
+
+    # Pages are extracted by a process pool in a separate run of table_extraction.py
+    pdf_to_excel_btn.config(state=tk.DISABLED, text="⏳ Converting...")
+    run_extraction_process("table_extraction.py", [file_path, save_path], finished)
 
 
 # 🔹 UI Layout - Top Bar
@@ -683,12 +699,13 @@ tree_scroll_x = tk.Scrollbar(frame2, orient="horizontal")
 tree_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
 
 # Create the Treeview
-tree = ttk.Treeview(frame2, style="Custom.Treeview", yscrollcommand=tree_scroll_y.set, xscrollcommand=tree_scroll_x.set)
+tree = ttk.Treeview(frame2, style="Custom.Treeview", xscrollcommand=tree_scroll_x.set)
 tree.pack(pady=10, fill=tk.BOTH, expand=True)
 
-# Configure the Scrollbars to Scroll the Treeview
-tree_scroll_y.config(command=tree.yview)
+# Configure the Scrollbars to Scroll the Treeview; the vertical one moves through the DataFrame
 tree_scroll_x.config(command=tree.xview)
+tree_view = VirtualTreeview(tree, tree_scroll_y)
+tree.bind("<Shift-Button-1>", on_heading_shift_click)  # Shift+Click a header to sort by several columns
 
 # 🔄 Update column dropdown when a file is loaded
 def update_columns():
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_reader import iter_data_batches, read_data  # noqa: E402
+
+HEADER = ["PINCODE", "NAME", "AMOUNT", "NOTE"]
+ROWS = [
+    ["560008", "Acme", 1.5, "NA"],
+    ["560009", "N/A", 2, "x"],
+    [None, "", 3.0, "12"],
+]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    book = Workbook()
+    sheet = book.active
+    sheet.append(HEADER)
+    for row in ROWS:
+        sheet.append(row)
+    path = str(tmp_path / "data.xlsx")
+    book.save(path)
+    return path
+
+
+def test_read_data_matches_read_excel(workbook):
+    expected = pd.read_excel(workbook)
+    result = read_data(workbook)
+    pd.testing.assert_frame_equal(result, expected)
+    # Numeric-looking text is parsed as a number, as read_excel does
+    assert result["PINCODE"].dtype == expected["PINCODE"].dtype == "float64"
+
+
+def test_read_data_as_text_matches_read_excel(workbook):
+    na_values = ['', 'NA', 'N/A', 'NULL']
+    expected = pd.read_excel(workbook, dtype=str, na_values=na_values, keep_default_na=False)
+    pd.testing.assert_frame_equal(read_data(workbook, as_text=True, na_values=na_values), expected)
+
+
+def test_dtypes_are_inferred_per_batch(workbook):
+    # The last row's "12" is the only text in its batch that looks numeric
+    notes = [batch["NOTE"].tolist() for batch in iter_data_batches(workbook, batch_size=1)]
+    assert notes[-1] == [12]
+    assert read_data(workbook, batch_size=1)["NOTE"].tolist()[1:] == ["x", 12]
+    assert pd.read_excel(workbook)["NOTE"].tolist()[1:] == ["x", "12"]
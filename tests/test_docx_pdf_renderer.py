@@ -0,0 +1,49 @@
+import os
+import re
+import sys
+import zipfile
+
+import fitz  # PyMuPDF
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docx_pdf_renderer import render_docx_to_pdf  # noqa: E402
+
+TEMPLATES = sorted(os.path.join(ROOT, "templates", name) for name in os.listdir(os.path.join(ROOT, "templates"))
+                   if name.endswith(".docx"))
+
+
+def word_page_count(docx_path):
+    """Pages Word counted when it last saved the document"""
+    with zipfile.ZipFile(docx_path) as archive:
+        properties = archive.read("docProps/app.xml").decode("utf-8")
+    return int(re.search(r"<Pages>(\d+)</Pages>", properties).group(1))
+
+
+@pytest.mark.parametrize("template", TEMPLATES, ids=os.path.basename)
+def test_template_page_count_matches_word(template):
+    with fitz.open("pdf", render_docx_to_pdf(template)) as pdf:
+        assert pdf.page_count == word_page_count(template)
+
+
+@pytest.mark.parametrize("template", TEMPLATES, ids=os.path.basename)
+def test_template_renders_the_same_bytes(template):
+    assert render_docx_to_pdf(template) == render_docx_to_pdf(template)
+
+
+def test_rupee_sign_uses_an_embedded_font(tmp_path):
+    docx = pytest.importorskip("docx")
+    import docx_pdf_renderer
+    if docx_pdf_renderer._unicode_pdf_font() is None:
+        pytest.skip("No Unicode TrueType font installed")
+
+    document = docx.Document()
+    document.add_paragraph("Amount: ₹ 1,200")
+    path = str(tmp_path / "rupee.docx")
+    document.save(path)
+
+    with fitz.open("pdf", render_docx_to_pdf(path)) as pdf:
+        assert "₹" in pdf[0].get_text()
+        assert any(font[1] == "ttf" for font in pdf[0].get_fonts())
@@ -0,0 +1,19 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generation_run import DEFAULT_TEMPLATE_FILES, default_templates  # noqa: E402
+
+
+def test_default_templates_resolve_against_the_bundled_folder():
+    templates = default_templates(os.path.join(ROOT, "templates"))
+    assert set(templates) == set(DEFAULT_TEMPLATE_FILES)
+    for doc_type, path in templates.items():
+        assert path is not None, f"No template found for {doc_type}"
+        assert os.path.isfile(path)
+
+
+def test_default_templates_use_the_script_folder():
+    assert all(path is not None for path in default_templates().values())
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from search_index import FILTER_TYPES, SearchIndex  # noqa: E402
+
+QUERIES = ["None", "nan", "0", "0.0", "-0.0", "1", "1.0", "True", "a"]
+
+
+def old_mask(series: pd.Series, query: str, filter_type: str) -> np.ndarray:
+    """The per-search filter the index replaced"""
+    strings = series.astype(str)
+    if filter_type == "Contains":
+        mask = strings.str.contains(query, case=False, na=False, regex=False)
+    elif filter_type == "Equals":
+        mask = strings == query
+    else:
+        mask = strings.str.startswith(query, na=False)
+    return mask.to_numpy(dtype=bool)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "mixed": pd.Series(["a", None, np.nan, True, 1, 1.0, -0.0, 0.0], dtype=object),
+        "floats": [0.0, -0.0, np.nan, 1.0, 1.5, -0.0, 2.0, np.nan],
+        "ints": range(8),
+    })
+
+
+@pytest.mark.parametrize("filter_type", FILTER_TYPES)
+@pytest.mark.parametrize("query", QUERIES)
+def test_matches_the_old_astype_str_filter(df, query, filter_type):
+    index = SearchIndex(df)
+    for column in df.columns:
+        assert index.mask(query, column, filter_type).tolist() == old_mask(df[column], query, filter_type).tolist()
+
+
+def test_negative_zero_is_not_merged_with_zero(df):
+    index = SearchIndex(df)
+    assert index.match("-0.0", "floats", "Equals").tolist() == [1, 5]
+    assert index.match("0.0", "floats", "Equals").tolist() == [0]
+    assert index.match("-0.0", "mixed", "Equals").tolist() == [6]
+
+
+def test_missing_values_match_as_astype_str_shows_them(df):
+    index = SearchIndex(df)
+    # 'None' on pandas < 3; pandas 3 keeps the cell missing, so it matches nothing
+    shown = df["mixed"].astype(str)
+    expected = [position for position, value in enumerate(shown) if value == "None"]
+    assert index.match("None", "mixed", "Equals").tolist() == expected
+    assert index.match("nan", "floats", "Equals").tolist() == [
+        position for position, value in enumerate(df["floats"].astype(str)) if value == "nan"]
@@ -0,0 +1,23 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from table_extraction import HeaderReconciler  # noqa: E402
+
+
+def test_first_table_sets_the_header_and_later_repeats_are_dropped():
+    reconciler = HeaderReconciler()
+    assert list(reconciler.rows([["Date", "Amount"], ["01/04", "10"]])) == [["01/04", "10"]]
+    assert list(reconciler.rows([["1", "2"], ["02/04", "20"]])) == [["02/04", "20"]]
+    assert list(reconciler.rows([["date", " Amount"], ["03/04", "30"]])) == [["03/04", "30"]]
+    assert reconciler.header == ["Date", "Amount"]
+
+
+def test_all_digit_first_row_of_the_first_table_is_kept():
+    reconciler = HeaderReconciler()
+    assert list(reconciler.rows([["100", "200"], ["300", "400"]])) == [["100", "200"], ["300", "400"]]
+    assert reconciler.header == ["Column 1", "Column 2"]
+    # Without a real header there is no column-number row to recognise
+    assert list(reconciler.rows([["500", "600"]])) == [["500", "600"]]
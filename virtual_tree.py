@@ -0,0 +1,216 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+# Rows inserted below the visible area, so a taller window shows data before
+# the next refill
+WINDOW_BUFFER = 20
+
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTreeview:
+    """
+    Shows a DataFrame in a ttk.Treeview while keeping only the visible rows
+    (plus a small buffer) as tree items.
+
+    The vertical scrollbar and mouse wheel drive a row offset into the frame
+    instead of the tree's own yview; scrolling rewrites the values of the
+    existing items rather than inserting or deleting any. Loading or
+    re-sorting a frame therefore costs the same for 500 rows as for 500k.
+
+    An ``order`` of row positions shows the frame in that order without
+    reordering (copying) it; only the visible window is gathered.
+    """
+
+    def __init__(self, tree: ttk.Treeview, yscrollbar: Optional[tk.Scrollbar] = None,
+                 buffer: int = WINDOW_BUFFER):
+        self.tree = tree
+        self.yscrollbar = yscrollbar
+        self.buffer = buffer
+        self.data = pd.DataFrame()
+        self.order: Optional[np.ndarray] = None  # Row positions in display order; None shows the frame as is
+        self.offset = 0
+        self.items: List[str] = []
+        self.selected: Set[int] = set()  # View offsets, so a selection survives scrolling
+        self._syncing = False
+
+        if yscrollbar is not None:
+            yscrollbar.configure(command=self.yview)
+            tree.configure(yscrollcommand="")
+
+        tree.bind("<Configure>", lambda event: self.refresh(), add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tree.bind(sequence, self._on_mousewheel)
+        for sequence, step in (("<Up>", -1), ("<Down>", 1)):
+            tree.bind(sequence, lambda event, s=step: self._on_arrow(s))
+        for sequence, step in (("<Prior>", -1), ("<Next>", 1)):
+            tree.bind(sequence, lambda event, s=step: self._on_page(s))
+        tree.bind("<Home>", lambda event: self._jump(0))
+        tree.bind("<End>", lambda event: self._jump(len(self)))
+
+    # ----- Data -----
+
+    def set_data(self, data: pd.DataFrame, keep_position: bool = False, order: Optional[np.ndarray] = None):
+        """
+        Show ``data`` from the top (or at the current offset with keep_position);
+        with ``order``, only the rows at those positions, in that order.
+        """
+        self.data = data if data is not None else pd.DataFrame()
+        self.order = order
+        if not keep_position:
+            self.offset = 0
+        self.selected = set()
+        self.refresh()
+
+    def __len__(self):
+        return len(self.data) if self.order is None else len(self.order)
+
+    def positions(self, offsets: List[int]) -> List[int]:
+        """Frame positions (``iloc``) of the rows shown at view ``offsets``."""
+        if self.order is None:
+            return list(offsets)
+        return self.order[offsets].tolist()
+
+    def view_data(self) -> pd.DataFrame:
+        """The rows as shown, in display order (a copy when an order is set)."""
+        return self.data if self.order is None else self.data.iloc[self.order]
+
+    def visible_rows(self) -> int:
+        """Number of rows that fit in the tree's current height."""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget("height"))
+
+        header, row_height = self._row_metrics()
+        return max(1, (height - header) // row_height)
+
+    def _row_metrics(self):
+        if self.items:
+            bbox = self.tree.bbox(self.items[0])
+            if bbox:
+                return bbox[1], bbox[3]
+
+        style = self.tree.cget("style") or "Treeview"
+        row_height = ttk.Style(self.tree).lookup(style, "rowheight")
+        try:
+            row_height = int(row_height)
+        except (TypeError, ValueError):
+            row_height = DEFAULT_ROW_HEIGHT
+        return row_height, row_height
+
+    def refresh(self):
+        """Fill the window at the current offset and update the scrollbar."""
+        total = len(self)
+        visible = self.visible_rows()
+        self.offset = max(0, min(self.offset, total - visible))
+
+        if self.order is None:
+            window = self.data.iloc[self.offset:self.offset + visible + self.buffer]
+        else:
+            window = self.data.iloc[self.order[self.offset:self.offset + visible + self.buffer]]
+        rows = window.to_numpy(dtype=object).tolist() if len(window) else []
+
+        # Reuse the existing items; only the shortfall is inserted or deleted
+        for iid, values in zip(self.items, rows):
+            self.tree.item(iid, values=values)
+        if len(rows) > len(self.items):
+            for values in rows[len(self.items):]:
+                self.items.append(self.tree.insert("", "end", values=values))
+        elif len(rows) < len(self.items):
+            self.tree.delete(*self.items[len(rows):])
+            del self.items[len(rows):]
+
+        window_selection = [self.items[o - self.offset] for o in sorted(self.selected)
+                            if self.offset <= o < self.offset + len(self.items)]
+        if window_selection or self.tree.selection():
+            # The <<TreeviewSelect>> this queues is ours, not the user's
+            self._syncing = True
+            self.tree.selection_set(window_selection)
+            self.tree.after_idle(self._end_sync)
+
+        self.tree.yview_moveto(0)
+        if self.yscrollbar is not None:
+            if total:
+                self.yscrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+            else:
+                self.yscrollbar.set(0.0, 1.0)
+
+    # ----- Row mapping -----
+
+    def row_offset(self, iid: str) -> Optional[int]:
+        """Offset in the view of the row shown by tree item ``iid`` (its ``iloc`` without an order)."""
+        try:
+            return self.offset + self.items.index(iid)
+        except ValueError:
+            return None
+
+    def selected_offsets(self) -> List[int]:
+        return sorted(self.selected)
+
+    def selected_rows(self) -> pd.DataFrame:
+        return self.data.iloc[self.positions(self.selected_offsets())]
+
+    # ----- Scrolling -----
+
+    def yview(self, *args):
+        """Scrollbar command: ``moveto fraction`` or ``scroll n units|pages``."""
+        total = len(self)
+        if not args or not total:
+            return
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            count = int(args[1])
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.offset += count * step
+        self.refresh()
+
+    def _jump(self, offset: int):
+        self.offset = offset
+        self.refresh()
+        return "break"
+
+    def _end_sync(self):
+        self._syncing = False
+
+    def _on_select(self, event=None):
+        if not self._syncing:
+            self.selected = {self.offset + self.items.index(iid) for iid in self.tree.selection() if iid in self.items}
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.yview("scroll", step, "units")
+        return "break"
+
+    def _on_arrow(self, step: int):
+        """Move the focus one row, scrolling the window when it reaches an edge."""
+        focus = self.tree.focus()
+        position = self.items.index(focus) if focus in self.items else -1
+        target = position + step
+        visible = self.visible_rows()
+
+        if 0 <= target < min(visible, len(self.items)):
+            self._select(self.items[target])
+        elif position >= 0:
+            self.yview("scroll", step, "units")
+            self._select(self.items[max(0, min(position, len(self.items) - 1))])
+        return "break"
+
+    def _on_page(self, step: int):
+        self.yview("scroll", step, "pages")
+        return "break"
+
+    def _select(self, iid: str):
+        self.selected = {self.offset + self.items.index(iid)}
+        self.tree.focus(iid)
+        self.tree.selection_set(iid)